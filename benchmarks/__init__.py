@@ -0,0 +1 @@
+"""Benchmarks for idoit_api, run them from the repository root e.g. python -m benchmarks.bench_transport"""
@@ -0,0 +1,75 @@
+"""Measures encode/decode throughput of the installed JSON codecs and the cost of encoding single requests
+
+Usage: python -m benchmarks.bench_codec [objects]
+
+The payload is a cmdb.objects.read response with the given number of objects. 'request' compares building the
+envelope dict and encoding it, as API did before, with _encode_request, which only encodes the params.
+"""
+import json
+import sys
+import timeit
+
+from idoit_api.base import API
+from idoit_api.codec import CODECS, get_codec
+
+
+def objects_response(objects):
+    return {'jsonrpc': '2.0', 'id': 1, 'result': [{
+        'id': str(i),
+        'title': 'server-{:06d}'.format(i),
+        'sysid': 'SYSID_{:010d}'.format(1600000000 + i),
+        'type': '5',
+        'created': '2020-01-01 10:00:00',
+        'updated': '2021-06-01 12:00:00',
+        'type_title': 'Server',
+        'type_group_title': 'Infrastructure',
+        'status': '2',
+        'cmdb_status': '6',
+        'cmdb_status_title': 'in operation',
+        'image': 'https://cmdb.example.de/images/objecttypes/server.png',
+    } for i in range(objects)]}
+
+
+def legacy_encode_request(api, method, params):
+    params = dict(params or {})
+    params['apikey'] = api.key
+    body = {'method': method, 'params': params, 'jsonrpc': '2.0', 'id': 1}
+    return json.dumps(body).encode('utf-8')
+
+
+def main(objects=10000):
+    response = objects_response(objects)
+    size = len(json.dumps(response).encode('utf-8'))
+    print("payload: {} objects, {:.1f} MB\n".format(objects, size / 1e6))
+
+    print("{:<10} {:>14} {:>14}".format('codec', 'encode [MB/s]', 'decode [MB/s]'))
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            print("{:<10} {:>14}".format(name, 'not installed'))
+            continue
+        data = codec.dumps(response)
+        encode = min(timeit.repeat(lambda: codec.dumps(response), number=5, repeat=3)) / 5
+        decode = min(timeit.repeat(lambda: codec.loads(data), number=5, repeat=3)) / 5
+        print("{:<10} {:>14.0f} {:>14.0f}".format(name, size / encode / 1e6, size / decode / 1e6))
+
+    calls = 100000
+    params = {'objID': 1234, 'category': 'C__CATG__GLOBAL', 'status': 'C__RECORD_STATUS__NORMAL'}
+    api = API(url="https://cmdb.example.de", key="benchmark", codec='json')
+    print("\n{:<35} {:>14}".format('request', 'per call [us]'))
+    candidates = [('build dict + json.dumps (legacy)',
+                   lambda: legacy_encode_request(api, 'cmdb.category.read', params))]
+    for name in CODECS:
+        try:
+            codec_api = API(url="https://cmdb.example.de", key="benchmark", codec=name)
+        except ImportError:
+            continue
+        candidates.append(('_encode_request ({})'.format(name),
+                           (lambda a: lambda: a._encode_request('cmdb.category.read', params))(codec_api)))
+    for name, func in candidates:
+        print("{:<35} {:>14.2f}".format(name, timeit.timeit(func, number=calls) / calls * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
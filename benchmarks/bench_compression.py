@@ -0,0 +1,64 @@
+"""Compares bytes on the wire and end-to-end time with and without compression against a local FakeIdoitServer
+
+Usage: python -m benchmarks.bench_compression [calls]
+
+'read' fetches cmdb.objects.read responses of typical sizes, which the server compresses if the client accepts it.
+'write' sends a batch of cmdb.category.save calls, whose request body is compressed above compress_threshold.
+The server runs on localhost, so compression only costs time here. Over a real network the saved bytes usually
+outweigh it for responses and batches of more than a few kilobytes.
+"""
+import sys
+import time
+
+from benchmarks.bench_codec import objects_response
+from idoit_api.base import API
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+
+
+def save_batch(size):
+    return [{'method': 'cmdb.category.save', 'params': {
+        'object': 1000 + i,
+        'category': 'C__CATG__IP',
+        'data': {'hostname': 'server-{:06d}'.format(i), 'domain': 'dc1.example.de',
+                 'ipv4_address': '10.{}.{}.{}'.format(i // 65536 % 256, i // 256 % 256, i % 256)},
+    }} for i in range(size)]
+
+
+def measure(server, func, calls, compress):
+    # like a web server without mod_deflate in plain mode
+    server.compress_min_size = 1024 if compress else None
+    server.bytes_sent = server.bytes_received = 0
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = (time.perf_counter() - start) / calls
+    return server.bytes_received / calls, server.bytes_sent / calls, elapsed
+
+
+def main(calls=50):
+    fake = FakeIdoit()
+    fake.register('cmdb.objects.read', lambda params: objects_response(params['limit'])['result'])
+    fake.register('cmdb.category.save', lambda params: {'success': True, 'entry': 1})
+
+    with FakeIdoitServer(fake) as server:
+        apis = (('plain', API(url=server.url, key="key")),
+                ('compressed', API(url=server.url, key="key", compress_threshold=1024)))
+        print("{:<22} {:<12} {:>12} {:>14} {:>10}".format(
+            'payload', 'mode', 'sent [kB]', 'received [kB]', 'time [ms]'))
+        for objects in (10, 100, 1000, 5000):
+            for mode, api in apis:
+                sent, received, elapsed = measure(
+                    server, lambda: api.request('cmdb.objects.read', {'limit': objects}), calls, api.compress_threshold)
+                print("{:<22} {:<12} {:>12.1f} {:>14.1f} {:>10.2f}".format(
+                    'read {} objects'.format(objects), mode, sent / 1e3, received / 1e3, elapsed * 1e3))
+        for size in (10, 100, 500):
+            batch = save_batch(size)
+            for mode, api in apis:
+                sent, received, elapsed = measure(
+                    server, lambda: api.batch_request(batch), calls, api.compress_threshold)
+                print("{:<22} {:<12} {:>12.1f} {:>14.1f} {:>10.2f}".format(
+                    'write batch of {}'.format(size), mode, sent / 1e3, received / 1e3, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
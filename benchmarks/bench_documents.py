@@ -0,0 +1,83 @@
+"""Compares the cost of creating CMDBDocument instances with per-instance and with shared log handlers
+
+Usage: python -m benchmarks.bench_documents [documents]
+
+'per-instance handlers' replicates the LoggingMixin used before logging was configured once per process: every
+instance opened the log file and attached two more handlers to the shared class logger, so every further log call
+got slower and the process ran out of file descriptors on large reads.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from idoit_api.base import CMDBDocument
+from idoit_api.const import LOG_LEVEL_INFO
+
+
+class LegacyLoggingMixin(object):
+
+    def __init__(self, log_level=LOG_LEVEL_INFO, log_path=None, *args, **kwargs):
+        self.log = logging.getLogger('{}.{}'.format(self.__module__, self.__class__.__name__))
+        self.log_lvl = log_level
+        self.log.setLevel(log_level)
+
+        self._fh_log = logging.FileHandler(log_path)
+        self._fh_log.setLevel(log_level)
+        self._ch_log = logging.StreamHandler()
+        self._ch_log.setLevel(logging.ERROR)
+
+        self._formatter = logging.Formatter('[%(asctime)s] - %(name)s - %(levelname)s \n\t- %(message)s')
+        self._fh_log.setFormatter(self._formatter)
+        self._ch_log.setFormatter(self._formatter)
+
+        self.log.addHandler(self._fh_log)
+        self.log.addHandler(self._ch_log)
+
+
+class LegacyDocument(LegacyLoggingMixin):
+
+    def __init__(self, data, log_path=None):
+        super().__init__(log_path=log_path)
+        self._raw_data = data.copy()
+        self.__dict__.update(data)
+
+
+def open_fds():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+def measure(factory, documents):
+    fds = open_fds()
+    start = time.perf_counter()
+    instances = [factory({'id': i, 'title': 'server-{}'.format(i), 'type': 5}) for i in range(documents)]
+    elapsed = time.perf_counter() - start
+    return elapsed / documents, open_fds() - fds, instances
+
+
+def main(documents=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'legacy.log')
+        candidates = [
+            ('per-instance handlers', lambda data: LegacyDocument(data, log_path=log_path)),
+            ('shared handlers', CMDBDocument),
+        ]
+
+        print("{:<25} {:>14} {:>10} {:>10}".format('logging', 'per doc [us]', 'new fds', 'handlers'))
+        for name, factory in candidates:
+            per_document, fds, instances = measure(factory, documents)
+            handlers = len(instances[0].log.handlers)
+            print("{:<25} {:>14.1f} {:>10} {:>10}".format(name, per_document * 1e6, fds, handlers))
+
+            if isinstance(instances[0], LegacyDocument):
+                for handler in instances[0].log.handlers[:]:
+                    instances[0].log.removeHandler(handler)
+                    handler.close()
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
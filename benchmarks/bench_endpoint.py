@@ -0,0 +1,48 @@
+"""Measures attribute access and call overhead of CMDBCategoryEndpoint
+
+Usage: python -m benchmarks.bench_endpoint [calls]
+
+'__getattribute__' replicates the endpoints before API methods were bound by the validated decorator: every
+attribute access ran through a Python level __getattribute__, and every lookup of an API method created a new
+functools.partial. Calls go to an in-process FakeIdoit, so the numbers are the overhead of the client only.
+"""
+import sys
+import timeit
+
+from functools import partial
+from idoit_api.base import API
+from idoit_api.objects import CMDBCategoryEndpoint
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+
+class LegacyEndpoint(CMDBCategoryEndpoint):
+
+    def __getattribute__(self, item):
+        if item in ('create', 'read', 'update', 'delete', 'save', 'batch_update',
+                    'acreate', 'aread', 'aupdate', 'adelete', 'asave'):
+            # __wrapped__ is the undecorated method, so parameters are validated once like before
+            method = object.__getattribute__(self, item).__wrapped__.__get__(self)
+            return partial(self._validate_request, method=method)
+        return object.__getattribute__(self, item)
+
+
+def main(calls=100000):
+    fake = FakeIdoit()
+    fake.register('cmdb.category.read', lambda params: [{'id': '1', 'objID': params['objID']}])
+    api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+
+    print("{:<20} {:>14} {:>14} {:>14} {:>14}".format(
+        'binding', 'ep.log [ns]', 'ep.ENDPOINT [ns]', 'ep.read [ns]', 'read() [us]'))
+    for name, cls in (('__getattribute__', LegacyEndpoint), ('validated', CMDBCategoryEndpoint)):
+        ep = cls(api=api, permission_level=50)
+        log = timeit.timeit(lambda: ep.log, number=calls) / calls
+        endpoint = timeit.timeit(lambda: ep.ENDPOINT, number=calls) / calls
+        lookup = timeit.timeit(lambda: ep.read, number=calls) / calls
+        call = timeit.timeit(lambda: ep.read(objID=1, category='C__CATG__GLOBAL'), number=calls // 10) / (calls // 10)
+        print("{:<20} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.2f}".format(
+            name, log * 1e9, endpoint * 1e9, lookup * 1e9, call * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,69 @@
+"""Compares the memory held by CMDBDocument and CompactDocument instances, measured with tracemalloc
+
+Usage: python -m benchmarks.bench_memory [documents]
+
+The documents are parsed from JSON like API responses, entries of C__CATG__GLOBAL with the nested dialog values
+i-doit returns for type, status and purpose. Measured is what stays allocated after parsing the response and
+creating the documents from it, once the parsed response is released.
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from idoit_api.objects import CMDBCategoryEntry, CompactCategoryEntry
+
+
+def dialog(id, title, const, title_lang):
+    return {'id': id, 'title': title, 'const': const, 'title_lang': title_lang}
+
+
+def global_entry(i):
+    return {
+        'id': str(i),
+        'objID': str(1000 + i),
+        'title': 'server-{:06d}'.format(i),
+        'status': dialog('2', 'Normal', 'C__RECORD_STATUS__NORMAL', 'LC__CMDB__RECORD_STATUS__NORMAL'),
+        'created': '2020-01-{:02d} 10:00:00'.format(i % 28 + 1),
+        'created_by': 'admin',
+        'changed': '2021-06-{:02d} 12:00:00'.format(i % 28 + 1),
+        'changed_by': 'admin',
+        'purpose': dialog('1', 'Production', 'C__CMDB__PURPOSE__PRODUCTION', 'LC__CMDB__CATG__PURPOSE_PRODUCTION'),
+        'category': [],
+        'sysid': 'SYSID_{:010d}'.format(1600000000 + i),
+        'cmdb_status': dialog('6', 'in operation', 'C__CMDB_STATUS__IN_OPERATION', 'LC__CMDB_STATUS__IN_OPERATION'),
+        'type': dialog('5', 'Server', 'C__OBJTYPE__SERVER', 'LC__CMDB__OBJTYPE__SERVER'),
+        'tag': [],
+        'description': '',
+    }
+
+
+def measure(factory, payload):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    pages = json.loads(payload)
+    documents = [factory(data) for data in pages]
+    del pages
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, documents
+
+
+def main(documents=20000):
+    payload = json.dumps([global_entry(i) for i in range(documents)])
+
+    print("{:<35} {:>12} {:>14}".format('document', 'total [MB]', 'per doc [B]'))
+    results = []
+    for name, factory in (
+            ('CMDBCategoryEntry', CMDBCategoryEntry),
+            ('CompactCategoryEntry(keep_raw=True)', lambda data: CompactCategoryEntry(data, keep_raw=True)),
+            ('CompactCategoryEntry', CompactCategoryEntry)):
+        size, instances = measure(factory, payload)
+        results.append(instances)
+        print("{:<35} {:>12.1f} {:>14.0f}".format(name, size / 1e6, size / documents))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,52 @@
+"""Compares the per-call latency of the available transports against a local FakeIdoitServer
+
+Usage: python -m benchmarks.bench_transport [calls]
+
+'requests.post' is the code path used before transports were introduced: a new connection for every call.
+As the server runs on localhost without TLS, real world savings are larger than shown here.
+"""
+import sys
+import time
+import requests
+
+from idoit_api.base import API
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import RequestsTransport, Urllib3Transport, LocalTransport
+
+
+def legacy_call(url):
+    body = {"method": "idoit.version", "params": {"apikey": "key"}, "jsonrpc": "2.0", "id": 0}
+    return requests.post(url=url, json=body, headers={'content-type': 'application/json'}).json()
+
+
+def measure(func, calls):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return sum(timings) / calls, timings[calls // 2], timings[int(calls * 0.95)]
+
+
+def main(calls=1000):
+    with FakeIdoitServer() as server:
+        candidates = [
+            ('requests.post (legacy)', lambda: legacy_call(server.url)),
+            ('RequestsTransport', API(url=server.url, key="key", transport=RequestsTransport()).request),
+            ('Urllib3Transport', API(url=server.url, key="key", transport=Urllib3Transport()).request),
+            ('LocalTransport', API(url=server.url, key="key", transport=LocalTransport(FakeIdoit())).request),
+        ]
+
+        print("{:<25} {:>12} {:>12} {:>12} {:>12}".format('transport', 'mean [us]', 'p50 [us]', 'p95 [us]', 'conns'))
+        for name, func in candidates:
+            if name != 'requests.post (legacy)':
+                func = (lambda f: lambda: f("idoit.version"))(func)
+            connections = server.connection_count
+            mean, p50, p95 = measure(func, calls)
+            print("{:<25} {:>12.1f} {:>12.1f} {:>12.1f} {:>12}".format(
+                name, mean * 1e6, p50 * 1e6, p95 * 1e6, server.connection_count - connections))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
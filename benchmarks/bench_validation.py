@@ -0,0 +1,81 @@
+"""Compares request validation of endpoints with the rules walked on every call and with precompiled rules
+
+Usage: python -m benchmarks.bench_validation [calls]
+
+'rules walked per call' replicates BaseEndpoint._validate_request before the rules were compiled by
+__init_subclass__. The validated method does nothing, so only the cost of validation is measured.
+"""
+import sys
+import timeit
+
+from idoit_api.base import API, CMDBDocument
+from idoit_api.const import CATEGORY_CONST_MAPPING
+from idoit_api.exceptions import InvalidParams
+from idoit_api.objects import CMDBCategoryEndpoint
+from idoit_api.transport import LocalTransport
+
+
+class LegacyValidation(CMDBCategoryEndpoint):
+
+    def _validate_request(self, method, **kwargs):
+        if kwargs is None:
+            raise InvalidParams(message="Please specify some parameters for the request")
+        if not isinstance(kwargs, dict):
+            raise InvalidParams(message="Parameters for the API call need to be a dictionary")
+        if 'obj' in kwargs and issubclass(kwargs.get('obj').__class__, CMDBDocument):
+            kwargs.update(self._build_request_dict_from_obj(kwargs.get('obj')))
+
+        self.log.debug('Parameters passed to _validate_request: %s', kwargs)
+
+        api_method = self.ASYNC_API_METHODS.get(method.__name__, method.__name__)
+
+        for param, rules in self.REQUIRED_PARAMS.items():
+            if isinstance(rules, tuple):
+                for method_name in rules:
+                    if api_method != method_name:
+                        continue
+                    if param not in kwargs or kwargs.get(param, None) is None:
+                        raise InvalidParams(message="Required parameter: {} is missing!".format(param))
+            elif rules is True:
+                if param not in kwargs or kwargs.get(param, None) is None:
+                    raise InvalidParams(message="Required parameter: {} is missing!".format(param))
+            else:
+                raise AttributeError("Your validation dictionary is malformed, values need to be a tuple or True")
+
+            for params, rs in self.REQUIRED_INTERCHANGEABLE_PARAMS.items():
+                if isinstance(rs, tuple):
+                    for method_name in rs:
+                        if api_method != method_name:
+                            continue
+
+                        found_key = False
+                        for key in params:
+                            if key in kwargs and kwargs.get(key, None) is not None:
+                                found_key = True
+                        if not found_key:
+                            raise InvalidParams(message="None of the mutually exclusive required parameters")
+
+        return method(**{k: v for k, v in kwargs.items() if v is not None})
+
+
+def noop(**kwargs):
+    return kwargs
+
+
+# validation looks up the rules by the name of the method
+noop.__name__ = 'update'
+
+
+def main(calls=200000):
+    api = API(url="https://cmdb.example.de", transport=LocalTransport(lambda data, headers: b'{}'))
+    params = {'objID': 1, 'category': CATEGORY_CONST_MAPPING['global'], 'status': None, 'title': 'server'}
+
+    print("{:<25} {:>14}".format('validation', 'per call [us]'))
+    for name, cls in (('rules walked per call', LegacyValidation), ('precompiled rules', CMDBCategoryEndpoint)):
+        ep = cls(api=api, permission_level=50)
+        seconds = timeit.timeit(lambda: ep._validate_request(noop, **params), number=calls)
+        print("{:<25} {:>14.2f}".format(name, seconds / calls * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
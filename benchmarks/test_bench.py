@@ -0,0 +1,128 @@
+"""pytest-benchmark suite of the client against FakeIdoit, to catch performance regressions before a release
+
+Usage: pytest benchmarks [--benchmark-autosave | --benchmark-compare]
+
+'local' benchmarks call FakeIdoit in-process through LocalTransport, so they measure the overhead of the client
+only. 'http' benchmarks go through FakeIdoitServer on localhost and include the HTTP stack. Save a baseline with
+--benchmark-autosave on the last release and compare against it with --benchmark-compare.
+"""
+import pytest
+
+from idoit_api.base import API, CMDBDocument, CompactDocument
+from idoit_api.const import DELETE_ENTRIES
+from idoit_api.objects import CMDBCategoryEndpoint, CMDBObjectsEndpoint, CompactCategoryEntry
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import LocalTransport
+
+pytest.importorskip('pytest_benchmark')
+
+OBJECTS = 1000
+
+
+@pytest.fixture(scope='module')
+def fake():
+    fake = FakeIdoit()
+    fake.populate(OBJECTS)
+    return fake
+
+
+@pytest.fixture(scope='module')
+def server(fake):
+    with FakeIdoitServer(fake) as server:
+        yield server
+
+
+@pytest.fixture(scope='module')
+def local_api(fake):
+    return API(url="https://cmdb.example.de", key="benchmark", transport=LocalTransport(fake))
+
+
+@pytest.fixture(scope='module')
+def http_api(server):
+    with API(url=server.url, key="benchmark") as api:
+        yield api
+
+
+@pytest.fixture(params=['local', 'http'])
+def api(request):
+    return request.getfixturevalue('{}_api'.format(request.param))
+
+
+@pytest.fixture(scope='module')
+def records(fake):
+    return fake.objects_read({})
+
+
+class TestRequest:
+
+    def test_version(self, benchmark, api):
+        assert benchmark(api.request, 'idoit.version')['version'] == '1.14.2'
+
+    def test_objects_read(self, benchmark, api):
+        result = benchmark(api.request, 'cmdb.objects.read', {'limit': '0,100'})
+        assert len(result) == 100
+
+    def test_category_read(self, benchmark, api, fake):
+        obj_id = min(fake.objects)
+        result = benchmark(api.request, 'cmdb.category.read', {'objID': obj_id, 'category': 'C__CATG__IP'})
+        assert result[0]['hostname'] == 'server-000000'
+
+    def test_latency_under_load(self, benchmark):
+        """100 reads from 16 threads against a server that answers every call after 2ms"""
+        slow = FakeIdoit(call_latency=0.002)
+        slow.populate(100)
+        items = [{'objID': obj_id, 'category': 'C__CATG__IP'} for obj_id in slow.objects]
+        with FakeIdoitServer(slow) as server:
+            ep = CMDBCategoryEndpoint(api=API(url=server.url, key="benchmark"), permission_level=DELETE_ENTRIES)
+            results = benchmark.pedantic(lambda: list(ep.read_many(items, max_workers=16)), rounds=5)
+        assert len(results) == 100 and all(r.ok for r in results)
+
+
+class TestBatchRequest:
+
+    @pytest.mark.parametrize('size', [10, 100])
+    def test_category_reads(self, benchmark, api, fake, size):
+        calls = [('cmdb.category.read', {'objID': obj_id, 'category': 'C__CATG__IP'})
+                 for obj_id in sorted(fake.objects)[:size]]
+        results = benchmark(api.batch_request, calls)
+        assert len(results) == size and all(r.ok for r in results)
+
+    def test_mixed_errors(self, benchmark, local_api):
+        calls = [('idoit.version', {}), ('cmdb.unknown.read', {})] * 50
+        results = benchmark(local_api.batch_request, calls)
+        assert sum(r.ok for r in results) == 50
+
+
+class TestEndpointCRUD:
+
+    def test_create_read_update_delete(self, benchmark, api, fake):
+        ep = CMDBCategoryEndpoint(api=api, permission_level=DELETE_ENTRIES)
+        obj_id = fake.add_object('benchmark')
+
+        def crud():
+            entry_id = ep.create(objID=obj_id, category='C__CATG__IP', data={'hostname': 'bench'})['id']
+            ep.read(objID=obj_id, category='C__CATG__IP')
+            ep.update(objID=obj_id, category='C__CATG__IP', data={'category_id': entry_id, 'domain': 'example.de'})
+            return ep.delete(objID=obj_id, category='C__CATG__IP', id=entry_id)
+
+        assert benchmark(crud)['success']
+
+    def test_objects_page(self, benchmark, api):
+        ep = CMDBObjectsEndpoint(api=api, permission_level=DELETE_ENTRIES)
+        assert len(benchmark(ep.read_page, 0, 500)) == 500
+
+
+class TestDocuments:
+
+    def test_cmdb_document(self, benchmark, records):
+        documents = benchmark(lambda: [CMDBDocument(r) for r in records])
+        assert len(documents) == len(records)
+
+    def test_compact_document(self, benchmark, records):
+        documents = benchmark(lambda: [CompactDocument(r) for r in records])
+        assert documents[0].title == 'server-000000'
+
+    def test_compact_category_entry(self, benchmark, fake):
+        entries = [dict(data, id=str(entry_id)) for entry_id, (_, _, _, data) in fake.entries.items()]
+        documents = benchmark(lambda: [CompactCategoryEntry(e) for e in entries])
+        assert len(documents) == len(entries)
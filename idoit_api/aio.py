@@ -0,0 +1,303 @@
+import asyncio
+import time
+
+from collections import deque
+from idoit_api.base import API
+from idoit_api.const import *
+from idoit_api.exceptions import AuthenticationError
+from idoit_api.microbatch import AsyncMicroBatcher
+from idoit_api.singleflight import AsyncSingleFlight
+from idoit_api.transport import AiohttpTransport, ThreadedAsyncTransport, aiohttp
+from idoit_api.utils import chunked, is_read_only_method
+
+
+class AsyncAPI(API):
+    """Asyncio variant of API
+
+    Credentials, header building and response evaluation are shared with API, but login, logout, request,
+    batch_request and close are coroutines. At most max_concurrency requests are in flight at the same time,
+    all of them share the connection pool of the transport. It is a context manager for 'async with' only, and
+    stream_request is only available on API.
+
+    Endpoints created with an AsyncAPI offer the coroutines acreate, aread, aupdate, adelete and asave.
+
+    Example:
+        async with AsyncAPI(url=url, key=key, username=user, password=pw) as api:
+            await api.login()
+            ep = CMDBCategoryEndpoint(api=api, permission_level=READ_DATA)
+            entries = await asyncio.gather(*[ep.aread(objID=i, category='C__CATG__GLOBAL') for i in ids])
+    """
+
+    def __init__(self, url=None, key=None, username=None, password=None, transport=None,
+                 pool_size=None, timeout=DEFAULT_TIMEOUT, max_concurrency=DEFAULT_MAX_CONCURRENCY, *args, **kwargs):
+        """Setup the attributes needed for requests and logging
+
+        :param transport: Async transport, defaults to AiohttpTransport if aiohttp is installed,
+                          ThreadedAsyncTransport otherwise
+        :type transport: idoit_api.transport.AsyncBaseTransport
+        :param pool_size: Connection pool size of the default transport, defaults to max_concurrency
+        :type pool_size: int
+        :param max_concurrency: Maximum number of requests in flight
+        :type max_concurrency: int
+
+        See API for the remaining parameters
+        """
+        if kwargs.get('limiter') is not None:
+            raise ValueError("AsyncAPI limits the requests in flight with max_concurrency, limiter is not supported")
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._login_lock_async = None
+        super().__init__(url=url, key=key, username=username, password=password, transport=transport,
+                         pool_size=pool_size or max_concurrency, timeout=timeout, *args, **kwargs)
+
+    _single_flight_class = AsyncSingleFlight
+    _micro_batcher_class = AsyncMicroBatcher
+
+    @staticmethod
+    def _default_transport(pool_size, timeout):
+        if aiohttp is not None:
+            return AiohttpTransport(pool_size=pool_size, timeout=timeout)
+        return ThreadedAsyncTransport(max_workers=pool_size)
+
+    @property
+    def semaphore(self):
+        # created lazily, so it binds to the event loop the first request runs in
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def __enter__(self):
+        raise TypeError("AsyncAPI has to be used with 'async with' instead of 'with'")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        raise TypeError("AsyncAPI has to be used with 'async with' instead of 'with'")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """Closes the transport and all connections it keeps open"""
+        if self._micro_batcher is not None:
+            await self._micro_batcher.close()
+        await self.transport.close()
+
+    @property
+    def login_lock(self):
+        if self._login_lock_async is None:
+            self._login_lock_async = asyncio.Lock()
+        return self._login_lock_async
+
+    async def login(self, username=None, password=None):
+        """Obtains session ID from the CMDB if none is set, by logging in with username and password
+
+        Unlike API.login, the session store is not locked while logging in, so concurrent processes may log in
+        at the same time. Coroutines of this AsyncAPI still log in only once.
+
+        :param username: Overrides the current username value
+        :type username: str
+        :param password: Overrides the current password value
+        :type password: str
+        """
+        async with self.login_lock:
+            return await self._login_once(username, password)
+
+    async def _login_once(self, username=None, password=None):
+        if self.session_id:
+            return True
+
+        user = username or self.username
+        if self.session_store is not None:
+            session_id = self.session_store.get(self.url, user)
+            if session_id:
+                self.session_id = session_id
+                return True
+
+        await self._login(username, password)
+        if self.session_store is not None:
+            self.session_store.set(self.url, user, self.session_id)
+        return True
+
+    async def _login(self, username=None, password=None):
+        self.login_count += 1
+        self.metrics.record_login()
+        result = await self.request(
+            "idoit.login",
+            headers=self._build_login_headers(username, password)
+        )
+        self.log.debug('result of login: %s', result)
+        self.session_id = result["session-id"]
+        return True
+
+    async def relogin(self, stale_session_id=None):
+        """Replaces an expired session, only once even if many coroutines call this at the same time
+
+        :param stale_session_id: The session the caller got an AuthenticationError for
+        :type stale_session_id: str
+        :return: Whether there is a new session, False if no credentials are available to log in
+        :rtype: bool
+        """
+        async with self.login_lock:
+            if self.session_id and self.session_id != stale_session_id:
+                return True
+            self._invalidate_session(stale_session_id)
+            if not (self.username and self.password):
+                return False
+            return await self._login_once()
+
+    async def _with_relogin(self, method, func, *args, **kwargs):
+        session_id = self.session_id
+        try:
+            return await func(*args, **kwargs)
+        except AuthenticationError:
+            if method in ('idoit.login', 'idoit.logout') or not await self.relogin(session_id):
+                raise
+            self.log.info('Session expired, retrying %s with new session', method)
+            self.metrics.record_relogin(method)
+        return await func(*args, **kwargs)
+
+    async def _with_retry(self, method, func, *args, **kwargs):
+        """Coroutine variant of API._with_retry, waits with asyncio.sleep instead of the sleep of the policy"""
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as err:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(err)
+                if self.retry is None or not self.retry.should_retry(method, err, attempt):
+                    raise
+                await asyncio.sleep(self._record_retry(method, err, attempt))
+                attempt += 1
+                continue
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record()
+            return result
+
+    async def logout(self):
+        await self.request("idoit.logout")
+        self.session_id = None
+        return True
+
+    async def request(self, method, params=None, headers=None):
+        """Sends a POST request with JSON body to specified URL, see API.request
+
+        :raises: AuthenticationError, InvalidParams, InternalError, MethodNotFound, UnknownError
+        :return: dictionary with results from CMDB JSON API
+        :rtype: dict
+        """
+        cacheable = self.cache is not None and not headers and is_read_only_method(method)
+        if cacheable:
+            hit, result = self.cache.get(method, params)
+            if hit:
+                self.metrics.record_cache_hit(method)
+                return result
+
+        if self.single_flight is not None and not headers and is_read_only_method(method):
+            result, shared = await self.single_flight.do(
+                self.single_flight.make_key(method, params), self._timed_request, method, params, headers)
+            if shared:
+                self.metrics.record_coalesced(method)
+                return result
+        else:
+            result = await self._timed_request(method, params, headers)
+
+        if cacheable:
+            self.cache.set(method, params, result)
+        return result
+
+    async def _timed_request(self, method, params=None, headers=None):
+        start = time.perf_counter()
+        try:
+            result = await self._with_retry(method, self._with_relogin, method, self._send_request, method, params,
+                                            headers)
+        except Exception as err:
+            self.metrics.record_request(method, time.perf_counter() - start, err)
+            raise
+        self.metrics.record_request(method, time.perf_counter() - start)
+        return result
+
+    async def _send_request(self, method, params=None, headers=None):
+        # calls with their own headers, like idoit.login, cannot share a batch
+        if self._micro_batcher is not None and not headers:
+            return await self._micro_batcher.submit(self.build_request_body(method, params))
+
+        request_headers = self._build_request_headers(headers)
+        self.log.debug('Request to be sent: %s %s', method, params)
+
+        response = await self._post_data(method, self._encode_request(method, params), request_headers)
+        return self._evaluate_response(response)['result']
+
+    def stream_request(self, method, params=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """Streaming needs a blocking transport, use API.stream_request or await request instead"""
+        raise TypeError("AsyncAPI does not support stream_request, use API for streaming or 'await request()'")
+
+    async def batch_request(self, calls, chunk_size=DEFAULT_BATCH_SIZE):
+        """Performs multiple requests to the API using JSON-RPC batches, see API.batch_request
+
+        Chunks are sent concurrently, at most max_concurrency at a time. Further chunks are only taken from calls
+        when one of them completed, so calls may be a generator of any length.
+
+        :return: One CallResult per call, in the order of the input
+        :rtype: list[idoit_api.results.CallResult]
+        """
+        results = []
+        in_flight = deque()
+        index = 0
+        try:
+            for chunk in chunked(calls, chunk_size):
+                if len(in_flight) >= self.max_concurrency:
+                    results.extend(await in_flight.popleft())
+                in_flight.append(asyncio.ensure_future(self._execute_batch(chunk, start_index=index)))
+                index += len(chunk)
+            while in_flight:
+                results.extend(await in_flight.popleft())
+        finally:
+            for task in in_flight:
+                task.cancel()
+        return results
+
+    async def iter_batch(self, calls, chunk_size=DEFAULT_BATCH_SIZE):
+        """Like batch_request, but sends one chunk after the other and yields results as they arrive
+
+        :return: async generator of CallResult, in the order of the input
+        """
+        index = 0
+        for chunk in chunked(calls, chunk_size):
+            for result in await self._execute_batch(chunk, start_index=index):
+                yield result
+            index += len(chunk)
+
+    async def _execute_batch(self, calls, start_index=0):
+        start = time.perf_counter()
+        try:
+            results = await self._with_retry(self._batch_methods(calls), self._with_relogin, 'batch', self._send_batch,
+                                             calls, start_index)
+        except Exception as err:
+            self.metrics.record_request('batch', time.perf_counter() - start, err)
+            raise
+        self.metrics.record_request('batch', time.perf_counter() - start)
+        self.metrics.record_batch(results)
+        return results
+
+    async def _send_batch(self, calls, start_index):
+        results, pending, bodies = self._prepare_batch(calls, start_index)
+        if bodies:
+            self.log.debug('Sending batch of %s calls', len(bodies))
+            self._collect_batch(await self._post(bodies, self._build_request_headers({})), pending)
+        return results
+
+    async def _post(self, payload, headers):
+        method = payload.get('method') if isinstance(payload, dict) else 'batch'
+        return await self._post_data(method, self._encode(payload), headers)
+
+    async def _post_data(self, method, data, headers):
+        data, headers = self._compress(data, headers)
+        async with self.semaphore:
+            response = await self.transport.post(self.url, data, headers)
+        self.metrics.record_transfer(method, len(data), len(response.content))
+        return self._decode(response)
@@ -1,13 +1,30 @@
-import requests
+import keyword
 import os
+import sys
+import threading
+import time
 
 from abc import ABC
-from functools import partial
-from itertools import chain
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial, wraps
+from itertools import chain, count
 from idoit_api.const import *
 from idoit_api.const import CATEGORY_CONST_MAPPING
+from idoit_api.codec import get_codec
+from idoit_api.frame import ResultFrame
 from idoit_api.mixins import LoggingMixin, PermissionMixin
-from idoit_api.exceptions import InvalidParams, InternalError, MethodNotFound, UnknownError, AuthenticationError
+from idoit_api.metrics import Metrics
+from idoit_api.microbatch import MicroBatcher
+from idoit_api.results import CallResult
+from idoit_api.retry import CircuitBreaker, RetryPolicy
+from idoit_api.singleflight import SingleFlight
+from idoit_api.streaming import ChunkReader, iter_result
+from idoit_api.transport import RequestsTransport, TransportResponse, compress_body
+from idoit_api.utils import chunked, is_read_only_method
+from idoit_api.exceptions import (
+    APIException, InvalidParams, InternalError, MethodNotFound, UnknownError, AuthenticationError, ServerError
+)
 
 
 class API(LoggingMixin):
@@ -29,7 +46,10 @@ class API(LoggingMixin):
     @session_id.setter
     def session_id(self, value):
         self._session_id = value
-        os.environ['CMDB_SESSION_ID'] = value
+        if value:
+            os.environ['CMDB_SESSION_ID'] = value
+        else:
+            os.environ.pop('CMDB_SESSION_ID', None)
 
     @property
     def url(self):
@@ -58,7 +78,11 @@ class API(LoggingMixin):
         self._password = value
         os.environ['CMDB_PASS'] = value
 
-    def __init__(self, url=None, key=None, username=None, password=None, *args, **kwargs):
+    def __init__(self, url=None, key=None, username=None, password=None, transport=None,
+                 pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, micro_batch_window=None,
+                 micro_batch_size=DEFAULT_BATCH_SIZE, cache=None, session_store=None, metrics=None, codec=None,
+                 retry=None, circuit_breaker=None, limiter=None, single_flight=False, compress_threshold=None,
+                 compress_encoding='gzip', *args, **kwargs):
         """Setup the attributes needed for requests and logging
 
         :param url: URL to access the JSON-RPC API
@@ -69,6 +93,44 @@ class API(LoggingMixin):
         :type username: str
         :param password: Password
         :type password: str
+        :param transport: Transport used to send requests, defaults to a pooled RequestsTransport
+        :type transport: idoit_api.transport.BaseTransport
+        :param pool_size: Connection pool size of the default transport
+        :type pool_size: int
+        :param timeout: Timeout of the default transport, either one value or a (connect, read) tuple in seconds
+        :type timeout: float or tuple
+        :param micro_batch_window: Enables micro batching, concurrent calls of request are collected for this many
+                                   seconds and sent as one JSON-RPC batch. See idoit_api.microbatch.MicroBatcher
+        :type micro_batch_window: float
+        :param micro_batch_size: Maximum number of calls in a micro batch, a full batch is sent right away
+        :type micro_batch_size: int
+        :param cache: Cache for results of read-only methods, disabled by default
+        :type cache: idoit_api.cache.ResponseCache
+        :param session_store: Shares sessions with other processes, e.g. idoit_api.session.FileSessionStore
+        :type session_store: idoit_api.session.FileSessionStore
+        :param metrics: Collects latencies, sizes and errors of all requests, see stats. Pass an instance to share
+                        it between several APIs
+        :type metrics: idoit_api.metrics.Metrics
+        :param codec: JSON codec or its name, defaults to the fastest installed one, see idoit_api.codec.get_codec
+        :type codec: idoit_api.codec.JSONCodec or str
+        :param retry: Decides which requests are repeated after connection and server errors, defaults to a
+                      RetryPolicy that retries methods without side effects. False disables retries
+        :type retry: idoit_api.retry.RetryPolicy
+        :param circuit_breaker: Fails requests fast while the CMDB is down, defaults to a CircuitBreaker with default
+                                settings. False disables it
+        :type circuit_breaker: idoit_api.retry.CircuitBreaker
+        :param limiter: Limits the requests in flight and adapts the limit to the latency of the CMDB, disabled by
+                        default. Pass an instance to share it between several APIs
+        :type limiter: idoit_api.limiter.ConcurrencyLimiter
+        :param single_flight: Identical calls of read-only methods that are in flight at the same time are sent only
+                              once and share the result, see idoit_api.singleflight.SingleFlight
+        :type single_flight: bool
+        :param compress_threshold: Request bodies of at least this many bytes are compressed, disabled by default.
+                                   The web server of the CMDB has to decompress them, e.g. Apache with the DEFLATE
+                                   input filter. Compressed responses are accepted regardless of this setting
+        :type compress_threshold: int
+        :param compress_encoding: Content-Encoding of compressed request bodies, 'gzip' or 'deflate'
+        :type compress_encoding: str
         """
 
         self._key = None
@@ -84,20 +146,183 @@ class API(LoggingMixin):
         self.username = username or self.username
         self.password = password or self.password
 
+        self.transport = transport or self._default_transport(pool_size, timeout)
+        # JSON-RPC request ids, unique per instance so responses of a batch can be matched to their requests
+        self._request_ids = count(1)
+        self.codec = get_codec(codec)
+        # encoded start of the request envelope by method and api key, see _encode_request
+        self._envelopes = {}
+        self.cache = cache
+        self.session_store = session_store
+        self.metrics = metrics or Metrics()
+        self.retry = RetryPolicy() if retry is None else retry or None
+        self.circuit_breaker = CircuitBreaker() if circuit_breaker is None else circuit_breaker or None
+        if self.circuit_breaker is not None and self.circuit_breaker.on_change is None:
+            self.circuit_breaker.on_change = self.metrics.record_circuit
+        self.limiter = limiter
+        self.single_flight = self._single_flight_class() if single_flight else None
+        self.compress_threshold = compress_threshold
+        self.compress_encoding = compress_encoding
+        self.login_count = 0
+        self._login_lock = threading.RLock()
+        self._micro_batcher = None
+        if micro_batch_window is not None:
+            self._micro_batcher = self._micro_batcher_class(self, window=micro_batch_window, max_size=micro_batch_size)
+
         super().__init__(*args, **kwargs)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Closes the transport and all connections it keeps open"""
+        if self._micro_batcher is not None:
+            self._micro_batcher.close()
+        self.transport.close()
+
+    # coalesces identical reads in flight if single_flight is enabled, see request
+    _single_flight_class = SingleFlight
+    # collects concurrent calls into batches if micro_batch_window is set, see _send_request
+    _micro_batcher_class = MicroBatcher
+
+    @staticmethod
+    def _default_transport(pool_size, timeout):
+        return RequestsTransport(pool_size=pool_size, timeout=timeout)
+
     def login(self, username=None, password=None):
         """Obtains session ID from the CMDB if none is set, by logging in with username and password
 
+        If a session store is set, a session stored by another process is reused and a new session is stored.
+
         :param username: Overrides the current username value
         :type username: str
         :param password: Overrides the current password value
         :type password: str
         """
 
-        if self.session_id:
+        with self._login_lock:
+            if self.session_id:
+                return True
+
+            if self.session_store is None:
+                return self._login(username, password)
+
+            user = username or self.username
+            with self.session_store.lock():
+                session_id = self.session_store.get(self.url, user)
+                if session_id:
+                    self.log.debug('Reusing stored session for %s', user)
+                    self.session_id = session_id
+                    return True
+                self._login(username, password)
+                self.session_store.set(self.url, user, self.session_id)
             return True
 
+    def _login(self, username=None, password=None):
+        self.login_count += 1
+        self.metrics.record_login()
+        result = self.request(
+            "idoit.login",
+            headers=self._build_login_headers(username, password)
+        )
+        self.log.debug('result of login: %s', result)
+        self.session_id = result["session-id"]
+        return True
+
+    def relogin(self, stale_session_id=None):
+        """Replaces an expired session, only once even if many threads call this at the same time
+
+        Threads that wait for the lock find that the session was already replaced and return right away.
+
+        :param stale_session_id: The session the caller got an AuthenticationError for
+        :type stale_session_id: str
+        :return: Whether there is a new session, False if no credentials are available to log in
+        :rtype: bool
+        """
+        with self._login_lock:
+            if self.session_id and self.session_id != stale_session_id:
+                return True
+            self._invalidate_session(stale_session_id)
+            if not (self.username and self.password):
+                return False
+            return self.login()
+
+    def _invalidate_session(self, session_id):
+        """Forgets a session that the CMDB rejected, unless it was replaced in the meantime"""
+        if not session_id:
+            return
+        if self.session_id == session_id:
+            self.session_id = None
+        if self.session_store is not None:
+            self.session_store.delete(self.url, self.username, session_id)
+
+    def _with_relogin(self, method, func, *args, **kwargs):
+        """Calls func, on AuthenticationError the session is replaced and func is called once more
+
+        :param method: API method func sends, login and logout are never retried
+        :type method: str
+        """
+        session_id = self.session_id
+        try:
+            return func(*args, **kwargs)
+        except AuthenticationError:
+            if method in ('idoit.login', 'idoit.logout') or not self.relogin(session_id):
+                raise
+            self.log.info('Session expired, retrying %s with new session', method)
+            self.metrics.record_relogin(method)
+        return func(*args, **kwargs)
+
+    def _with_retry(self, method, func, *args, **kwargs):
+        """Calls func, on transient errors it is called again as often as the retry policy allows
+
+        Every attempt has to pass the circuit breaker first and its outcome is recorded by the breaker.
+
+        :param method: API method func sends, or the list of methods of a batch
+        :type method: str or list
+        :raises: CircuitOpenError if the circuit breaker is open
+        """
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as err:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(err)
+                if self.retry is None or not self.retry.should_retry(method, err, attempt):
+                    raise
+                delay = self._record_retry(method, err, attempt)
+                self.retry.sleep(delay)
+                attempt += 1
+                continue
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record()
+            return result
+
+    def _record_retry(self, method, error, attempt):
+        """Logs and records a retry, returns the delay before it"""
+        delay = self.retry.delay(attempt)
+        name = method if isinstance(method, str) else 'batch'
+        self.log.warning('%s failed with %r, retry %s in %.2fs', name, error, attempt + 1, delay)
+        self.metrics.record_retry(name, attempt + 1, delay, error)
+        return delay
+
+    @staticmethod
+    def _batch_methods(calls):
+        """Returns the methods of the valid calls of a batch, see _parse_batch_call"""
+        methods = []
+        for call in calls:
+            if isinstance(call, dict):
+                methods.append(call.get('method'))
+            elif isinstance(call, (tuple, list)) and call:
+                methods.append(call[0])
+        return [m for m in methods if isinstance(m, str) and m]
+
+    def _build_login_headers(self, username=None, password=None):
         user = username or self.username
         pw = password or self.password
 
@@ -110,19 +335,11 @@ class API(LoggingMixin):
                 message=" idoit.login' failed, no password was set and env var 'CMDB_PASS' is empty!"
             )
 
-        headers = {
+        return {
             "X-RPC-Auth-Username": user,
             "X-RPC-Auth-Password": pw
         }
 
-        result = self.request(
-            "idoit.login",
-            headers=headers
-        )
-        self.log.debug('result of login: ' % result)
-        self.session_id = result["session-id"]
-        return True
-
     def logout(self):
         self.request("idoit.logout")
         self.session_id = None
@@ -137,72 +354,423 @@ class API(LoggingMixin):
         :type params: dict
         :param headers: Extra headers to be sent with the request
         :type headers: dict
-        :raises: AuthenticationError, InvalidParams, InternalError, MethodNotFound, UnknownError
+        :raises: AuthenticationError, InvalidParams, InternalError, MethodNotFound, UnknownError, ServerError,
+                 CircuitOpenError, or the connection error of the transport once retries are exhausted
         :return: dictionary with results from CMDB JSON API
         :rtype: dict
         """
         self.log.debug('parameters passed to request - method: %s, params: %s, headers: %s', method, params, headers)
 
-        self.log.debug('API attributes username: %s  key: %s, pw: %s', self.username, self.key, self.password)
+        cacheable = self.cache is not None and not headers and is_read_only_method(method)
+        if cacheable:
+            hit, result = self.cache.get(method, params)
+            if hit:
+                self.metrics.record_cache_hit(method)
+                return result
+
+        if self.single_flight is not None and not headers and is_read_only_method(method):
+            result, shared = self.single_flight.do(
+                self.single_flight.make_key(method, params), self._timed_request, method, params, headers)
+            if shared:
+                self.metrics.record_coalesced(method)
+                return result
+        else:
+            result = self._timed_request(method, params, headers)
 
-        request_content = {
-            "url": self.url,
-            "json": self.build_request_body(method, params),
-            "headers": self._build_request_headers(headers)
-        }
+        if cacheable:
+            self.cache.set(method, params, result)
+        return result
+
+    def _timed_request(self, method, params=None, headers=None):
+        start = time.perf_counter()
+        try:
+            result = self._with_retry(method, self._with_relogin, method, self._send_request, method, params, headers)
+        except Exception as err:
+            self.metrics.record_request(method, time.perf_counter() - start, err)
+            raise
+        self.metrics.record_request(method, time.perf_counter() - start)
+        return result
 
-        self.log.debug('Request to be sent: %s', request_content)
-        # self.log.info('Request to be sent: %s', request_content)
+    def _send_request(self, method, params=None, headers=None):
+        # calls with their own headers, like idoit.login, cannot share a batch
+        if self._micro_batcher is not None and not headers:
+            return self._micro_batcher.submit(self.build_request_body(method, params)).result()
 
-        response = requests.post(
-            **request_content
-        ).json()
+        request_headers = self._build_request_headers(headers)
+        self.log.debug('Request to be sent: %s %s', method, params)
+
+        response = self._post_data(method, self._encode_request(method, params), request_headers)
+        return self._evaluate_response(response)['result']
+
+    def stream_request(self, method, params=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """Sends a request and yields the items of its result array one at a time, while the response is received
+
+        Unlike request, the response is never held in memory as a whole, so memory stays bounded however large
+        the result is. Results are not cached and the request is not micro batched. If the session expired, the
+        request is repeated once with a new session, see request. Like request it passes the circuit breaker and the
+        limiter and is retried on transient errors, but only as long as no item was yielded.
+
+        :param method: API method / endpoint to target
+        :type method: str
+        :param params: Extra key: value attributes for the JSON body
+        :type params: dict
+        :param chunk_size: Number of bytes read from the response at once
+        :type chunk_size: int
+        :raises: AuthenticationError, InvalidParams, InternalError, MethodNotFound, UnknownError
+        :return: generator of result items
+        """
+        session_id = self.session_id
+        may_relogin = method not in ('idoit.login', 'idoit.logout')
+        attempt = 0
+        while True:
+            yielded = False
+            try:
+                for item in self._stream(method, params, chunk_size):
+                    yielded = True
+                    yield item
+                return
+            except AuthenticationError:
+                if yielded or not may_relogin or not self.relogin(session_id):
+                    raise
+                may_relogin = False
+                self.log.info('Session expired, retrying %s with new session', method)
+                self.metrics.record_relogin(method)
+            except Exception as err:
+                # once items were yielded, repeating the request would yield them again
+                if yielded or self.retry is None or not self.retry.should_retry(method, err, attempt):
+                    raise
+                self.retry.sleep(self._record_retry(method, err, attempt))
+                attempt += 1
+
+    def _stream(self, method, params, chunk_size):
+        """Sends one streaming request, guarded by the circuit breaker and the limiter like _post_data"""
+        data = self._encode_request(method, params)
+        self.log.debug('Streaming request to be sent: %s %s', method, params)
+
+        data, headers = self._compress(data, self._build_request_headers())
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+        limiter_start = self.limiter.acquire() if self.limiter is not None else None
+        start = time.perf_counter()
+        latency = None
+        stream = None
+        received = 0
+        error = None
+        try:
+            stream = self.transport.post_stream(self.url, data, headers, chunk_size=chunk_size)
+            reader = ChunkReader(stream)
+            status_code = getattr(stream, 'status_code', None)
+            if status_code is not None and not 200 <= status_code < 300 or not reader.starts_with('{'):
+                # most likely an error page of the web server, raises ServerError unless it is a JSON-RPC error
+                content = reader.rest()
+                received = reader.bytes_received
+                result = self._evaluate_response(self._decode(TransportResponse(status_code, content)))['result']
+                for item in result if isinstance(result, list) else [result]:
+                    yield item
+                return
+            if self.limiter is not None:
+                # the time the rest of the response takes depends on its size, not on the load of the CMDB
+                latency = self.limiter.clock() - limiter_start
+            try:
+                for item in iter_result(reader, self._evaluate_response):
+                    yield item
+            finally:
+                received = reader.bytes_received
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            if stream is not None:
+                stream.close()
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(error)
+            if self.limiter is not None:
+                self.limiter.release(limiter_start, error, latency=latency)
+            self.metrics.record_transfer(method, len(data), received)
+            self.metrics.record_request(method, time.perf_counter() - start, error)
+
+    def stats(self):
+        """Returns a snapshot of the metrics of this API
+
+        Per JSON-RPC method there are the number of calls, cache hits, errors by exception class, latency
+        percentiles in seconds and bytes sent and received. Whole batches are listed under the method 'batch'.
+        Counters of the cache, the micro batcher, the circuit breaker, the limiter and of the calls saved by
+        single_flight are included if they are enabled.
 
-        response = self._evaluate_response(response)
-        return response['result']
+        :rtype: dict
+        """
+        stats = self.metrics.snapshot()
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        if self.circuit_breaker is not None:
+            stats['circuit_breaker'] = self.circuit_breaker.stats()
+        if self.limiter is not None:
+            stats['limiter'] = self.limiter.stats()
+        if self.single_flight is not None:
+            stats['single_flight'] = self.single_flight.stats()
+        if self._micro_batcher is not None:
+            stats['micro_batch'] = {
+                'batches_sent': self._micro_batcher.batches_sent,
+                'calls_sent': self._micro_batcher.calls_sent,
+            }
+        return stats
 
-    def batch_request(self, request_dicts):
-        """Performs multiple requests to API at once
+    def invalidate_cache(self, obj_id=None):
+        """Drops cached results of an object, or all cached results if no obj_id is given
 
-        :param request_dicts:
-        :return:
+        :param obj_id: ID of the object that was changed
+        :type obj_id: int
+        """
+        if self.cache is not None:
+            self.cache.invalidate(obj_id)
+
+    def batch_request(self, calls, chunk_size=DEFAULT_BATCH_SIZE):
+        """Performs multiple requests to the API using JSON-RPC batches
+
+        Every call gets a unique request id, responses are matched back by that id and returned in the order of
+        the input. Calls are sent in chunks of chunk_size. Failing calls do not raise, their CallResult holds the
+        exception instead.
+
+        :param calls: Iterable of (method, params) tuples or dicts with the keys 'method' and 'params'
+        :type calls: iterable
+        :param chunk_size: Maximum number of calls per HTTP request
+        :type chunk_size: int
+        :raises: AuthenticationError, InvalidParams, InternalError, MethodNotFound, UnknownError if a whole batch fails
+        :return: One CallResult per call
+        :rtype: list[idoit_api.results.CallResult]
         """
+        return list(self.iter_batch(calls, chunk_size=chunk_size))
 
-        data = []
-        for rd in request_dicts:
-            if rd.get('method') and rd.get('params') and rd.get('apikey') and rd.get('jsonrpc') and rd.get('id'):
-                data.append(rd)
+    def iter_batch(self, calls, chunk_size=DEFAULT_BATCH_SIZE):
+        """Like batch_request, but yields results chunk by chunk
 
-        response = requests.post(url=self.url, json=data, headers=self._build_request_headers({}))
+        Only one chunk of calls and results is held in memory at a time, so calls can be a generator of any length.
+
+        :param calls: Iterable of (method, params) tuples or dicts with the keys 'method' and 'params'
+        :type calls: iterable
+        :param chunk_size: Maximum number of calls per HTTP request
+        :type chunk_size: int
+        :return: generator of CallResult, in the order of the input
+        """
+        index = 0
+        for chunk in chunked(calls, chunk_size):
+            start = time.perf_counter()
+            try:
+                results = self._with_retry(self._batch_methods(chunk), self._with_relogin, 'batch', self._execute_batch,
+                                           chunk, start_index=index)
+            except Exception as err:
+                self.metrics.record_request('batch', time.perf_counter() - start, err)
+                raise
+            self.metrics.record_request('batch', time.perf_counter() - start)
+            self.metrics.record_batch(results)
+
+            for result in results:
+                yield result
+            index += len(chunk)
+
+    def _execute_batch(self, calls, start_index=0):
+        """Sends calls as one JSON-RPC batch
+
+        :param calls: List of calls, see batch_request
+        :type calls: list
+        :param start_index: Index of the first call in the overall input
+        :type start_index: int
+        :return: One CallResult per call, in the order of calls
+        :rtype: list[idoit_api.results.CallResult]
+        """
+        results, pending, bodies = self._prepare_batch(calls, start_index)
+        if bodies:
+            self.log.debug('Sending batch of %s calls', len(bodies))
+            self._collect_batch(self._post(bodies, self._build_request_headers({})), pending)
+        return results
+
+    def _prepare_batch(self, calls, start_index):
+        """Builds the request bodies of a batch
+
+        :return: CallResults in input order, CallResults waiting for a response by request id, request bodies
+        :rtype: tuple
+        """
         results = []
-        # TODO check if this is possible
-        for r in response.json():
+        pending = {}
+        bodies = []
+        for index, call in enumerate(calls, start_index):
+            try:
+                method, params = self._parse_batch_call(call)
+            except InvalidParams as err:
+                results.append(CallResult(index, None, error=err))
+                continue
+
+            body = self.build_request_body(method, params)
+            result = CallResult(index, method, params)
+            results.append(result)
+            pending[body['id']] = result
+            bodies.append(body)
+        return results, pending, bodies
+
+    def _collect_batch(self, responses, pending):
+        """Stores the responses of a batch in their matching CallResult
+
+        :param responses: Decoded response of the batch request
+        :type responses: list
+        :param pending: CallResults by request id
+        :type pending: dict
+        """
+        if not isinstance(responses, list):
+            # the server rejected the batch as a whole, e.g. because authentication failed
+            self._evaluate_response(responses)
+            raise UnknownError(message="Expected a list of responses for batch request, got: {}".format(responses))
+
+        for response in responses:
+            result = pending.pop(response.get('id'), None)
+            if result is None:
+                self.log.warning('Received response for unknown request id: %s', response.get('id'))
+                continue
             try:
-                self._evaluate_response(r)
-                results.append(r.get('result'))
-            except (InvalidParams, InternalError, MethodNotFound, UnknownError, AuthenticationError) as err:
-                print(err)
+                result.result = self._evaluate_response(response)['result']
+            except APIException as err:
+                result.error = err
 
-        return results
+        for request_id, result in pending.items():
+            result.error = UnknownError(message="No response received for request id {}".format(request_id))
+
+    @staticmethod
+    def _parse_batch_call(call):
+        """Extracts method and params from a call passed to batch_request
+
+        :raises: InvalidParams
+        :return: method, params
+        :rtype: tuple
+        """
+        if isinstance(call, dict):
+            method, params = call.get('method'), call.get('params')
+        elif isinstance(call, (tuple, list)) and 1 <= len(call) <= 2:
+            method, params = call[0], call[1] if len(call) == 2 else None
+        else:
+            raise InvalidParams(message="Batch calls need to be (method, params) tuples or dicts, got: {!r}".format(
+                call))
+
+        if not isinstance(method, str) or not method:
+            raise InvalidParams(message="Batch call is missing a method: {!r}".format(call))
+        if params is not None and not isinstance(params, dict):
+            raise InvalidParams(message="Params of batch call need to be a dictionary: {!r}".format(call))
+        return method, params
+
+    def _post(self, payload, headers):
+        """Encodes payload as JSON, sends it through the transport and decodes the response
+
+        :param payload: JSON-RPC request object or list of them
+        :type payload: dict or list
+        :param headers: Request headers
+        :type headers: dict
+        :return: decoded JSON response
+        :rtype: dict or list
+        """
+        method = payload.get('method') if isinstance(payload, dict) else 'batch'
+        return self._post_data(method, self._encode(payload), headers)
+
+    def _post_data(self, method, data, headers):
+        """Sends an encoded request through the transport and decodes the response
+
+        :param method: API method, or 'batch', the request is recorded under
+        :type method: str
+        :param data: Encoded request
+        :type data: bytes
+        :param headers: Request headers
+        :type headers: dict
+        :return: decoded JSON response
+        :rtype: dict or list
+        """
+        data, headers = self._compress(data, headers)
+        if self.limiter is None:
+            response = self.transport.post(self.url, data, headers)
+        else:
+            start = self.limiter.acquire()
+            try:
+                response = self.transport.post(self.url, data, headers)
+            except Exception as err:
+                self.limiter.release(start, err)
+                raise
+            self.limiter.release(start, ServerError(status_code=response.status_code)
+                                 if response.status_code >= 500 else None)
+        self.metrics.record_transfer(method, len(data), len(response.content))
+        return self._decode(response)
+
+    def _compress(self, data, headers):
+        """Compresses a request body that reaches compress_threshold
+
+        :return: The body to send and its headers
+        :rtype: tuple
+        """
+        if self.compress_threshold is None or len(data) < self.compress_threshold:
+            return data, headers
+        headers = dict(headers, **{'content-encoding': self.compress_encoding})
+        return compress_body(data, self.compress_encoding), headers
+
+    def _encode(self, payload):
+        return self.codec.dumps(payload)
+
+    def _decode(self, response):
+        """Decodes a JSON-RPC response
+
+        :raises: ServerError if the response is no JSON-RPC response, e.g. an HTML error page with status 502
+        """
+        try:
+            data = self.codec.loads(response.content)
+        except ValueError:
+            data = None
+        if isinstance(data, list) or isinstance(data, dict) and ('result' in data or 'error' in data):
+            return data
+        raise ServerError(message="HTTP status {}, response is no JSON-RPC response".format(response.status_code),
+                          data=response.content[:500], status_code=response.status_code)
+
+    def _encode_request(self, method, params=None):
+        """Encodes a JSON-RPC request like build_request_body, without building the envelope dict
+
+        The start of the envelope, up to and including the apikey, is encoded once per method and key and reused,
+        so a call only encodes its params.
+
+        :param method: API method
+        :type method: str
+        :param params: Parameters of the call, they are not modified
+        :type params: dict
+        :rtype: bytes
+        """
+        if params and (not isinstance(params, dict) or 'apikey' in params):
+            return self._encode(self.build_request_body(method, params))
+
+        key = self.key
+        envelope = self._envelopes.get((method, key))
+        if envelope is None:
+            if not isinstance(method, str):
+                raise AttributeError("Invalid api method passed to _encode_request")
+            envelope = b''.join((b'{"jsonrpc":"2.0","method":', self.codec.dumps(method),
+                                 b',"params":{"apikey":', self.codec.dumps(key)))
+            self._envelopes[(method, key)] = envelope
+
+        request_id = str(next(self._request_ids)).encode('ascii')
+        if params:
+            # the encoded params without their opening brace continue the params object of the envelope
+            return b''.join((envelope, b',', self.codec.dumps(params)[1:], b',"id":', request_id, b'}'))
+        return b''.join((envelope, b'},"id":', request_id, b'}'))
 
     def build_request_body(self, method, params=None):
         if not isinstance(method, str):
             raise AttributeError("Invalid api method passed to _build_request_body")
 
-        params = params or {}
+        params = dict(params or {})
         params["apikey"] = self.key
         return {
             "method": method,
             "params": params,
             "jsonrpc": "2.0",
-            # TODO count up from class parameter here self._id += 1
-            "id": 0,
+            "id": next(self._request_ids),
         }
 
     def _build_request_headers(self, headers=None):
 
         h = headers or {}
         h['content-type'] = 'application/json'
+        h.setdefault('accept-encoding', 'gzip, deflate')
         if self.session_id:
             h["X-RPC-Auth-Session"] = self.session_id
         else:
@@ -222,8 +790,7 @@ class API(LoggingMixin):
                         raw_code=error_code
                     )
             if error_code == AuthenticationError.code:
-                self._session_id = None
-                del os.environ['CMDB_SESSION_ID']
+                # the session is invalidated by relogin, which knows which session the request was sent with
                 raise AuthenticationError(
                     data=error["data"],
                     raw_code=error_code
@@ -236,6 +803,25 @@ class API(LoggingMixin):
         return response
 
 
+def validated(func):
+    """Decorator for the API methods of endpoints, their keyword arguments are checked by _validate_request
+
+    The wrapper is a plain function, so the method is bound natively on every access. Subclasses of BaseEndpoint
+    that override one of VALIDATED_METHODS are wrapped automatically.
+
+    :param func: API method of an endpoint, e.g. read
+    :type func: callable
+    :return: wrapped method
+    :rtype: callable
+    """
+    @wraps(func)
+    def validating_method(self, **kwargs):
+        return self._validate_request(func.__get__(self, type(self)), **kwargs)
+
+    validating_method.validated = True
+    return validating_method
+
+
 class BaseEndpoint(ABC, PermissionMixin, LoggingMixin):
     """Base class for all Endpoints
 
@@ -266,6 +852,13 @@ class BaseEndpoint(ABC, PermissionMixin, LoggingMixin):
     REQUIRED_INTERCHANGEABLE_PARAMS = {}
     OPTIONAL_PARAMS = {}
     API_METHODS = ('create', 'read', 'update', 'delete')
+    ASYNC_API_METHODS = {'acreate': 'create', 'aread': 'read', 'aupdate': 'update', 'adelete': 'delete',
+                         'asave': 'save'}
+    # other methods that send the same API method as one of API_METHODS and share its validation rules
+    METHOD_ALIASES = {}
+    # methods whose parameters are validated, see validated
+    VALIDATED_METHODS = ('create', 'read', 'update', 'delete', 'save', 'batch_update',
+                         'acreate', 'aread', 'aupdate', 'adelete', 'asave')
 
     SORT_ASCENDING = 'ASC'
     SORT_DESCENDING = 'DESC'
@@ -301,104 +894,117 @@ class BaseEndpoint(ABC, PermissionMixin, LoggingMixin):
                        intc=pd.get('interchangeable'), opt=pd.get('optional'))
         return s
 
-    def __getattribute__(self, item):
-        if item in ('create', 'read', 'update', 'delete', 'save', 'batch_update'):
-            return partial(self._validate_request, method=object.__getattribute__(self, item))
-        return object.__getattribute__(self, item)
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.VALIDATED_METHODS:
+            method = cls.__dict__.get(name)
+            if callable(method) and not getattr(method, 'validated', False):
+                setattr(cls, name, validated(method))
+        cls._compile_rules()
+
+    @classmethod
+    def _compile_rules(cls):
+        """Compiles the parameter rules of the class into lookup tables, once when the class is defined
+
+        _VALIDATORS maps the name of every API method, and of its async variant, to a tuple of its required
+        parameters and a tuple of its groups of interchangeable parameters. The entry None holds the rules that
+        apply to all methods.
+        _BODY_PARAMS holds all parameters that are passed on to the API.
+
+        :raise: AttributeError if a rule is neither a tuple nor True
+        """
+        rules = list(cls.REQUIRED_PARAMS.items()) + list(cls.REQUIRED_INTERCHANGEABLE_PARAMS.items())
+        for params, methods in rules:
+            if not isinstance(methods, tuple) and methods is not True:
+                raise AttributeError("Validation rules of {} are malformed, values need to be a tuple or True".format(
+                    cls.__name__))
+
+        method_names = set(cls.API_METHODS)
+        for params, methods in rules:
+            if methods is not True:
+                method_names.update(methods)
+
+        validators = {}
+        for method_name in [None] + sorted(method_names):
+            required = tuple(param for param, methods in cls.REQUIRED_PARAMS.items()
+                             if methods is True or method_name in methods)
+            interchangeable = tuple(frozenset(params) for params, methods in
+                                    cls.REQUIRED_INTERCHANGEABLE_PARAMS.items()
+                                    if methods is True or method_name in methods)
+            validators[method_name] = (required, interchangeable)
+
+        # async variants and aliases share the rules of their blocking counterparts
+        for alias, method_name in chain(cls.ASYNC_API_METHODS.items(), cls.METHOD_ALIASES.items()):
+            validators[alias] = validators.get(method_name, validators[None])
+
+        body_params = set(cls.REQUIRED_PARAMS) | set(cls.OPTIONAL_PARAMS)
+        for params in cls.REQUIRED_INTERCHANGEABLE_PARAMS:
+            body_params.update(params)
+
+        cls._VALIDATORS = validators
+        cls._BODY_PARAMS = frozenset(body_params)
+        cls._API_METHOD_SIGNATURE = cls._build_api_method_signature()
 
     def _validate_request(self, method, **kwargs):
-        """ Validates an API request body, based on constants defined in the class
+        """ Validates an API request body, based on the rules compiled from the constants of the class
 
         if required parameters are missing it throws the appropriate exception
 
         :param method: API CRUD class method to be validated
         :type method: callable
         :param kwargs: Parameters for method to be validated
-        :raise: InvalidParams, AttributeError
+        :raise: InvalidParams
         :return: passed method
         """
-        if kwargs is None:
-            raise InvalidParams(message="Please specify some parameters for the request")
-        if not isinstance(kwargs, dict):
-            raise InvalidParams(message="Parameters for the API call need to be a dictionary")
-        if 'obj' in kwargs and issubclass(kwargs.get('obj').__class__, CMDBDocument):
+        if 'obj' in kwargs and isinstance(kwargs.get('obj'), (CMDBDocument, CompactDocument)):
             kwargs.update(self._build_request_dict_from_obj(kwargs.get('obj')))
 
         self.log.debug('Parameters passed to _validate_request: %s', kwargs)
-        print('Parameters passed to _validate_request: ', kwargs)
-
-        for param, rules in self.REQUIRED_PARAMS.items():
-            if isinstance(rules, tuple):
-                # check if rule is applicable for this method
-                for method_name in rules:
-                    if method.__name__ is not method_name:
-                        continue
-                    if param not in kwargs or kwargs.get(param, None) is None:
-                        raise InvalidParams(message="Required parameter: {} is missing!".format(param))
-            # rule is applicable to all API methods
-            elif rules is True:
-                if param not in kwargs or kwargs.get(param, None) is None:
-                    raise InvalidParams(message="Required parameter: {} is missing!".format(param))
-            else:
-                raise AttributeError("Your validation dictionary is malformed, values need to be a tuple or True")
-
-            # check if none of mutually exclusive, but required params is present
-            for params, rs in self.REQUIRED_INTERCHANGEABLE_PARAMS.items():
-                if isinstance(rs, tuple):
-                    for method_name in rs:
-                        if method.__name__ is not method_name:
-                            continue
-
-                        found_key = False
-                        for key in params:
-                            if key in kwargs and kwargs.get(key, None) is not None:
-                                found_key = True
-                        if not found_key:
-                            raise InvalidParams(
-                                message="None of the mutually exclusive required parameters were passed: ".format(
-                                    params)
-                            )
-
-        return method(**{k: v for k, v in kwargs.items() if v is not None})
+
+        validators = type(self)._VALIDATORS
+        required, interchangeable = validators.get(method.__name__) or validators[None]
+
+        params = {k: v for k, v in kwargs.items() if v is not None}
+        for param in required:
+            if param not in params:
+                raise InvalidParams(message="Required parameter: {} is missing!".format(param))
+        # check if none of mutually exclusive, but required params is present
+        for group in interchangeable:
+            if group.isdisjoint(params):
+                raise InvalidParams(
+                    message="None of the mutually exclusive required parameters were passed: {}".format(
+                        sorted(group))
+                )
+
+        return method(**params)
 
     def _build_request_dict_from_obj(self, obj):
-        d = {}
-        for key in self.REQUIRED_PARAMS.keys():
-            d[key] = obj.__dict__.get(key)
-        for keys in self.REQUIRED_INTERCHANGEABLE_PARAMS.keys():
-            for key in keys:
-                d[key] = obj.__dict__.get(key)
-        for key in self.OPTIONAL_PARAMS.keys():
-            d[key] = obj.__dict__.get(key)
-        return d
+        if isinstance(obj, CompactDocument):
+            return {key: obj.get(key) for key in self._BODY_PARAMS}
+        return {key: obj.__dict__.get(key) for key in self._BODY_PARAMS}
 
     def _build_request_body(self, **kwargs):
-        d = {}
-        for k, v in kwargs.items():
-            if k in self.REQUIRED_PARAMS or k in self.OPTIONAL_PARAMS:
-                d[k] = v
-            for keys in self.REQUIRED_INTERCHANGEABLE_PARAMS.keys():
-                if k in keys:
-                    d[k] = v
-                    continue
-        return d
+        return {k: v for k, v in kwargs.items() if k in self._BODY_PARAMS}
 
     def _gen_api_method_signature(self):
-        """Maps all API methods to their parameters
+        """Maps all API methods to their parameters, the map is built once per class and must not be modified
 
         :return: Dict of dicts, keys are methods names, values are dicts which specify parameters
         :rtype: dict
         """
+        return self._API_METHOD_SIGNATURE
 
+    @classmethod
+    def _build_api_method_signature(cls):
         methods = {}
-        for m in self.API_METHODS:
+        for m in cls.API_METHODS:
             methods[m] = {
                 'required': [],
                 'interchangeable': [],
                 'optional': []
             }
         # add all required params
-        for param, ms in self.REQUIRED_PARAMS.items():
+        for param, ms in cls.REQUIRED_PARAMS.items():
             if isinstance(ms, bool):
                 for val in methods.values():
                     m_req = val.get('required', [])
@@ -410,7 +1016,7 @@ class BaseEndpoint(ABC, PermissionMixin, LoggingMixin):
                     if param not in m_req:
                         m_req.append(param)
         # add all params of which only one in the set must be present
-        for params, ms in self.REQUIRED_INTERCHANGEABLE_PARAMS.items():
+        for params, ms in cls.REQUIRED_INTERCHANGEABLE_PARAMS.items():
             if isinstance(ms, bool):
                 for val in methods.values():
                     m_req_i = val.get('interchangeable', [])
@@ -420,19 +1026,27 @@ class BaseEndpoint(ABC, PermissionMixin, LoggingMixin):
                     m_req_i = methods.get(m, {}).get('interchangeable', [])
                     m_req_i.extend([p for p in params if p not in m_req_i])
         # add all optional params
-        for m, params in self.OPTIONAL_PARAMS.items():
+        for m, params in cls.OPTIONAL_PARAMS.items():
             m_opt = methods.get(m, {}).get('optional', [])
             m_opt.extend([p for p in params if p != True and p not in m_opt])
 
         return methods
 
+    def _invalidate_cache(self, obj_id):
+        """Drops cached results of the object a write went to, writes without an objID leave the cache alone"""
+        if obj_id is not None:
+            self._api.invalidate_cache(obj_id)
+
     @PermissionMixin.check_permission_level(
         CREATE_ENTRIES, )  # TODO set dry_run_allowed=True after writing  dry run decorator
     def _create(self, **kwargs):
-        return self._api.request(
-            method=self.ENDPOINT + ".create",
-            params=self._build_request_body(**kwargs)
-        )
+        try:
+            return self._api.request(
+                method=self.ENDPOINT + ".create",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
 
     @PermissionMixin.check_permission_level(READ_DATA, )
     def _read(self, **kwargs):
@@ -443,41 +1057,202 @@ class BaseEndpoint(ABC, PermissionMixin, LoggingMixin):
 
     @PermissionMixin.check_permission_level(UPDATE_ENTRIES, )
     def _update(self, **kwargs):
-        return self._api.request(
-            method=self.ENDPOINT + ".update",
-            params=self._build_request_body(**kwargs)
-        )
+        try:
+            return self._api.request(
+                method=self.ENDPOINT + ".update",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
 
     @PermissionMixin.check_permission_level(UPDATE_ENTRIES, )
     def _save(self, **kwargs):
-        return self._api.request(
-            method=self.ENDPOINT + ".save",
-            params=self._build_request_body(**kwargs)
-        )
+        try:
+            return self._api.request(
+                method=self.ENDPOINT + ".save",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
 
     @PermissionMixin.check_permission_level(DELETE_ENTRIES, )
     def _delete(self, **kwargs):
-        return self._api.request(
-            method=self.ENDPOINT + ".delete",
-            params=self._build_request_body(**kwargs)
-        )
+        try:
+            return self._api.request(
+                method=self.ENDPOINT + ".delete",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
 
+    @validated
     def create(self, **kwargs):
         return self._create(**kwargs)
 
+    @validated
     def read(self, **kwargs):
         return self._read(**kwargs)
 
+    @validated
     def update(self, **kwargs):
         return self._update(**kwargs)
 
+    @validated
     def delete(self, **kwargs):
         return self._delete(**kwargs)
 
+    @validated
+    def save(self, **kwargs):
+        return self._save(**kwargs)
+
+    def create_many(self, items, max_workers=DEFAULT_MAX_WORKERS, ordered=False):
+        """Calls create once for every dict of parameters in items, see _fan_out"""
+        return self._fan_out('create', items, max_workers=max_workers, ordered=ordered)
+
+    def read_many(self, items, max_workers=DEFAULT_MAX_WORKERS, ordered=False):
+        """Calls read once for every dict of parameters in items, see _fan_out"""
+        return self._fan_out('read', items, max_workers=max_workers, ordered=ordered)
+
+    def update_many(self, items, max_workers=DEFAULT_MAX_WORKERS, ordered=False):
+        """Calls update once for every dict of parameters in items, see _fan_out"""
+        return self._fan_out('update', items, max_workers=max_workers, ordered=ordered)
+
+    def delete_many(self, items, max_workers=DEFAULT_MAX_WORKERS, ordered=False):
+        """Calls delete once for every dict of parameters in items, see _fan_out"""
+        return self._fan_out('delete', items, max_workers=max_workers, ordered=ordered)
+
+    def _fan_out(self, action, items, max_workers=DEFAULT_MAX_WORKERS, ordered=False):
+        """Executes an API method for many parameter dicts on a bounded thread pool
+
+        Every call goes through validation and permission checks like a single call would, all threads share the
+        API instance and with it the connection pool of its transport. Failing calls do not stop the others, their
+        exception is returned in the CallResult. Items are consumed lazily, at most 2 * max_workers calls are
+        submitted at a time.
+
+        :param action: Name of the API method, e.g. 'read'
+        :type action: str
+        :param items: Iterable of parameter dicts
+        :type items: iterable
+        :param max_workers: Number of threads
+        :type max_workers: int
+        :param ordered: Yield results in the order of items instead of as they complete
+        :type ordered: bool
+        :return: generator of CallResult, CallResult.index is the position of the item in items
+        """
+        call = getattr(self, action)
+        method = "{}.{}".format(self.ENDPOINT, action)
+
+        def execute(index, params):
+            try:
+                return CallResult(index, method, params, result=call(**params))
+            except Exception as err:
+                self.log.debug('%s failed for item %s: %r', method, index, err)
+                return CallResult(index, method, params, error=err)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='idoit_api') as executor:
+            pending = deque() if ordered else set()
+
+            for index, params in enumerate(items):
+                if len(pending) >= 2 * max_workers:
+                    for result in self._collect_futures(pending, ordered):
+                        yield result
+                future = executor.submit(execute, index, params)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+
+            while pending:
+                for result in self._collect_futures(pending, ordered):
+                    yield result
+
+    @staticmethod
+    def _collect_futures(pending, ordered):
+        """Removes and returns results of finished futures, waits for at least one to finish
+
+        :param pending: Futures in submission order if ordered is set, otherwise a set of futures
+        :type pending: deque or set
+        :rtype: list[idoit_api.results.CallResult]
+        """
+        if ordered:
+            return [pending.popleft().result()]
 
-class MultiResultEndpoint(BaseEndpoint):
-    # TODO implement!
-    pass
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        pending.difference_update(done)
+        return [future.result() for future in done]
+
+    # Async variants, these require the endpoint to be created with an idoit_api.aio.AsyncAPI
+
+    @PermissionMixin.check_permission_level(CREATE_ENTRIES, )
+    async def _acreate(self, **kwargs):
+        try:
+            return await self._api.request(
+                method=self.ENDPOINT + ".create",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
+
+    @PermissionMixin.check_permission_level(READ_DATA, )
+    async def _aread(self, **kwargs):
+        return await self._api.request(
+            method=self.ENDPOINT + ".read",
+            params=self._build_request_body(**kwargs)
+        )
+
+    @PermissionMixin.check_permission_level(UPDATE_ENTRIES, )
+    async def _aupdate(self, **kwargs):
+        try:
+            return await self._api.request(
+                method=self.ENDPOINT + ".update",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
+
+    @PermissionMixin.check_permission_level(UPDATE_ENTRIES, )
+    async def _asave(self, **kwargs):
+        try:
+            return await self._api.request(
+                method=self.ENDPOINT + ".save",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
+
+    @PermissionMixin.check_permission_level(DELETE_ENTRIES, )
+    async def _adelete(self, **kwargs):
+        try:
+            return await self._api.request(
+                method=self.ENDPOINT + ".delete",
+                params=self._build_request_body(**kwargs)
+            )
+        finally:
+            self._invalidate_cache(kwargs.get('objID'))
+
+    @validated
+    async def acreate(self, **kwargs):
+        return await self._acreate(**kwargs)
+
+    @validated
+    async def aread(self, **kwargs):
+        return await self._aread(**kwargs)
+
+    @validated
+    async def aupdate(self, **kwargs):
+        return await self._aupdate(**kwargs)
+
+    @validated
+    async def adelete(self, **kwargs):
+        return await self._adelete(**kwargs)
+
+    @validated
+    async def asave(self, **kwargs):
+        return await self._asave(**kwargs)
+
+
+# subclasses are compiled by __init_subclass__, which does not run for the class it is defined in
+BaseEndpoint._compile_rules()
 
 
 class CMDBDocument(LoggingMixin):
@@ -514,3 +1289,303 @@ class CMDBDocument(LoggingMixin):
 
     def _populate_custom(self, data=None):
         pass
+
+
+class CompactDocument:
+    """Memory efficient, read-only variant of CMDBDocument
+
+    Instantiating a CompactDocument subclass returns an instance of a class generated for the keys of data, once
+    per set of keys, with one __slot__ per key. Instances have no __dict__, no logging state and do not keep a copy
+    of data unless keep_raw is set. Short strings are interned and nested dicts of scalars, like the dialog values
+    i-doit returns for status or type, are shared between instances. Shared values must not be modified.
+
+    Keys that are no valid identifier, or that collide with a method, are available under a sanitized attribute
+    name, e.g. 'class' as 'class_'. to_dict always returns the original keys.
+
+    Example:
+        for entry in endpoint.iterate(document_class=CompactCategoryEntry):
+            print(entry.title, entry.to_dict())
+    """
+
+    __slots__ = ('_raw_data', )
+
+    # set on the generated classes, original keys and the attribute names they are stored in
+    FIELDS = ()
+    SLOTS = ()
+
+    # strings up to this length are interned
+    INTERN_MAX_LENGTH = 64
+    # maximum number of nested dicts shared between documents
+    SHARED_VALUES_MAX = 100000
+
+    _schemas = {}
+    _shared_values = {}
+    _schema_lock = threading.Lock()
+
+    def __new__(cls, data, keep_raw=False):
+        if not isinstance(data, dict):
+            raise TypeError("{} expects a dict, got {}".format(cls.__name__, type(data).__name__))
+        schema = cls.schema(tuple(data))
+        return object.__new__(schema)
+
+    def __init__(self, data, keep_raw=False):
+        """
+        :param data: dictionary of json data from API
+        :type data: dict
+        :param keep_raw: Keep a copy of data, returned by raw
+        :type keep_raw: bool
+        """
+        share = CompactDocument._share
+        setattr_ = object.__setattr__
+        for slot, value in zip(self.SLOTS, data.values()):
+            setattr_(self, slot, share(value))
+        setattr_(self, '_raw_data', data.copy() if keep_raw else None)
+
+    @classmethod
+    def schema(cls, fields):
+        """Returns the class generated for documents with the keys fields, generates it if needed
+
+        :param fields: Keys of the documents, in order
+        :type fields: tuple
+        :rtype: type
+        """
+        family = cls.__dict__.get('_family') or cls
+        key = (family, fields)
+        schema = CompactDocument._schemas.get(key)
+        if schema is not None:
+            return schema
+
+        with CompactDocument._schema_lock:
+            schema = CompactDocument._schemas.get(key)
+            if schema is None:
+                slots = family._slot_names(fields)
+                schema = type(family.__name__, (family, ), {
+                    '__slots__': slots,
+                    '__module__': family.__module__,
+                    '__qualname__': family.__qualname__,
+                    'FIELDS': tuple(sys.intern(f) for f in fields),
+                    'SLOTS': slots,
+                    '_family': family,
+                })
+                CompactDocument._schemas[key] = schema
+        return schema
+
+    @classmethod
+    def _slot_names(cls, fields):
+        slots = []
+        for field in fields:
+            name = ''.join(c if c.isalnum() or c == '_' else '_' for c in field) or '_'
+            if name[0].isdigit():
+                name = '_' + name
+            while keyword.iskeyword(name) or hasattr(cls, name) or name in slots:
+                name += '_'
+            slots.append(sys.intern(name))
+        return tuple(slots)
+
+    @staticmethod
+    def _share(value):
+        if isinstance(value, str):
+            return sys.intern(value) if len(value) <= CompactDocument.INTERN_MAX_LENGTH else value
+        if isinstance(value, dict):
+            items = tuple((sys.intern(k), CompactDocument._share(v)) for k, v in value.items())
+            try:
+                shared = CompactDocument._shared_values.get(items)
+            except TypeError:
+                # nested containers are not hashable, they are not shared
+                return dict(items)
+            if shared is None:
+                shared = dict(items)
+                if len(CompactDocument._shared_values) < CompactDocument.SHARED_VALUES_MAX:
+                    CompactDocument._shared_values[items] = shared
+            return shared
+        if isinstance(value, list):
+            return [CompactDocument._share(v) for v in value]
+        return value
+
+    def __setattr__(self, key, value):
+        raise AttributeError("{} is read-only".format(self.__class__.__name__))
+
+    def __reduce__(self):
+        # generated classes can not be imported, documents are pickled through the class they were created with
+        return self._family, (self.to_dict(), )
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.to_dict())
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactDocument):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def to_dict(self):
+        """Returns the data of the document as dict with the original keys
+
+        :rtype: dict
+        """
+        return {field: getattr(self, slot) for field, slot in zip(self.FIELDS, self.SLOTS)}
+
+    @property
+    def raw(self):
+        """The data the document was created from if keep_raw was set, to_dict() otherwise
+
+        :rtype: dict
+        """
+        return self._raw_data if self._raw_data is not None else self.to_dict()
+
+    def get(self, key, default=None):
+        """Returns the value of an original key, like dict.get"""
+        try:
+            return getattr(self, self.SLOTS[self.FIELDS.index(key)])
+        except ValueError:
+            return default
+
+
+class MultiResultEndpoint(BaseEndpoint):
+    """Base class for endpoints whose read method returns a list of documents, e.g. cmdb.objects
+
+    Results are paged through with the 'limit' parameter, which i-doit accepts as "offset,count". Iterating over
+    the endpoint, or over the result of iterate(), yields one DOCUMENT_CLASS instance per result. Pages are fetched
+    lazily and the next page is requested in the background while the current one is consumed, so at most two pages
+    are held in memory.
+
+    Example:
+        for obj in CMDBObjectsEndpoint(api=api).iterate(page_size=1000, filter={'type': 'C__OBJTYPE__SERVER'}):
+            print(obj.title)
+    """
+
+    REQUIRED_PARAMS = {}
+    OPTIONAL_PARAMS = {'limit': ('read', )}
+    API_METHODS = ('read', )
+    METHOD_ALIASES = {'stream': 'read'}
+    VALIDATED_METHODS = BaseEndpoint.VALIDATED_METHODS + ('stream', )
+
+    DOCUMENT_CLASS = CMDBDocument
+    PAGE_SIZE = DEFAULT_PAGE_SIZE
+
+    def __iter__(self):
+        return iter(self.iterate())
+
+    def stream(self, document_class=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, **kwargs):
+        """Reads all results with one request and yields them while the response is received
+
+        An alternative to iterate for CMDBs that answer one large request faster than many pages. Memory stays
+        bounded like with iterate, see API.stream_request.
+
+        :param document_class: Class of the documents, defaults to DOCUMENT_CLASS
+        :type document_class: type
+        :param chunk_size: Number of bytes read from the response at once
+        :type chunk_size: int
+        :param kwargs: Parameters for read, e.g. filter
+        :return: generator of documents
+        """
+        document_class = document_class or self.DOCUMENT_CLASS
+        for data in self._stream(chunk_size=chunk_size, **kwargs):
+            yield document_class(data)
+
+    @PermissionMixin.check_permission_level(READ_DATA, )
+    def _stream(self, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, **kwargs):
+        return self._api.stream_request(
+            method=self.ENDPOINT + ".read",
+            params=self._build_request_body(**kwargs),
+            chunk_size=chunk_size
+        )
+
+    def iterate(self, page_size=None, prefetch=True, document_class=None, **kwargs):
+        """Lazily iterates over all results of read
+
+        :param page_size: Number of results fetched per request, defaults to PAGE_SIZE
+        :type page_size: int
+        :param prefetch: Fetch the next page in a background thread while the current one is consumed
+        :type prefetch: bool
+        :param document_class: Class of the documents, e.g. a CompactDocument to keep many of them in memory
+        :type document_class: type
+        :param kwargs: Parameters for read, e.g. filter
+        :rtype: PagedResult
+        """
+        return PagedResult(self, page_size or self.PAGE_SIZE, prefetch=prefetch, params=kwargs,
+                           document_class=document_class)
+
+    def read_page(self, offset, page_size, **kwargs):
+        """Reads one page of results
+
+        :param offset: Number of results to skip
+        :type offset: int
+        :param page_size: Maximum number of results
+        :type page_size: int
+        :param kwargs: Parameters for read, e.g. filter
+        :return: List of raw result dicts
+        :rtype: list
+        """
+        return self.read(limit="{},{}".format(offset, page_size), **kwargs)
+
+
+class PagedResult:
+    """Lazy iterator over all results of a MultiResultEndpoint, see MultiResultEndpoint.iterate"""
+
+    def __init__(self, endpoint, page_size, prefetch=True, params=None, document_class=None):
+        """
+        :param endpoint: Endpoint to read from
+        :type endpoint: MultiResultEndpoint
+        :param page_size: Number of results fetched per request
+        :type page_size: int
+        :param prefetch: Fetch the next page in a background thread while the current one is consumed
+        :type prefetch: bool
+        :param params: Parameters for read
+        :type params: dict
+        :param document_class: Class of the yielded documents, defaults to the DOCUMENT_CLASS of endpoint
+        :type document_class: type
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1, got {}".format(page_size))
+        self.endpoint = endpoint
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.params = params or {}
+        self.document_class = document_class or endpoint.DOCUMENT_CLASS
+
+    def __iter__(self):
+        document_class = self.document_class
+        for page in self.pages():
+            for data in page:
+                yield document_class(data)
+
+    def pages(self):
+        """Yields the raw result lists page by page
+
+        :return: generator of lists of dicts
+        """
+        fetch = partial(self.endpoint.read_page, page_size=self.page_size, **self.params)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='idoit_api') if self.prefetch else None
+
+        try:
+            offset = 0
+            next_page = executor.submit(fetch, offset) if executor else None
+            while True:
+                page = next_page.result() if executor else fetch(offset)
+                page = page or []
+
+                offset += self.page_size
+                last_page = len(page) < self.page_size
+                if executor and not last_page:
+                    next_page = executor.submit(fetch, offset)
+
+                if page:
+                    yield page
+                if last_page:
+                    return
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+    def to_frame(self, fields=None, flatten=True):
+        """Collects all results into a columnar ResultFrame without creating a document per result
+
+        :param fields: Only keep these fields, see ResultFrame.from_records
+        :type fields: list
+        :param flatten: Store the keys of nested dicts in columns of their own
+        :type flatten: bool
+        :rtype: ResultFrame
+        """
+        return ResultFrame.from_records(self.pages(), fields=fields, flatten=flatten)
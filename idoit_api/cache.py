@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from idoit_api.const import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+
+
+class ResponseCache:
+    """Thread safe LRU cache with TTL for results of read-only API methods
+
+    Entries are keyed on the method and its normalized params, the apikey is ignored. Entries whose params contain
+    an 'objID' can be invalidated by that id, which BaseEndpoint does after every create, update, save and delete.
+
+    Cached results are shared between callers and must not be modified.
+
+    Example:
+        api = API(url=url, cache=ResponseCache(maxsize=10000, ttl=300))
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        """
+        :param maxsize: Maximum number of entries, the least recently used entry is evicted first
+        :type maxsize: int
+        :param ttl: Seconds an entry stays valid, None to keep entries until they are evicted or invalidated
+        :type ttl: float
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._keys_by_obj_id = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(method, params=None):
+        """Builds the cache key of a call, independent of the order of params and of the apikey
+
+        :rtype: tuple
+        """
+        params = {k: v for k, v in (params or {}).items() if k != 'apikey'}
+        return method, json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, method, params=None):
+        """Looks up the result of a call
+
+        :param method: API method
+        :type method: str
+        :param params: Parameters of the call
+        :type params: dict
+        :return: (True, result) on a hit, (False, None) otherwise
+        :rtype: tuple
+        """
+        key = self.make_key(method, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result, obj_id = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, result
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, method, params, result):
+        """Stores the result of a call
+
+        :param method: API method
+        :type method: str
+        :param params: Parameters of the call
+        :type params: dict
+        :param result: Result of the call
+        """
+        key = self.make_key(method, params)
+        obj_id = (params or {}).get('objID')
+        if obj_id is not None:
+            # 12 and '12' are the same object
+            obj_id = str(obj_id)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires, result, obj_id)
+            if obj_id is not None:
+                self._keys_by_obj_id.setdefault(obj_id, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, obj_id=None):
+        """Removes entries of an object, or all entries if no obj_id is given
+
+        :param obj_id: ID of the object whose entries are removed
+        :type obj_id: int
+        """
+        with self._lock:
+            if obj_id is None:
+                self._entries.clear()
+                self._keys_by_obj_id.clear()
+                return
+            for key in self._keys_by_obj_id.pop(str(obj_id), ()):
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Returns the counters of the cache
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def _remove(self, key):
+        expires, result, obj_id = self._entries.pop(key)
+        if obj_id is not None:
+            keys = self._keys_by_obj_id.get(obj_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_obj_id[obj_id]
@@ -7,6 +7,8 @@ from idoit_api.const import LOG_LEVEL_INFO, LOG_LEVEL_WARNING, LOG_LEVEL_ERROR,
 from idoit_api.__about__ import __version__
 from idoit_api.objects import IdoitEndpoint
 from idoit_api.base import API
+from idoit_api.search import SearchIndex
+from idoit_api.session import FileSessionStore
 from idoit_api.utils import del_env_credentials, cli_login_prompt, parse_env_file_to_vars
 
 
@@ -30,11 +32,11 @@ def main(ctx, permission_level, log_level, debug, env_file):
     if '--help' not in sys.argv:
         if env_file:
             parse_env_file_to_vars(env_file)
-            api = API(**ctx.obj)
+            api = API(session_store=FileSessionStore(), **ctx.obj)
             api.login()
         if not os.environ.get('CMDB_SESSION_ID'):
             cli_login_prompt()
-            api = API(**ctx.obj)
+            api = API(session_store=FileSessionStore(), **ctx.obj)
             api.login()
 
     return 0
@@ -48,7 +50,8 @@ def main(ctx, permission_level, log_level, debug, env_file):
 @click.pass_obj
 @click.help_option
 def login(obj, url, username, password, api_key):
-    api = API(url=url, key=api_key, username=username, password=password, **obj.copy())
+    api = API(url=url, key=api_key, username=username, password=password, session_store=FileSessionStore(),
+              **obj.copy())
     if api.login():
         click.echo("Successfully authenticated with the API at {}".format(url))
 
@@ -62,9 +65,11 @@ def reset_credentials():
 @main.command()
 @click.argument('query', type=str)
 @click.option('-m', '--mode', default='normal', type=click.Choice(['normal', 'deep', 'auto-deep']))
+@click.option('-i', '--index', type=click.Path(exists=True, dir_okay=False),
+              help="Search index file written by SearchIndex.save, answers normal mode searches locally")
 @click.pass_obj
-def search(obj, query, mode):
-    ep = IdoitEndpoint(**obj)
+def search(obj, query, mode, index):
+    ep = IdoitEndpoint(search_index=SearchIndex.load(index) if index else None, **obj)
     click.echo(ep.search(query, mode))
 
 
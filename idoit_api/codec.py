@@ -0,0 +1,99 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class JSONCodec:
+    """Encodes and decodes JSON-RPC messages with the json module of the standard library
+
+    Codecs encode to bytes and decode from bytes, which is what transports send and receive.
+    """
+
+    name = 'json'
+
+    # json.dumps builds a new encoder for every call with non default arguments
+    _encoder = json.JSONEncoder(separators=(',', ':'))
+
+    @classmethod
+    def dumps(cls, obj):
+        """
+        :rtype: bytes
+        """
+        return cls._encoder.encode(obj).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        """
+        :param data: JSON document
+        :type data: bytes
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """Codec using orjson, several times faster than the standard library, install with pip install orjson"""
+
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson, install it with 'pip install orjson'")
+
+    @staticmethod
+    def dumps(obj):
+        # the json module accepts int keys as well, so does the API
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """Codec using ujson, install with pip install ujson"""
+
+    name = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError("UjsonCodec requires ujson, install it with 'pip install ujson'")
+
+    @staticmethod
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        return ujson.loads(data)
+
+
+CODECS = {codec.name: codec for codec in (OrjsonCodec, UjsonCodec, JSONCodec)}
+
+
+def get_codec(codec=None):
+    """Returns a codec instance
+
+    :param codec: Codec instance, name of a codec ('orjson', 'ujson' or 'json') or None for the fastest installed one
+    :type codec: JSONCodec or str
+    :raises: ImportError if the library of the named codec is not installed, ValueError for unknown names
+    :rtype: JSONCodec
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is None:
+        if orjson is not None:
+            return OrjsonCodec()
+        if ujson is not None:
+            return UjsonCodec()
+        return JSONCodec()
+    if codec not in CODECS:
+        raise ValueError("Unknown codec {}, choose one of {}".format(codec, ', '.join(CODECS)))
+    return CODECS[codec]()
@@ -4,6 +4,9 @@ from os.path import join
 __all__ = [
     'CATEGORY_CONST_MAPPING',
     'LOG_PATH',
+    'LOG_FILE',
+    'CACHE_PATH',
+    'SESSION_FILE',
     'LOG_LEVEL_DEBUG',
     'LOG_LEVEL_INFO',
     'LOG_LEVEL_ERROR',
@@ -19,16 +22,60 @@ __all__ = [
     'AUTO_DEEP_SEARCH',
     'STATUS_NORMAL',
     'STATUS_ARCHIVED',
-    'STATUS_DELETED'
+    'STATUS_DELETED',
+    'DEFAULT_POOL_SIZE',
+    'DEFAULT_TIMEOUT',
+    'DEFAULT_BATCH_SIZE',
+    'DEFAULT_MAX_CONCURRENCY',
+    'DEFAULT_MAX_WORKERS',
+    'DEFAULT_PAGE_SIZE',
+    'DEFAULT_MICRO_BATCH_WINDOW',
+    'DEFAULT_CACHE_SIZE',
+    'DEFAULT_CACHE_TTL',
+    'DEFAULT_STREAM_CHUNK_SIZE',
+    'DEFAULT_SEARCH_INDEX_MAX_AGE',
+    'READ_ONLY_METHODS',
 ]
 
 # LOGGING
 LOG_PATH = join(str(Path.home()), '.idoit_api')
+LOG_FILE = join(LOG_PATH, 'main.log')
 LOG_LEVEL_DEBUG = 10
 LOG_LEVEL_INFO = 20
 LOG_LEVEL_ERROR = 30
 LOG_LEVEL_WARNING = 40
 
+# persisted caches, e.g. of the constants of a CMDB
+CACHE_PATH = join(LOG_PATH, 'cache')
+# sessions shared between processes, see idoit_api.session.FileSessionStore
+SESSION_FILE = join(CACHE_PATH, 'sessions.json')
+
+# TRANSPORT
+DEFAULT_POOL_SIZE = 10
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (5, 60)
+# maximum number of calls sent in one JSON-RPC batch
+DEFAULT_BATCH_SIZE = 100
+# maximum number of requests an AsyncAPI keeps in flight
+DEFAULT_MAX_CONCURRENCY = 50
+# threads used by the *_many methods of endpoints, should not exceed the pool size of the transport
+DEFAULT_MAX_WORKERS = 8
+# number of results MultiResultEndpoints fetch per request
+DEFAULT_PAGE_SIZE = 500
+# seconds a call waits for concurrent calls to join its batch, if micro batching is enabled
+DEFAULT_MICRO_BATCH_WINDOW = 0.005
+
+# RESPONSE CACHE
+DEFAULT_CACHE_SIZE = 4096
+# seconds
+DEFAULT_CACHE_TTL = 300
+# bytes read at once from responses that are parsed while they are received
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+# seconds after which a local search index is stale and searches go to the server again
+DEFAULT_SEARCH_INDEX_MAX_AGE = 3600
+# API methods without side effects, in addition to all methods ending with '.read'
+READ_ONLY_METHODS = ('idoit.version', 'idoit.constants', 'idoit.search')
+
 # APP PERMISSION
 DRY_RUN = 0
 READ_DATA = 10
@@ -80,6 +127,6 @@ CATEGORY_CONST_MAPPING = {
     'cluster_adm_service': 'C__CATG__CLUSTER_ADM_SERVICE',
     'operating_system': 'C__CATG__OPERATING_SYSTEM', 'qinq_sp': 'C__CATG__QINQ_SP',
     'rm_controller': 'C__CATG__RM_CONTROLLER', 'file': 'C__CATG__FILE',
-    'virtual_host': 'C__CATG__VRRP', 'vrrp': 'C__CATG__MANUAL',
-    'manual': 'C__CATG__EMERGENCY_PLAN'
+    'virtual_host': 'C__CATG__VIRTUAL_HOST', 'vrrp': 'C__CATG__VRRP',
+    'manual': 'C__CATG__MANUAL', 'emergency_plan': 'C__CATG__EMERGENCY_PLAN'
 }
@@ -56,3 +56,19 @@ class UnknownError(APIException):
     code = None
     message = "Unknown error"
     meaning = "An unknown error occured"
+
+
+class ServerError(APIException):
+    code = None
+    message = "Server error"
+    meaning = "The CMDB answered with an HTTP error or a body that is no JSON, e.g. an error page of a proxy"
+
+    def __init__(self, data=None, raw_code=None, message=None, status_code=None):
+        APIException.__init__(self, data=data, raw_code=raw_code, message=message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(APIException):
+    code = None
+    message = "Circuit open"
+    meaning = "The CMDB failed repeatedly, requests are not sent until the circuit breaker lets one through again"
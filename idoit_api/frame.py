@@ -0,0 +1,379 @@
+import re
+
+from array import array
+from collections import Counter
+from itertools import compress
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+_CANONICAL_INT = re.compile(r'0|-?[1-9][0-9]*')
+
+
+class Column:
+    """One typed column of a ResultFrame
+
+    'int' and 'float' columns store their values in an array.array, 'category' columns store an array of codes into
+    a list of distinct values, which suits strings like titles, constants and timestamps. Everything else is kept in
+    a list of python objects. Missing values are None in 'category' and 'object' columns and NaN in 'float' columns,
+    'int' columns never have missing values.
+    """
+
+    def __init__(self, kind, data, categories=None):
+        """
+        :param kind: 'int', 'float', 'category' or 'object'
+        :type kind: str
+        :param data: Values, or codes into categories for 'category' columns
+        :type data: array.array or list
+        :param categories: Distinct values of a 'category' column
+        :type categories: list
+        """
+        self.kind = kind
+        self.data = data
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        if self.kind == 'category':
+            categories = self.categories
+            return (categories[code] for code in self.data)
+        return iter(self.data)
+
+    def __getitem__(self, index):
+        if self.kind == 'category':
+            return self.categories[self.data[index]]
+        return self.data[index]
+
+    def __repr__(self):
+        return "Column({}, {} values)".format(self.kind, len(self))
+
+    @classmethod
+    def from_values(cls, values, numeric_strings=True):
+        """Builds the most compact column that can hold values
+
+        :param values: Values of the column
+        :type values: list
+        :param numeric_strings: Store strings as int if all of them are canonical integers, like the ids i-doit returns
+        :type numeric_strings: bool
+        :rtype: Column
+        """
+        if numeric_strings:
+            parsed = [_parse_int(v) if isinstance(v, str) else v for v in values]
+            # a column of titles with a few numbers in it stays a column of strings
+            if not any(isinstance(v, str) for v in parsed):
+                values = parsed
+
+        present = [v for v in values if v is not None]
+        if present and all(type(v) is int for v in present):
+            if len(present) == len(values):
+                try:
+                    return cls('int', array('q', values))
+                except OverflowError:
+                    return cls('object', values)
+            return cls('float', array('d', (float('nan') if v is None else v for v in values)))
+        if present and all(type(v) in (int, float) for v in present):
+            return cls('float', array('d', (float('nan') if v is None else v for v in values)))
+        if all(isinstance(v, str) for v in present):
+            codes = {}
+            data = array('i', (codes.setdefault(v, len(codes)) for v in values))
+            return cls('category', data, list(codes))
+        return cls('object', values)
+
+    def code(self, value):
+        """Returns the code of value in a 'category' column, -1 if the column does not contain it"""
+        try:
+            return self.categories.index(value)
+        except ValueError:
+            return -1
+
+    def mask(self, value):
+        """Returns a list of booleans, True where the column equals value or, for lists, sets and tuples, where it
+        equals one of them
+
+        :rtype: list
+        """
+        values = value if isinstance(value, (list, set, tuple, frozenset)) else (value, )
+        if self.kind == 'category':
+            data, targets = self.data, {self.code(v) for v in values} - {-1}
+        elif self.kind in ('int', 'float'):
+            data = self.data
+            targets = {_parse_int(v) if isinstance(v, str) else v for v in values}
+        else:
+            data, targets = self.data, values
+
+        if numpy is not None and self.kind != 'object':
+            return numpy.isin(self.to_numpy(codes=True), list(targets)).tolist()
+        if len(targets) == 1 and self.kind != 'object':
+            target = next(iter(targets))
+            return [v == target for v in data]
+        return [v in targets for v in data]
+
+    def take(self, indices):
+        """Returns a new column with the values at indices
+
+        :rtype: Column
+        """
+        if isinstance(self.data, array):
+            return Column(self.kind, array(self.data.typecode, (self.data[i] for i in indices)), self.categories)
+        return Column(self.kind, [self.data[i] for i in indices], self.categories)
+
+    def to_numpy(self, codes=False):
+        """Returns the column as numpy array, numeric columns and codes are views of the column without a copy
+
+        :param codes: Return the codes of a 'category' column instead of its values
+        :type codes: bool
+        """
+        _require(numpy, 'numpy')
+        if self.kind == 'category':
+            if codes:
+                return numpy.frombuffer(self.data, dtype=numpy.int32)
+            return numpy.array(list(self), dtype=object)
+        if self.kind in ('int', 'float'):
+            return numpy.frombuffer(self.data, dtype=numpy.int64 if self.kind == 'int' else numpy.float64)
+        return numpy.array(self.data, dtype=object)
+
+    def to_arrow(self):
+        """Returns the column as pyarrow.Array, numeric columns and codes are wrapped without a copy"""
+        _require(pyarrow, 'pyarrow')
+        if self.kind == 'int':
+            return pyarrow.Array.from_buffers(pyarrow.int64(), len(self), [None, pyarrow.py_buffer(self.data)])
+        if self.kind == 'float':
+            return pyarrow.Array.from_buffers(pyarrow.float64(), len(self), [None, pyarrow.py_buffer(self.data)])
+        if self.kind == 'category':
+            indices = pyarrow.Array.from_buffers(pyarrow.int32(), len(self), [None, pyarrow.py_buffer(self.data)])
+            # missing values are a category of their own, arrow marks them as null instead
+            null_code = self.code(None)
+            if null_code >= 0:
+                indices = pyarrow.array(self.data, type=pyarrow.int32(),
+                                        mask=numpy.frombuffer(self.data, dtype=numpy.int32) == null_code
+                                        if numpy is not None else [c == null_code for c in self.data])
+            return pyarrow.DictionaryArray.from_arrays(indices, pyarrow.array(self.categories, type=pyarrow.string()))
+        return pyarrow.array(self.data)
+
+
+class ResultFrame:
+    """Columnar container for many results of the same kind, e.g. all entries of a category
+
+    Each field is stored in one typed Column, see Column.from_values, which takes a fraction of the memory of one
+    dict or CMDBDocument per result. Nested dicts, like the dialog values i-doit returns for status or type, are
+    flattened into one column per key, e.g. 'type.const'. Filters and group-by counts work on whole columns and use
+    numpy if it is installed. Export to numpy, Arrow and Parquet requires numpy or pyarrow.
+
+    Example:
+        frame = ResultFrame.from_records(CMDBObjectsEndpoint(api=api).iterate(page_size=1000).pages())
+        servers = frame.filter(type__title='Server', status=[2, 3])
+        servers.value_counts('cmdb_status.title')     # {'in operation': 812, 'defect': 4}
+        servers.to_parquet('servers.parquet')
+    """
+
+    def __init__(self, columns):
+        """
+        :param columns: Columns by field name, all of the same length
+        :type columns: dict
+        """
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns of a ResultFrame need the same length, got {}".format(sorted(lengths)))
+        self.columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __contains__(self, field):
+        return field in self.columns
+
+    def __iter__(self):
+        return self.rows()
+
+    def __repr__(self):
+        return "ResultFrame({} rows, {})".format(len(self), ', '.join(
+            '{}: {}'.format(name, column.kind) for name, column in self.columns.items()))
+
+    @property
+    def fields(self):
+        return list(self.columns)
+
+    @classmethod
+    def from_records(cls, records, fields=None, flatten=True, numeric_strings=True):
+        """Collects results into a frame
+
+        :param records: Dicts or documents, or pages of them as yielded by PagedResult.pages. Results of read, of
+                        iterate, stream or API.stream_request can be passed directly
+        :type records: iterable
+        :param fields: Only keep these fields, after flattening
+        :type fields: list
+        :param flatten: Store the keys of nested dicts in columns of their own, named 'field.key'
+        :type flatten: bool
+        :param numeric_strings: Store strings that are canonical integers as int, see Column.from_values
+        :type numeric_strings: bool
+        :rtype: ResultFrame
+        """
+        wanted = set(fields) if fields is not None else None
+        values = {}
+        count = 0
+        for record in _iter_records(records):
+            if flatten:
+                record = _flatten(record)
+            for field, value in record.items():
+                if wanted is not None and field not in wanted:
+                    continue
+                column = values.get(field)
+                if column is None:
+                    # results before the first one with this field did not have it
+                    column = values[field] = [None] * count
+                column.append(value)
+            count += 1
+            for column in values.values():
+                if len(column) < count:
+                    column.append(None)
+
+        names = fields if fields is not None else list(values)
+        return cls({name: Column.from_values(values.get(name, [None] * count), numeric_strings=numeric_strings)
+                    for name in names})
+
+    def rows(self):
+        """Yields the rows as dicts, with flattened field names"""
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def to_dicts(self):
+        return list(self.rows())
+
+    def mask(self, **conditions):
+        """Returns a list of booleans, True for rows matching all conditions, see filter"""
+        mask = None
+        for field, value in conditions.items():
+            column_mask = self.columns[_field_name(field)].mask(value)
+            mask = column_mask if mask is None else [a and b for a, b in zip(mask, column_mask)]
+        return mask if mask is not None else [True] * len(self)
+
+    def filter(self, mask=None, **conditions):
+        """Returns a new frame with the rows that match all conditions
+
+        Keyword arguments are field names, their values either one value or a list of values one of which has to
+        match. Flattened fields are written with '__' instead of '.', e.g. filter(type__const='C__OBJTYPE__SERVER').
+
+        :param mask: Booleans selecting the rows, e.g. from mask or from numpy comparisons of to_numpy columns
+        :type mask: list
+        :rtype: ResultFrame
+        """
+        if mask is None:
+            mask = self.mask(**conditions)
+        elif conditions:
+            mask = [a and b for a, b in zip(mask, self.mask(**conditions))]
+        return self.take(list(compress(range(len(self)), mask)))
+
+    def take(self, indices):
+        """Returns a new frame with the rows at indices
+
+        :rtype: ResultFrame
+        """
+        return ResultFrame({name: column.take(indices) for name, column in self.columns.items()})
+
+    def value_counts(self, field):
+        """Counts how often each value of field occurs
+
+        :rtype: dict
+        """
+        column = self.columns[field]
+        if column.kind == 'category':
+            if numpy is not None:
+                counts = numpy.bincount(column.to_numpy(codes=True), minlength=len(column.categories)).tolist()
+            else:
+                by_code = Counter(column.data)
+                counts = [by_code.get(code, 0) for code in range(len(column.categories))]
+            return {value: count for value, count in zip(column.categories, counts) if count}
+        return dict(Counter(column))
+
+    def group_counts(self, *fields):
+        """Counts the rows per combination of values of fields, e.g. group_counts('type.const', 'status')
+
+        :return: Counts by tuple of values
+        :rtype: dict
+        """
+        if len(fields) == 1:
+            return {(value, ): count for value, count in self.value_counts(fields[0]).items()}
+        return dict(Counter(zip(*(self.columns[field] for field in fields))))
+
+    def to_numpy(self):
+        """Returns a dict of numpy arrays by field, numeric columns are views without a copy
+
+        :rtype: dict
+        """
+        return {name: column.to_numpy() for name, column in self.columns.items()}
+
+    def to_arrow(self):
+        """Returns the frame as pyarrow.Table, numeric columns and category codes are not copied
+
+        :rtype: pyarrow.Table
+        """
+        _require(pyarrow, 'pyarrow')
+        return pyarrow.table({name: column.to_arrow() for name, column in self.columns.items()})
+
+    def to_parquet(self, path, **kwargs):
+        """Writes the frame to a Parquet file, kwargs are passed on to pyarrow.parquet.write_table"""
+        _require(pyarrow, 'pyarrow')
+        pyarrow.parquet.write_table(self.to_arrow(), path, **kwargs)
+
+
+def _iter_records(records):
+    for record in records:
+        if isinstance(record, list):
+            for item in record:
+                yield _as_dict(item)
+        else:
+            yield _as_dict(record)
+
+
+def _as_dict(record):
+    if isinstance(record, dict):
+        return record
+    if hasattr(record, 'to_dict'):
+        return record.to_dict()
+    if hasattr(record, '_raw_data'):
+        return record._raw_data
+    raise TypeError("Cannot collect {} into a ResultFrame".format(type(record).__name__))
+
+
+def _flatten(record):
+    if not any(isinstance(v, dict) for v in record.values()):
+        return record
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                flat['{}.{}'.format(key, sub_key)] = sub_value
+        else:
+            flat[key] = value
+    return flat
+
+
+def _field_name(keyword):
+    return keyword.replace('__', '.')
+
+
+def _parse_int(value):
+    # only canonical integers of ASCII digits, so '007', '1e3' or '²' stay strings
+    if _CANONICAL_INT.fullmatch(value):
+        return int(value)
+    return value
+
+
+def _require(module, name):
+    if module is None:
+        raise ImportError("This requires {0}, install it with 'pip install {0}'".format(name))
@@ -0,0 +1,180 @@
+import threading
+import time
+
+from idoit_api.retry import is_transient_error
+
+
+class TokenBucket:
+    """Rate limit, at most rate requests per second on average and at most burst at once
+
+    Example:
+        bucket = TokenBucket(rate=20, burst=5)
+        bucket.acquire()    # blocks until a token is available
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: Tokens added per second
+        :type rate: float
+        :param burst: Maximum number of tokens, defaults to rate but at least 1
+        :type burst: float
+        :param clock: Returns the current time in seconds
+        :type clock: callable
+        :param sleep: Called with the seconds to wait for the next token
+        :type sleep: callable
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive, got {}".format(rate))
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.waited = 0.0
+
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Takes a token, returns the seconds until it is actually available"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # tokens may go negative, later callers queue up behind the ones already waiting
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self):
+        """Blocks until a token is available
+
+        :return: Seconds waited
+        :rtype: float
+        """
+        wait = self._reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Limits the number of requests in flight and adapts the limit to the latency of the CMDB (AIMD)
+
+    While responses are fast the limit grows by about one per limit completed requests (additive increase). If a
+    response takes longer than the target latency or fails with a transient error the limit is halved
+    (multiplicative decrease), at most once for all requests that were already in flight at the last decrease.
+
+    Without a target_latency the target is tolerance times the baseline, the lowest latency seen recently. The
+    baseline drifts upwards slowly so it follows the CMDB if its normal latency changes.
+
+    Optionally requests are rate limited by a TokenBucket as well.
+
+    Example:
+        api = API(url=url, limiter=ConcurrencyLimiter(max_limit=32, rate=50))
+        with ThreadPoolExecutor(64) as pool:     # at most api.limiter.limit requests are sent at the same time
+            ...
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, target_latency=None, tolerance=2.0, backoff=0.5,
+                 rate=None, burst=None, clock=time.monotonic):
+        """
+        :param initial: Limit to start with
+        :type initial: int
+        :param min_limit: The limit never drops below
+        :type min_limit: int
+        :param max_limit: The limit never grows above, should not exceed the pool size of the transport
+        :type max_limit: int
+        :param target_latency: Seconds a healthy response takes at most, None to derive it from the baseline
+        :type target_latency: float
+        :param tolerance: Factor of the baseline latency a healthy response takes at most
+        :type tolerance: float
+        :param backoff: Factor the limit is multiplied with when the CMDB is overloaded
+        :type backoff: float
+        :param rate: Requests per second at most, None for no rate limit
+        :type rate: float
+        :param burst: Requests that may be sent at once before the rate limit applies, see TokenBucket
+        :type burst: float
+        :param clock: Returns the current time in seconds
+        :type clock: callable
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.clock = clock
+        self.bucket = TokenBucket(rate, burst, clock=clock) if rate is not None else None
+
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.baseline = None
+        self.increases = 0
+        self.decreases = 0
+
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Blocks until a request may be sent
+
+        :return: Start time of the request, to be passed to release
+        :rtype: float
+        """
+        if self.bucket is not None:
+            self.bucket.acquire()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return self.clock()
+
+    def release(self, start, error=None, latency=None):
+        """Called when a request acquired at start completed
+
+        :param start: Return value of acquire
+        :type start: float
+        :param error: Exception the request failed with, None if it succeeded
+        :type error: Exception
+        :param latency: Seconds the CMDB took to answer, defaults to the time since start. Streamed responses pass
+                        the time to the start of the body, the rest depends on the size of the result
+        :type latency: float
+        """
+        if latency is None:
+            latency = self.clock() - start
+        with self._condition:
+            self.in_flight -= 1
+            overloaded = error is not None and is_transient_error(error)
+            if error is None:
+                overloaded = latency > self._target(latency)
+
+            if overloaded:
+                # requests that were in flight at the last decrease were slowed down by the same overload
+                if self._last_decrease is None or start >= self._last_decrease:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                    self._last_decrease = self.clock()
+                    self.decreases += 1
+            elif self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                self.increases += 1
+            self._condition.notify_all()
+
+    def _target(self, latency):
+        if self.target_latency is not None:
+            return self.target_latency
+        # the first requests define the baseline, they are never too slow
+        baseline = self.baseline
+        self.baseline = latency if baseline is None else min(latency, baseline * 1.01)
+        return latency if baseline is None else baseline * self.tolerance
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._condition:
+            stats = {'limit': int(self.limit), 'in_flight': self.in_flight, 'baseline': self.baseline,
+                     'increases': self.increases, 'decreases': self.decreases}
+        if self.bucket is not None:
+            stats['rate_limit_wait'] = self.bucket.waited
+        return stats
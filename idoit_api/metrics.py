@@ -0,0 +1,246 @@
+import math
+import threading
+
+from idoit_api.mixins import LoggingMixin
+
+
+class Histogram:
+    """Histogram with logarithmic buckets, for percentiles of latencies and sizes
+
+    Values are counted in buckets that grow by 'growth', so recording is a dict increment and memory does not grow
+    with the number of values. Percentiles are accurate to about growth - 1, i.e. 5% by default.
+    """
+
+    def __init__(self, growth=1.05, min_value=1e-6):
+        """
+        :param growth: Ratio of the upper bounds of two neighbouring buckets
+        :type growth: float
+        :param min_value: Upper bound of the first bucket, smaller values are counted in it
+        :type min_value: float
+        """
+        self.growth = growth
+        self.min_value = min_value
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._log_growth = math.log(growth)
+        self._buckets = {}
+
+    def record(self, value):
+        if value > self.min_value:
+            bucket = int(math.log(value / self.min_value) / self._log_growth) + 1
+        else:
+            bucket = 0
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Returns the value below which percent of the recorded values are, None if nothing was recorded
+
+        :param percent: Percentile between 0 and 100
+        :type percent: float
+        :rtype: float
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100.0))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                upper = self.min_value * self.growth ** bucket
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class MethodStats:
+    """Counters of one JSON-RPC method, see Metrics"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cached = 0
+        self.errors = {}
+        self.latency = Histogram()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.coalesced = 0
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'cached': self.cached,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'errors': dict(self.errors),
+            'latency': self.latency.snapshot(),
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+        }
+
+
+class Metrics(LoggingMixin):
+    """Collects metrics of the requests sent by an API, keyed by JSON-RPC method
+
+    Recorded are latencies, bytes sent and received, errors by exception class, batch sizes, logins and re-logins.
+    Whole batches are recorded under the method 'batch', failing calls of a batch under their own method.
+
+    Hooks are called for every event with its name and a dict of data, e.g. to forward metrics to a monitoring
+    system. Events are 'request', 'transfer', 'batch', 'login', 'relogin', 'retry' and 'circuit'. Hooks run in the
+    thread that sent the request and must be fast, exceptions they raise are logged and ignored.
+
+    Example:
+        api = API(url=url)
+        api.metrics.add_hook(lambda event, data: statsd.timing(data['method'], data['duration'])
+                             if event == 'request' else None)
+        ...
+        api.stats()['methods']['cmdb.category.read']['latency']['p95']
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Sets all counters back to zero, hooks are kept"""
+        with self._lock:
+            self.methods = {}
+            self.batch_sizes = Histogram(min_value=1)
+            self.logins = 0
+            self.relogins = 0
+
+    def add_hook(self, hook):
+        """Registers a callable hook(event, data)"""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def record_request(self, method, duration, error=None):
+        """Records a call of request, or a whole batch if method is 'batch'
+
+        :param method: API method
+        :type method: str
+        :param duration: Seconds the call took
+        :type duration: float
+        :param error: Exception the call raised
+        :type error: Exception
+        """
+        with self._lock:
+            stats = self._method(method)
+            stats.calls += 1
+            stats.latency.record(duration)
+            if error is not None:
+                self._count_error(stats, error)
+        if self.hooks:
+            self._call_hooks('request', {'method': method, 'duration': duration, 'error': error})
+
+    def record_cache_hit(self, method):
+        with self._lock:
+            self._method(method).cached += 1
+
+    def record_coalesced(self, method):
+        """Records a call that shared the result of an identical call in flight instead of sending a request"""
+        with self._lock:
+            self._method(method).coalesced += 1
+
+    def record_transfer(self, method, sent, received):
+        """Records the size of one HTTP request and its response in bytes"""
+        with self._lock:
+            stats = self._method(method)
+            stats.request_bytes += sent
+            stats.response_bytes += received
+        if self.hooks:
+            self._call_hooks('transfer', {'method': method, 'sent': sent, 'received': received})
+
+    def record_batch(self, results):
+        """Records the size of a batch and the errors of its calls
+
+        :param results: Results of the calls of one batch
+        :type results: list[idoit_api.results.CallResult]
+        """
+        with self._lock:
+            self.batch_sizes.record(len(results))
+            for result in results:
+                if result.error is not None:
+                    self._count_error(self._method(result.method or 'batch'), result.error)
+        if self.hooks:
+            self._call_hooks('batch', {'size': len(results)})
+
+    def record_login(self):
+        with self._lock:
+            self.logins += 1
+        if self.hooks:
+            self._call_hooks('login', {})
+
+    def record_relogin(self, method):
+        with self._lock:
+            self.relogins += 1
+        if self.hooks:
+            self._call_hooks('relogin', {'method': method})
+
+    def record_retry(self, method, attempt, delay, error):
+        """Records that a failed request is sent again after delay seconds
+
+        :param attempt: Number of the retry, starting at 1
+        :type attempt: int
+        """
+        with self._lock:
+            self._method(method).retries += 1
+        if self.hooks:
+            self._call_hooks('retry', {'method': method, 'attempt': attempt, 'delay': delay, 'error': error})
+
+    def record_circuit(self, state):
+        """Records a state change of the circuit breaker, see idoit_api.retry.CircuitBreaker"""
+        if self.hooks:
+            self._call_hooks('circuit', {'state': state})
+
+    def snapshot(self):
+        """Returns a copy of all counters
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'methods': {method: stats.snapshot() for method, stats in self.methods.items()},
+                'batch_sizes': self.batch_sizes.snapshot(),
+                'logins': self.logins,
+                'relogins': self.relogins,
+            }
+
+    def _method(self, method):
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = self.methods[method] = MethodStats()
+        return stats
+
+    @staticmethod
+    def _count_error(stats, error):
+        name = error.__class__.__name__
+        stats.errors[name] = stats.errors.get(name, 0) + 1
+
+    def _call_hooks(self, event, data):
+        for hook in self.hooks:
+            try:
+                hook(event, data)
+            except Exception:
+                self.log.exception('Metrics hook %s failed for event %s', hook, event)
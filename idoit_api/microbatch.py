@@ -0,0 +1,212 @@
+import asyncio
+import threading
+import time
+
+from concurrent.futures import Future
+from idoit_api.const import DEFAULT_BATCH_SIZE, DEFAULT_MICRO_BATCH_WINDOW
+from idoit_api.exceptions import APIException, UnknownError
+
+
+class MicroBatcher:
+    """Collects the calls of concurrent callers and sends them as one JSON-RPC batch
+
+    This is the DataLoader pattern: calls are queued for at most 'window' seconds, or until 'max_size' calls are
+    waiting, and are then sent in one HTTP request by a background thread. Every caller gets a future that resolves
+    to the result of its own call, or raises its own exception.
+
+    Used by API.request when micro batching is enabled, see API.__init__.
+    """
+
+    def __init__(self, api, window=DEFAULT_MICRO_BATCH_WINDOW, max_size=DEFAULT_BATCH_SIZE):
+        """
+        :param api: API used to send the batches
+        :type api: idoit_api.base.API
+        :param window: Maximum time in seconds a call waits for others to join its batch
+        :type window: float
+        :param max_size: Number of waiting calls that triggers sending the batch right away
+        :type max_size: int
+        """
+        self.api = api
+        self.window = window
+        self.max_size = max_size
+        self.batches_sent = 0
+        self.calls_sent = 0
+
+        self._queue = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, body):
+        """Queues a JSON-RPC request body
+
+        :param body: Request body as built by API.build_request_body
+        :type body: dict
+        :return: Future resolving to the result of the call
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot submit calls to a closed MicroBatcher")
+            self._queue.append((body, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='idoit_api-microbatch', daemon=True)
+                self._thread.start()
+            # the dispatcher only needs to wake up for the first call of a batch and once the batch is full
+            if len(self._queue) == 1 or len(self._queue) >= self.max_size:
+                self._condition.notify()
+        return future
+
+    def close(self):
+        """Sends all queued calls and stops the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch, self._queue = self._queue[:self.max_size], self._queue[self.max_size:]
+            self._send(batch)
+
+    def _send(self, batch):
+        """Sends one batch and resolves the futures of its calls
+
+        :param batch: List of (body, future) tuples
+        :type batch: list
+        """
+        futures, bodies = self._start(batch)
+        if not bodies:
+            return
+        try:
+            responses = self._check(self.api._post(bodies, self.api._build_request_headers({})))
+        except Exception as err:
+            for future in futures.values():
+                future.set_exception(err)
+            return
+        self._resolve(futures, responses)
+
+    def _start(self, batch):
+        """Drops the calls whose callers are gone, returns the futures by request id and the bodies to send"""
+        futures = {}
+        bodies = []
+        for body, future in batch:
+            if self._is_pending(future):
+                futures[body['id']] = future
+                bodies.append(body)
+        if bodies:
+            self.batches_sent += 1
+            self.calls_sent += len(bodies)
+        return futures, bodies
+
+    @staticmethod
+    def _is_pending(future):
+        return future.set_running_or_notify_cancel()
+
+    def _check(self, responses):
+        if not isinstance(responses, list):
+            # the server rejected the batch as a whole, e.g. because authentication failed
+            self.api._evaluate_response(responses)
+            raise UnknownError(message="Expected a list of responses for batch request, got: {}".format(responses))
+        return responses
+
+    def _resolve(self, futures, responses):
+        for response in responses:
+            future = futures.pop(response.get('id'), None) if isinstance(response, dict) else None
+            if future is None:
+                continue
+            try:
+                result = self.api._evaluate_response(response)['result']
+            except APIException as err:
+                future.set_exception(err)
+            except Exception as err:
+                # a malformed response only fails its own call, the dispatcher has to keep running
+                future.set_exception(UnknownError(message="Malformed response for request id {}: {!r}".format(
+                    response.get('id'), err)))
+            else:
+                future.set_result(result)
+
+        for request_id, future in futures.items():
+            future.set_exception(UnknownError(message="No response received for request id {}".format(request_id)))
+
+
+class AsyncMicroBatcher(MicroBatcher):
+    """Coroutine variant of MicroBatcher for idoit_api.aio.AsyncAPI
+
+    Instead of a background thread, the first call of a batch schedules a task on the event loop that sends the
+    batch after 'window' seconds, a full batch is sent right away.
+    """
+
+    def __init__(self, api, window=DEFAULT_MICRO_BATCH_WINDOW, max_size=DEFAULT_BATCH_SIZE):
+        super().__init__(api, window=window, max_size=max_size)
+        self._timer = None
+        self._tasks = set()
+
+    def submit(self, body):
+        """Queues a JSON-RPC request body
+
+        :param body: Request body as built by API.build_request_body
+        :type body: dict
+        :return: Future resolving to the result of the call
+        :rtype: asyncio.Future
+        """
+        if self._closed:
+            raise RuntimeError("Cannot submit calls to a closed MicroBatcher")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((body, future))
+        if len(self._queue) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    async def close(self):
+        """Sends all queued calls and waits until all batches are answered"""
+        self._closed = True
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[:self.max_size], self._queue[self.max_size:]
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        futures, bodies = self._start(batch)
+        if not bodies:
+            return
+        try:
+            responses = self._check(await self.api._post(bodies, self.api._build_request_headers({})))
+        except Exception as err:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(err)
+            return
+        # callers may have been cancelled while the batch was sent
+        self._resolve({key: future for key, future in futures.items() if not future.done()}, responses)
+
+    @staticmethod
+    def _is_pending(future):
+        return not future.cancelled()
@@ -0,0 +1,313 @@
+import sqlite3
+import threading
+import time
+
+from idoit_api.const import CATEGORY_CONST_MAPPING, DEFAULT_BATCH_SIZE, DEFAULT_PAGE_SIZE, READ_DATA
+from idoit_api.mixins import LoggingMixin
+from idoit_api.objects import CMDBCategoryEndpoint, CMDBObjectsEndpoint
+from idoit_api.utils import chunked
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    type INTEGER,
+    type_title TEXT,
+    sysid TEXT,
+    status INTEGER,
+    cmdb_status INTEGER,
+    updated TEXT,
+    data TEXT NOT NULL,
+    categories_updated TEXT,
+    sync_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_type ON objects (type);
+CREATE INDEX IF NOT EXISTS objects_title ON objects (title);
+CREATE TABLE IF NOT EXISTS category_entries (
+    obj_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (obj_id, category, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS category_entries_category ON category_entries (category, obj_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# columns of the objects table that are filled from the result of cmdb.objects.read and can be queried
+OBJECT_COLUMNS = ('id', 'title', 'type', 'type_title', 'sysid', 'status', 'cmdb_status', 'updated')
+
+# ids per 'IN (...)' list, older SQLite versions allow at most 999 variables per statement
+_MAX_VARIABLES = 500
+
+
+class Mirror(LoggingMixin):
+    """Local copy of the objects and selected categories of a CMDB in SQLite
+
+    sync reads all objects with CMDBObjectsEndpoint and stores them, then reads the categories of every object whose
+    'updated' timestamp changed since its categories were last mirrored with batched cmdb.category.read calls.
+    cmdb.objects.read cannot filter by timestamp, so the object list itself is read completely on every sync, which
+    is cheap compared to reading the categories. Objects that are no longer listed are removed.
+
+    Writes are committed page by page and batch by batch. A sync that is interrupted keeps everything written so far
+    and the next sync continues with the objects whose categories are still missing.
+
+    get, find, category and entries only read the local database and never send a request.
+
+    Example:
+        with Mirror(api, 'cmdb.sqlite', categories=['global', 'ip']) as mirror:
+            mirror.sync()
+            servers = mirror.find(type_title='Server', title_like='web%')
+            ips = mirror.category(servers[0]['id'], 'ip')
+    """
+
+    def __init__(self, api, path=':memory:', categories=(), registry=None, page_size=DEFAULT_PAGE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, *args, **kwargs):
+        """
+        :param api: API to read from
+        :type api: idoit_api.base.API
+        :param path: Path of the SQLite database, created if it does not exist
+        :type path: str
+        :param categories: Categories mirrored for every object, as constants or names like 'global'
+        :type categories: list
+        :param registry: Used to resolve category names to their constant without a request
+        :type registry: idoit_api.registry.ConstantsRegistry
+        :param page_size: Number of objects read per request
+        :type page_size: int
+        :param batch_size: Number of cmdb.category.read calls per batch request and write transaction
+        :type batch_size: int
+        """
+        super().__init__(*args, **kwargs)
+        self.api = api
+        self.path = path
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.registry = registry
+        self.categories = [self._category_constant(c) for c in categories]
+
+        self._objects_ep = CMDBObjectsEndpoint(api=api, permission_level=READ_DATA)
+        self._category_ep = CMDBCategoryEndpoint(api=api, permission_level=READ_DATA, registry=registry)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def __len__(self):
+        return self._db.execute('SELECT count(*) FROM objects').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def _category_constant(self, category):
+        if self.registry is not None:
+            return self.registry.category_constant(category) or category
+        return CATEGORY_CONST_MAPPING.get(category, category)
+
+    def _encode(self, data):
+        return self.api.codec.dumps(data).decode('utf-8')
+
+    def _get_state(self, key, default=None):
+        row = self._db.execute('SELECT value FROM sync_state WHERE key = ?', (key, )).fetchone()
+        return row[0] if row is not None else default
+
+    def _set_state(self, key, value):
+        self._db.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+
+    @property
+    def last_sync(self):
+        """Unix timestamp of the end of the last complete sync, None if there was none"""
+        value = self._get_state('last_sync')
+        return float(value) if value is not None else None
+
+    def sync(self, full=False):
+        """Brings the mirror up to date
+
+        :param full: Read the categories of all objects again, not only of the changed ones
+        :type full: bool
+        :return: Counts of 'objects' listed, 'changed' and 'removed' objects, objects whose categories were
+                 'synced' or 'failed' and the 'duration' in seconds
+        :rtype: dict
+        """
+        start = time.monotonic()
+        with self._lock:
+            sync_id = int(self._get_state('sync_id', 0)) + 1
+            with self._db:
+                self._set_state('sync_id', sync_id)
+                categories = ','.join(self.categories)
+                if full or categories != self._get_state('categories', categories):
+                    self._db.execute('UPDATE objects SET categories_updated = NULL')
+                self._set_state('categories', categories)
+
+            listed, changed = self._sync_objects(sync_id)
+            with self._db:
+                removed = self._db.execute('DELETE FROM objects WHERE sync_id != ?', (sync_id, )).rowcount
+                self._db.execute('DELETE FROM category_entries WHERE obj_id NOT IN (SELECT id FROM objects)')
+            synced, failed = self._sync_categories()
+
+            with self._db:
+                self._set_state('last_sync', time.time())
+
+        result = {'objects': listed, 'changed': changed, 'removed': removed, 'synced': synced, 'failed': failed,
+                  'duration': time.monotonic() - start}
+        self.log.info('Synced mirror %s: %s', self.path, result)
+        return result
+
+    def _sync_objects(self, sync_id):
+        """Stores all objects, page by page
+
+        :return: Number of objects listed, number of new or changed objects
+        :rtype: tuple
+        """
+        listed = changed = 0
+        for page in self._objects_ep.iterate(page_size=self.page_size).pages():
+            ids = [int(o['id']) for o in page]
+            known = {}
+            for chunk in chunked(ids, _MAX_VARIABLES):
+                known.update(self._db.execute(
+                    'SELECT id, updated FROM objects WHERE id IN ({})'.format(','.join('?' * len(chunk))), chunk))
+            rows = [(int(o['id']), o.get('title'), o.get('type'), o.get('type_title'), o.get('sysid'), o.get('status'),
+                     o.get('cmdb_status'), o.get('updated'), self._encode(o), sync_id)
+                    for o in page if int(o['id']) not in known or known[int(o['id'])] != o.get('updated')]
+            with self._db:
+                self._db.executemany(
+                    'INSERT INTO objects (id, title, type, type_title, sysid, status, cmdb_status, updated, data, '
+                    'sync_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET '
+                    'title = excluded.title, type = excluded.type, type_title = excluded.type_title, '
+                    'sysid = excluded.sysid, status = excluded.status, cmdb_status = excluded.cmdb_status, '
+                    'updated = excluded.updated, data = excluded.data, sync_id = excluded.sync_id', rows)
+                for chunk in chunked(ids, _MAX_VARIABLES):
+                    self._db.execute('UPDATE objects SET sync_id = ? WHERE id IN ({})'.format(
+                        ','.join('?' * len(chunk))), [sync_id] + chunk)
+            listed += len(ids)
+            changed += len(rows)
+        return listed, changed
+
+    def _sync_categories(self):
+        """Reads the categories of all objects whose categories are missing or outdated
+
+        :return: Number of objects synced, number of objects for which at least one read failed
+        :rtype: tuple
+        """
+        if not self.categories:
+            return 0, 0
+
+        synced = failed = 0
+        last_id = -1
+        objects_per_batch = max(1, self.batch_size // len(self.categories))
+        while True:
+            # objects without 'updated' timestamp are marked with '', NULL means their categories are missing
+            pending = self._db.execute(
+                "SELECT id, COALESCE(updated, '') AS updated FROM objects "
+                "WHERE categories_updated IS NOT COALESCE(updated, '') AND id > ? ORDER BY id LIMIT ?",
+                (last_id, objects_per_batch)).fetchall()
+            if not pending:
+                return synced, failed
+            last_id = pending[-1]['id']
+
+            calls = [('cmdb.category.read', self._category_ep._build_request_body(objID=obj_id, category=category))
+                     for obj_id, _ in pending for category in self.categories]
+            entries = {}
+            errors = set()
+            for result in self.api.iter_batch(calls, chunk_size=self.batch_size):
+                obj_id, category = result.params['objID'], self.categories[result.index % len(self.categories)]
+                if result.ok:
+                    entries.setdefault(obj_id, []).extend(
+                        (obj_id, category, position, self._encode(entry))
+                        for position, entry in enumerate(result.result or []))
+                else:
+                    self.log.warning('Could not read %s of object %s: %r', category, obj_id, result.error)
+                    errors.add(obj_id)
+
+            done = [(updated, obj_id) for obj_id, updated in pending if obj_id not in errors]
+            with self._db:
+                self._db.executemany('DELETE FROM category_entries WHERE obj_id = ?', [(i, ) for _, i in done])
+                self._db.executemany('INSERT INTO category_entries (obj_id, category, position, data) '
+                                     'VALUES (?, ?, ?, ?)',
+                                     [row for _, i in done for row in entries.get(i, ())])
+                self._db.executemany('UPDATE objects SET categories_updated = ? WHERE id = ?', done)
+            synced += len(done)
+            failed += len(errors)
+
+    def get(self, obj_id):
+        """Returns the object as returned by cmdb.objects.read, None if it is not mirrored
+
+        :rtype: dict
+        """
+        row = self._db.execute('SELECT data FROM objects WHERE id = ?', (int(obj_id), )).fetchone()
+        return self.api.codec.loads(row[0]) if row is not None else None
+
+    def find(self, title_like=None, limit=None, **filters):
+        """Returns the objects matching all filters, ordered by id
+
+        :param title_like: SQL LIKE pattern for the title, e.g. 'web%'
+        :type title_like: str
+        :param limit: Maximum number of objects
+        :type limit: int
+        :param filters: Values of the columns id, title, type, type_title, sysid, status, cmdb_status and updated,
+                        a list matches any of its values
+        :return: List of objects as returned by cmdb.objects.read
+        :rtype: list
+        """
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in OBJECT_COLUMNS:
+                raise ValueError("Cannot filter by {}, choose one of {}".format(column, ', '.join(OBJECT_COLUMNS)))
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            clauses.append('{} IN ({})'.format(column, ','.join('?' * len(values))))
+            params.extend(values)
+        if title_like is not None:
+            clauses.append('title LIKE ?')
+            params.append(title_like)
+
+        sql = 'SELECT data FROM objects'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        loads = self.api.codec.loads
+        return [loads(row[0]) for row in self._db.execute(sql, params)]
+
+    def category(self, obj_id, category):
+        """Returns the mirrored entries of a category of an object, like cmdb.category.read would
+
+        :rtype: list
+        """
+        loads = self.api.codec.loads
+        return [loads(row[0]) for row in self._db.execute(
+            'SELECT data FROM category_entries WHERE category = ? AND obj_id = ? ORDER BY position',
+            (self._category_constant(category), int(obj_id)))]
+
+    def entries(self, category):
+        """Yields (objID, entry) for all mirrored entries of a category
+
+        :return: generator of tuples
+        """
+        loads = self.api.codec.loads
+        rows = self._db.execute('SELECT obj_id, data FROM category_entries WHERE category = ? ORDER BY obj_id, '
+                                'position', (self._category_constant(category), ))
+        for obj_id, data in rows:
+            yield obj_id, loads(data)
+
+    def query(self, sql, params=()):
+        """Runs a read-only SQL query against the mirror, for everything find does not cover
+
+        The 'data' columns hold JSON, which SQLite can query with json_extract.
+
+        :return: List of sqlite3.Row
+        :rtype: list
+        """
+        return self._db.execute(sql, params).fetchall()
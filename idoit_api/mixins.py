@@ -1,6 +1,10 @@
+import atexit
 import logging
+import queue
+import threading
 
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
 from idoit_api.const import *
 
 
@@ -75,6 +79,14 @@ class PermissionMixin:
             return inner
         return conditional_excecution_decorator
 
+    def has_permission_level(self, required_permission_lvl):
+        """Checks whether self.PERMISSION_LEVEL allows actions that require required_permission_lvl
+
+        :type required_permission_lvl: int
+        :rtype: bool
+        """
+        return int(self.PERMISSION_LEVEL) >= int(required_permission_lvl)
+
     @staticmethod
     def check_permission_level(required_permission_lvl, dry_run_allowed=False):
         """This decorator takes an integer or class constant (READ_DATA) and checks whether class method
@@ -91,7 +103,7 @@ class PermissionMixin:
         def method_decorator(method):
             @wraps(method)
             def inner(class_instance, *args, **kwargs):
-                if int(class_instance.PERMISSION_LEVEL) >= int(required_permission_lvl):
+                if class_instance.has_permission_level(required_permission_lvl):
                     return method(class_instance, *args, **kwargs)
                 # TODO write dry_run decorator to re enable this functionality
                 # elif dry_run_allowed and int(class_instance.PERMISSION_LEVEL) == PermissionMixin.DRY_RUN:
@@ -111,32 +123,99 @@ class PermissionMixin:
         return method_decorator
 
 
-class LoggingMixin(object):
-    """Provides logging to all classes inheriting from this one"""
+def setup_logging(log_path=LOG_FILE, force=False):
+    """Configures the handlers shared by all loggers of idoit_api, once per process
 
-    def __init__(self, log_level=LOG_LEVEL_INFO,
-                 log_path='{}/{}'.format(LOG_PATH, '/main.log'), *args, **kwargs):
-        """Setup logging for class
+    Records are put on a queue by a QueueHandler and written to the log file and stderr by a QueueListener thread,
+    so file I/O never happens in the thread that logs. Which records are written is decided by the level of the
+    loggers, errors are printed to stderr as well. Calls after the first one are no-ops unless force is set.
 
-        :param log_level: Set the log level
-        :type log_level: int
-        """
+    :param log_path: Path of the log file
+    :type log_path: str
+    :param force: Replace an existing configuration, e.g. to log into another file
+    :type force: bool
+    :return: The QueueHandler to attach to loggers
+    :rtype: logging.handlers.QueueHandler
+    """
+    global _queue_handler, _queue_listener
+
+    with _logging_lock:
+        if _queue_handler is not None and not force:
+            return _queue_handler
+
+        formatter = logging.Formatter('[%(asctime)s] - %(name)s - %(levelname)s \n\t- %(message)s')
+        file_handler = logging.FileHandler(log_path, delay=True)
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.ERROR)
+        stream_handler.setFormatter(formatter)
+
+        if _queue_listener is not None:
+            _queue_listener.stop()
+            for handler in _queue_listener.handlers:
+                handler.close()
+        else:
+            _queue_handler = QueueHandler(queue.Queue(-1))
+            atexit.register(_stop_logging)
+
+        _queue_listener = QueueListener(_queue_handler.queue, file_handler, stream_handler,
+                                        respect_handler_level=True)
+        _queue_listener.start()
+        return _queue_handler
+
+
+def get_logger(name, log_level=LOG_LEVEL_INFO, log_path=LOG_FILE):
+    """Returns a logger that writes through the shared handlers, see setup_logging
+
+    :param name: Name of the logger
+    :type name: str
+    :param log_level: Level of the logger
+    :type log_level: int
+    :param log_path: Path of the log file, only used if logging is not configured yet
+    :type log_path: str
+    :rtype: logging.Logger
+    """
+    logger = _loggers.get(name)
+    if logger is None:
+        handler = setup_logging(log_path)
+        with _logging_lock:
+            logger = logging.getLogger(name)
+            if handler not in logger.handlers:
+                logger.addHandler(handler)
+            _loggers[name] = logger
 
-        self.log = logging.getLogger('{}.{}'.format(self.__module__, self.__class__.__name__))
-        self.log_lvl = log_level
-        self.log.setLevel(log_level)
+    # setLevel clears the cache of all loggers, so only call it when the level actually changes
+    if logger.level != log_level:
+        logger.setLevel(log_level)
+    return logger
 
-        self._fh_log = logging.FileHandler(log_path)
-        self._fh_log.setLevel(log_level)
-        self._ch_log = logging.StreamHandler()
-        self._ch_log.setLevel(logging.ERROR)
 
-        self._formatter = logging.Formatter('[%(asctime)s] - %(name)s - %(levelname)s \n\t- %(message)s')
-        self._fh_log.setFormatter(self._formatter)
-        self._ch_log.setFormatter(self._formatter)
+def _stop_logging():
+    if _queue_listener is not None:
+        _queue_listener.stop()
 
-        self.log.addHandler(self._fh_log)
-        self.log.addHandler(self._ch_log)
 
+_logging_lock = threading.Lock()
+_queue_handler = None
+_queue_listener = None
+_loggers = {}
 
 
+class LoggingMixin(object):
+    """Provides logging to all classes inheriting from this one
+
+    All instances of a class share one logger, which writes through the process wide handlers of setup_logging.
+    Creating instances therefore costs a dict lookup, not a file handle.
+    """
+
+    def __init__(self, log_level=LOG_LEVEL_INFO, log_path=LOG_FILE, *args, **kwargs):
+        """Setup logging for class
+
+        :param log_level: Set the log level
+        :type log_level: int
+        :param log_path: Path of the log file, only the first configuration in a process takes effect
+        :type log_path: str
+        """
+
+        self.log = get_logger('{}.{}'.format(self.__module__, self.__class__.__name__), log_level, log_path)
+        self.log_lvl = log_level
@@ -1,5 +1,9 @@
-from idoit_api.base import BaseEndpoint, MultiResultEndpoint, CMDBDocument
+from idoit_api.base import BaseEndpoint, MultiResultEndpoint, CMDBDocument, CompactDocument
 from idoit_api.const import *
+from idoit_api.exceptions import InvalidParams
+from idoit_api.mixins import PermissionException, PermissionMixin
+from idoit_api.results import BulkSummary, CallResult
+from idoit_api.utils import chunked
 
 
 # ##################################################################### #
@@ -9,10 +13,15 @@ from idoit_api.const import *
 
 class IdoitEndpoint(BaseEndpoint):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, search_index=None, **kwargs):
+        """
+        :param search_index: Answers normal mode searches locally while it is not stale
+        :type search_index: idoit_api.search.SearchIndex
+        """
         super().__init__(*args, **kwargs)
         self._version_data = None
         self._constants_data = None
+        self.search_index = search_index
 
     @property
     def version(self):
@@ -34,7 +43,8 @@ class IdoitEndpoint(BaseEndpoint):
 
     @property
     def tenant(self):
-        data = self.get_version()
+        if not self._version_data:
+            self.get_version()
         return self._version_data.get('login', {}).get('tenant')
 
     @property
@@ -64,6 +74,16 @@ class IdoitEndpoint(BaseEndpoint):
         return self._version_data
 
     def search(self, query, mode=NORMAL_SEARCH):
+        """Searches the CMDB, normal mode searches are answered by search_index if it is set and not stale
+
+        :param query: Search string
+        :type query: str
+        :param mode: NORMAL_SEARCH, DEEP_SEARCH or AUTO_DEEP_SEARCH
+        :type mode: str
+        :rtype: list
+        """
+        if mode == NORMAL_SEARCH and self.search_index is not None and not self.search_index.is_stale:
+            return self.search_index.search(query)
         return self._api.request(
             "idoit.search",
             {"q": query, "mode": mode}
@@ -74,28 +94,177 @@ class CMDBObjectsEndpoint(MultiResultEndpoint):
 
     ENDPOINT = "cmdb.objects"
 
+    OPTIONAL_PARAMS = {
+        'filter': ('read', ),
+        'limit': ('read', ),
+        'sort': ('read', ),
+        'order_by': ('read', ),
+        'categories': ('read', ),
+    }
+
 
 class CMDBCategoryEndpoint(BaseEndpoint):
     ENDPOINT = "cmdb.category"
 
-    REQUIRED_PARAMS = {}
+    REQUIRED_PARAMS = {'objID': ('read', 'update', 'delete')}
     REQUIRED_INTERCHANGEABLE_PARAMS = {
         ('category', 'catg_id', 'cats_id'): ('create', 'read', 'update')
     }
     OPTIONAL_PARAMS = {
-        'status': ('read', 'update')
+        'status': ('read', 'update'),
+        'data': ('create', 'update'),
+        'id': ('delete', ),
     }
 
     STATUS_NORMAL = "C__RECORD_STATUS__NORMAL"
     STATUS_ARCHIVED = "C__RECORD_STATUS__ARCHIVED"
     STATUS_DELETED = "C__RECORD_STATUS__DELETED"
 
-    def __init__(self, api=None, default_read_status=STATUS_NORMAL, **kwargs):
+    def __init__(self, api=None, default_read_status=STATUS_NORMAL, registry=None, **kwargs):
+        """
+        :param registry: Used to resolve category names like 'global' to their constant without a request
+        :type registry: idoit_api.registry.ConstantsRegistry
+        """
         super().__init__(api=api, **kwargs)
 
-        # Get Parameters from super class BaseEndpoint
-        self.REQUIRED_PARAMS.update(super().REQUIRED_PARAMS)
         self.default_read_status = default_read_status
+        self.registry = registry
+
+    def _build_request_body(self, **kwargs):
+        d = super()._build_request_body(**kwargs)
+        if self.registry is not None and d.get('category'):
+            d['category'] = self.registry.category_constant(d['category']) or d['category']
+        return d
+
+    @PermissionMixin.check_permission_level(CREATE_ENTRIES, )
+    def bulk_save(self, items, chunk_size=DEFAULT_BATCH_SIZE):
+        """Brings category entries to the desired state and only sends the writes that change something
+
+        Items are processed in chunks of chunk_size. The current entries of all objects and categories in a chunk are
+        read with one batch request. Every item is then compared field by field with its entry, see same_value, and
+        only the fields that differ are sent, as one batch of cmdb.category.update and cmdb.category.create calls.
+
+        The entry of an item is the one with the 'id' given in its data, if the object has no entry with that id the
+        item fails. Without an id it is the only entry of a single value category. For multi value categories it is
+        an entry that already has all the desired values, if there is none a new entry is created.
+
+        Creating entries requires CREATE_ENTRIES and updating them UPDATE_ENTRIES, writes the permission level does
+        not allow are not sent and fail with a PermissionException.
+
+        :param items: Iterable of dicts with the keys 'objID', 'category' and 'data', data holding the desired values
+        :type items: iterable
+        :param chunk_size: Number of items per read and per write batch
+        :type chunk_size: int
+        :rtype: idoit_api.results.BulkSummary
+        """
+        summary = BulkSummary()
+        for chunk in chunked(enumerate(items), chunk_size):
+            self._bulk_save_chunk(chunk, chunk_size, summary)
+        return summary
+
+    def _bulk_save_chunk(self, chunk, chunk_size, summary):
+        reads = {}
+        for _, item in chunk:
+            params = self._build_request_body(objID=item.get('objID'), category=item.get('category'))
+            reads.setdefault((params['objID'], params['category']), params)
+        current = {}
+        for key, result in zip(reads, self._api.iter_batch(
+                [('cmdb.category.read', params) for params in reads.values()], chunk_size=chunk_size)):
+            current[key] = result
+
+        writes = []
+        for index, item in chunk:
+            params = self._build_request_body(objID=item.get('objID'), category=item.get('category'))
+            read = current[(params['objID'], params['category'])]
+            if not read.ok:
+                summary.failed.append(CallResult(index, read.method, read.params, error=read.error))
+                continue
+
+            data = item.get('data') or {}
+            entry = self._match_entry(read.result or [], data)
+            if entry is None and data.get('id') is not None:
+                # a stale id, creating an entry instead would add a duplicate
+                error = InvalidParams(message="Entry {} of object {} does not exist".format(
+                    data['id'], params['objID']))
+                summary.failed.append(CallResult(index, 'cmdb.category.update', dict(params, data=data), error=error))
+                continue
+            if entry is None:
+                self._queue_write(writes, summary, index, 'cmdb.category.create', dict(params, data=data))
+                continue
+            changes = {k: v for k, v in data.items() if k != 'id' and not same_value(entry.get(k), v)}
+            if changes:
+                # read returns the id of an entry as 'id', update expects it as 'category_id'
+                changes['category_id'] = entry.get('id')
+                self._queue_write(writes, summary, index, 'cmdb.category.update', dict(params, data=changes))
+            else:
+                summary.unchanged += 1
+
+        if not writes:
+            return
+        try:
+            for (index, method, params), result in zip(writes, self._api.iter_batch(
+                    [(method, params) for _, method, params in writes], chunk_size=chunk_size)):
+                if not result.ok:
+                    summary.failed.append(CallResult(index, method, params, error=result.error))
+                elif method == 'cmdb.category.create':
+                    summary.created += 1
+                else:
+                    summary.updated += 1
+        finally:
+            for obj_id in {params['objID'] for _, _, params in writes}:
+                self._api.invalidate_cache(obj_id)
+
+    _WRITE_PERMISSIONS = {'cmdb.category.create': CREATE_ENTRIES, 'cmdb.category.update': UPDATE_ENTRIES}
+
+    def _queue_write(self, writes, summary, index, method, params):
+        """Queues a write of bulk_save, or records it as failed if the permission level does not allow it"""
+        required = self._WRITE_PERMISSIONS[method]
+        if self.has_permission_level(required):
+            writes.append((index, method, params))
+            return
+        error = PermissionException('{} requires permission level {}, current permission level: {}'.format(
+            method, required, self.PERMISSION_LEVEL))
+        summary.failed.append(CallResult(index, method, params, error=error))
+
+    @staticmethod
+    def _match_entry(entries, data):
+        """Returns the entry data is meant for, None if a new entry has to be created"""
+        if data.get('id') is not None:
+            for entry in entries:
+                if str(entry.get('id')) == str(data['id']):
+                    return entry
+            return None
+        if len(entries) == 1:
+            return entries[0]
+        for entry in entries:
+            if all(same_value(entry.get(k), v) for k, v in data.items()):
+                return entry
+        return None
+
+
+def same_value(current, desired):
+    """Compares a value as read from the API with a value as it would be written
+
+    The API reads dialog and object fields as dicts, but accepts their id, title or constant when writing, and
+    returns most numbers as strings.
+
+    :param current: Value returned by cmdb.category.read
+    :param desired: Value for cmdb.category.update
+    :rtype: bool
+    """
+    if current == desired:
+        return True
+    if current in (None, '') or desired in (None, ''):
+        return current in (None, '') and desired in (None, '')
+    if isinstance(desired, bool):
+        desired = int(desired)
+    if isinstance(current, dict) and not isinstance(desired, dict):
+        return any(same_value(current.get(key), desired) for key in ('id', 'title', 'const') if key in current)
+    if isinstance(current, list) and isinstance(desired, list):
+        return len(current) == len(desired) and all(same_value(c, d) for c, d in zip(current, desired))
+    if isinstance(current, (dict, list)) or isinstance(desired, (dict, list)):
+        return False
+    return str(current) == str(desired)
 
 
 # ##################################################################### #
@@ -121,3 +290,18 @@ class CMDBCustomType(CMDBDocument):
 class CMDBCategoryEntry(CMDBDocument):
     """Represents an entry in a Category"""
     pass
+
+
+class CompactSoftwareAssignment(CompactDocument):
+    """Compact variant of CMDBSoftwareAssignment, see CompactDocument"""
+    __slots__ = ()
+
+
+class CompactRelation(CompactDocument):
+    """Compact variant of CMDBRelation, see CompactDocument"""
+    __slots__ = ()
+
+
+class CompactCategoryEntry(CompactDocument):
+    """Compact variant of CMDBCategoryEntry, see CompactDocument"""
+    __slots__ = ()
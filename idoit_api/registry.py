@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import os.path as osp
+
+from idoit_api.const import CACHE_PATH, CATEGORY_CONST_MAPPING
+
+
+class ConstantIndex:
+    """Lookup tables for one group of i-doit constants, e.g. the global categories
+
+    All lookups are dict accesses: name <-> constant <-> numeric id, and constant -> title.
+    """
+
+    def __init__(self, prefix=''):
+        """
+        :param prefix: Prefix that is stripped from constants to derive their names, e.g. 'C__CATG__'
+        :type prefix: str
+        """
+        self.prefix = prefix
+        self.titles = {}
+        self._constants_by_name = {}
+        self._names_by_constant = {}
+        self._ids_by_constant = {}
+        self._constants_by_id = {}
+
+    def __contains__(self, constant):
+        return constant in self.titles
+
+    def __len__(self):
+        return len(self.titles)
+
+    def add(self, constant, title=None, name=None, id=None):
+        """Adds a constant to the index, the name is derived from the constant if none is given
+
+        Names that are already taken by another constant are not reassigned.
+        """
+        self.titles[constant] = title
+        name = name or self.derive_name(constant)
+        if name not in self._constants_by_name:
+            self._constants_by_name[name] = constant
+            self._names_by_constant.setdefault(constant, name)
+        if id is not None:
+            self.set_id(constant, id)
+
+    def set_id(self, constant, id):
+        id = int(id)
+        self._ids_by_constant[constant] = id
+        self._constants_by_id[id] = constant
+
+    def derive_name(self, constant):
+        if self.prefix and constant.startswith(self.prefix):
+            constant = constant[len(self.prefix):]
+        return constant.lower()
+
+    def constant(self, name):
+        return self._constants_by_name.get(name)
+
+    def name(self, constant):
+        return self._names_by_constant.get(constant)
+
+    def id(self, constant):
+        return self._ids_by_constant.get(constant)
+
+    def constant_for_id(self, id):
+        return self._constants_by_id.get(int(id))
+
+    def title(self, constant):
+        return self.titles.get(constant)
+
+
+class ConstantsRegistry:
+    """Index of the constants of one CMDB, built from idoit.constants and persisted to disk
+
+    The registry file is keyed by the CMDB URL and stores the version of i-doit it was built for, so loading it at
+    startup needs no request at all. refresh() only downloads the constants again when the version changed.
+
+    Example:
+        registry = ConstantsRegistry.load(api.url)
+        registry.refresh(IdoitEndpoint(api=api))
+        registry.category_constant('global')            # 'C__CATG__GLOBAL'
+        registry.category_id('C__CATG__GLOBAL')         # 1
+        registry.object_types.constant_for_id(5)        # 'C__OBJTYPE__SERVER'
+    """
+
+    # group keys of the 'categories' section of idoit.constants
+    CATEGORY_GROUPS = {'g': 'C__CATG__', 's': 'C__CATS__', 'g_custom': 'C__CATG__CUSTOM_FIELDS_'}
+
+    def __init__(self, url, path=CACHE_PATH):
+        """
+        :param url: URL of the CMDB the constants belong to
+        :type url: str
+        :param path: Directory the registry is persisted in
+        :type path: str
+        """
+        self.url = url
+        self.path = path
+        self.version = None
+        self._data = {}
+        self._ids = {}
+        self._build()
+
+    @classmethod
+    def load(cls, url, path=CACHE_PATH):
+        """Creates a registry from its file, the registry is empty if no file was saved for url yet
+
+        :rtype: ConstantsRegistry
+        """
+        registry = cls(url, path=path)
+        try:
+            with open(registry.filename, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return registry
+
+        if stored.get('url') == url:
+            registry.version = stored.get('version')
+            registry._data = stored.get('constants') or {}
+            registry._ids = stored.get('ids') or {}
+            registry._build()
+        return registry
+
+    @property
+    def filename(self):
+        url_hash = hashlib.sha1(self.url.encode('utf-8')).hexdigest()[:16]
+        return osp.join(self.path, 'constants-{}.json'.format(url_hash))
+
+    def save(self):
+        """Writes the registry to disk, the file is replaced atomically"""
+        if not osp.exists(self.path):
+            os.makedirs(self.path)
+        tmp = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'url': self.url, 'version': self.version, 'constants': self._data, 'ids': self._ids}, f)
+        os.replace(tmp, self.filename)
+
+    def refresh(self, idoit_endpoint, force=False):
+        """Rebuilds the registry from the CMDB if its version changed since the registry was built
+
+        Costs one idoit.version request if the registry is up to date. Otherwise the constants are downloaded with
+        idoit.constants, numeric ids with cmdb.object_types.read and one batch of cmdb.object_type_categories.read.
+
+        :param idoit_endpoint: Endpoint used to query the CMDB
+        :type idoit_endpoint: idoit_api.objects.IdoitEndpoint
+        :param force: Rebuild even if the version did not change
+        :type force: bool
+        :return: Whether the registry was rebuilt
+        :rtype: bool
+        """
+        version = idoit_endpoint.get_version().get('version')
+        if not force and self._data and version == self.version:
+            return False
+
+        self.update(idoit_endpoint.get_constants(), version, ids=self._fetch_ids(idoit_endpoint._api))
+        self.save()
+        return True
+
+    def update(self, constants, version=None, ids=None):
+        """Replaces the contents of the registry
+
+        :param constants: Result of idoit.constants
+        :type constants: dict
+        :param version: i-doit version the constants belong to
+        :type version: str
+        :param ids: Numeric ids, {'object_types': {constant: id}, 'categories': {group: {constant: id}}}
+        :type ids: dict
+        """
+        self.version = version
+        self._data = constants or {}
+        self._ids = ids or {}
+        self._build()
+
+    def category_constant(self, name):
+        """Resolves a category name like 'global' to its constant, constants are returned unchanged
+
+        :rtype: str
+        """
+        if name in self._category_groups or name.startswith('C__'):
+            return name
+        return self._category_constants.get(name)
+
+    def category_name(self, constant):
+        return self._category_names.get(constant)
+
+    def category_id(self, name_or_constant):
+        """Returns the numeric id of a category, if known
+
+        :param name_or_constant: Category name or constant
+        :type name_or_constant: str
+        :rtype: int
+        """
+        constant = self.category_constant(name_or_constant)
+        group = self._category_groups.get(constant)
+        return self.categories[group].id(constant) if group else None
+
+    def category_group(self, name_or_constant):
+        """Returns whether a category is global 'g', specific 's' or custom 'g_custom'
+
+        :rtype: str
+        """
+        return self._category_groups.get(self.category_constant(name_or_constant))
+
+    def _build(self):
+        self.object_types = ConstantIndex('C__OBJTYPE__')
+        for constant, title in (self._data.get('objectTypes') or {}).items():
+            self.object_types.add(constant, title)
+        for constant, id in (self._ids.get('object_types') or {}).items():
+            self.object_types.set_id(constant, id)
+
+        self.record_states = ConstantIndex('C__RECORD_STATUS__')
+        for constant, title in (self._data.get('recordStates') or {}).items():
+            self.record_states.add(constant, title)
+
+        self.categories = {}
+        for group, prefix in self.CATEGORY_GROUPS.items():
+            index = self.categories[group] = ConstantIndex(prefix)
+            for constant, title in ((self._data.get('categories') or {}).get(group) or {}).items():
+                index.add(constant, title)
+            for constant, id in ((self._ids.get('categories') or {}).get(group) or {}).items():
+                if constant in index:
+                    index.set_id(constant, id)
+
+        # one namespace for the names of all categories, the hand picked names of CATEGORY_CONST_MAPPING win
+        self._category_groups = {}
+        self._category_constants = {}
+        self._category_names = {}
+        for group, index in self.categories.items():
+            for constant in index.titles:
+                self._category_groups[constant] = group
+
+        for name, constant in CATEGORY_CONST_MAPPING.items():
+            if constant in self._category_groups:
+                self._category_constants[name] = constant
+                self._category_names.setdefault(constant, name)
+
+        for group, index in self.categories.items():
+            for constant in index.titles:
+                if constant in self._category_names:
+                    continue
+                name = index.derive_name(constant)
+                if name in self._category_constants:
+                    name = '{}_{}'.format(group, name)
+                self._category_constants.setdefault(name, constant)
+                self._category_names[constant] = name
+
+    def _fetch_ids(self, api):
+        """Reads the numeric ids of object types and categories, which idoit.constants does not contain
+
+        :param api: API used to query the CMDB
+        :type api: idoit_api.base.API
+        :rtype: dict
+        """
+        ids = {'object_types': {}, 'categories': {}}
+        for object_type in api.request('cmdb.object_types.read') or []:
+            if object_type.get('const'):
+                ids['object_types'][object_type['const']] = object_type.get('id')
+
+        calls = [('cmdb.object_type_categories.read', {'type': t}) for t in ids['object_types']]
+        for result in api.batch_request(calls):
+            if not result.ok or not isinstance(result.result, dict):
+                continue
+            for group, key in (('g', 'catg'), ('s', 'cats'), ('g_custom', 'custom')):
+                for category in result.result.get(key) or []:
+                    if category.get('const') and category.get('id') is not None:
+                        ids['categories'].setdefault(group, {})[category['const']] = category['id']
+        return ids
@@ -0,0 +1,65 @@
+class CallResult:
+    """Outcome of a single call that was executed as part of a batch or bulk operation
+
+    Either 'result' or 'error' is set. Errors are the exceptions from idoit_api.exceptions that a single
+    call would have raised, they are returned instead so one failing call does not abort the others.
+    """
+
+    def __init__(self, index, method, params=None, result=None, error=None):
+        """
+        :param index: Position of the call in the input
+        :type index: int
+        :param method: API method of the call
+        :type method: str
+        :param params: Parameters of the call
+        :type params: dict
+        :param result: Result of the call, if it succeeded
+        :param error: Exception describing why the call failed
+        :type error: Exception
+        """
+        self.index = index
+        self.method = method
+        self.params = params
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        if self.error is not None:
+            return "{}({}, {}, error={!r})".format(self.__class__.__name__, self.index, self.method, self.error)
+        return "{}({}, {}, result={!r})".format(self.__class__.__name__, self.index, self.method, self.result)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def unwrap(self):
+        """Returns the result or raises the error of the call"""
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class BulkSummary:
+    """Outcome of a bulk operation that compares the desired with the current state before writing
+
+    Counts the entries that were created, updated or left unchanged, failed holds one CallResult with the error for
+    every item that could not be read or written, CallResult.index being the position of the item in the input.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = []
+
+    def __repr__(self):
+        return "{}(created={}, updated={}, unchanged={}, failed={})".format(
+            self.__class__.__name__, self.created, self.updated, self.unchanged, len(self.failed))
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def as_dict(self):
+        return {'created': self.created, 'updated': self.updated, 'unchanged': self.unchanged,
+                'failed': len(self.failed)}
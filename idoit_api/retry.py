@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+
+from idoit_api.exceptions import CircuitOpenError, ServerError
+from idoit_api.utils import is_read_only_method
+
+try:
+    from urllib3.exceptions import HTTPError as Urllib3Error
+except ImportError:  # pragma: no cover
+    Urllib3Error = OSError
+
+try:
+    from aiohttp import ClientError as AiohttpError
+except ImportError:  # pragma: no cover
+    AiohttpError = OSError
+
+# errors of the connection or the server, as opposed to errors the API returns for a request
+# requests raises subclasses of OSError, asyncio.TimeoutError is the builtin TimeoutError since python 3.11
+TRANSIENT_ERRORS = (OSError, TimeoutError, Urllib3Error, AiohttpError, ServerError)
+
+
+def is_transient_error(error):
+    """Checks whether an exception is a connection or server error that may go away if the request is repeated
+
+    :type error: Exception
+    :rtype: bool
+    """
+    if isinstance(error, ServerError):
+        # 4xx are caused by the request, not by the server
+        return error.status_code is None or error.status_code >= 500 or error.status_code in (408, 429)
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class RetryPolicy:
+    """Decides which failed requests are sent again and how long to wait before
+
+    Only transient errors are retried, see is_transient_error, and by default only for methods without side effects,
+    see idoit_api.utils.is_read_only_method. A write may have been executed although its response got lost, so
+    repeating it could e.g. create an entry twice.
+
+    The delay grows exponentially with every attempt, up to max_backoff, and is drawn at random between 0 and that
+    value ("full jitter"), so clients that failed at the same time do not retry at the same time.
+
+    Example:
+        api = API(url=url, retry=RetryPolicy(max_retries=5, backoff=1))
+    """
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30, retry_writes=False, sleep=time.sleep):
+        """
+        :param max_retries: Number of times a request is repeated at most
+        :type max_retries: int
+        :param backoff: Upper bound of the first delay in seconds, doubled for every further attempt
+        :type backoff: float
+        :param max_backoff: Upper bound of all delays in seconds
+        :type max_backoff: float
+        :param retry_writes: Retry methods with side effects as well
+        :type retry_writes: bool
+        :param sleep: Called with the delay in seconds
+        :type sleep: callable
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_writes = retry_writes
+        self.sleep = sleep
+
+    def should_retry(self, method, error, attempt):
+        """
+        :param method: API method, or 'batch' with the methods of all its calls
+        :type method: str or list
+        :param error: Exception the request failed with
+        :type error: Exception
+        :param attempt: Number of retries so far
+        :type attempt: int
+        :rtype: bool
+        """
+        if attempt >= self.max_retries or not is_transient_error(error):
+            return False
+        methods = method if isinstance(method, list) else [method]
+        return self.retry_writes or all(is_read_only_method(m) for m in methods)
+
+    def delay(self, attempt):
+        """Returns the seconds to wait before retry number attempt + 1"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Fails requests fast while the CMDB is down
+
+    After failure_threshold transient errors in a row the circuit opens and requests raise CircuitOpenError
+    without being sent. After reset_timeout seconds one request is let through: if it succeeds, the circuit
+    closes, otherwise it stays open for another reset_timeout.
+
+    Errors the API returns for a request, like InvalidParams, show that the CMDB is up and count as success.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic, on_change=None):
+        """
+        :param failure_threshold: Transient errors in a row that open the circuit
+        :type failure_threshold: int
+        :param reset_timeout: Seconds the circuit stays open before a request is let through
+        :type reset_timeout: float
+        :param clock: Returns the current time in seconds
+        :type clock: callable
+        :param on_change: Called with the new state whenever the state changes
+        :type on_change: callable
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.on_change = on_change
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Called before a request is sent
+
+        :raises: CircuitOpenError if the request must not be sent
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            changed = None
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                changed = self.state = self.HALF_OPEN
+            allowed = self.state == self.HALF_OPEN and not self._trial_running
+            if allowed:
+                self._trial_running = True
+            else:
+                self.rejected += 1
+                retry_in = max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
+        self._changed(changed)
+        if not allowed:
+            raise CircuitOpenError(message="{} failures in a row, retrying in {:.1f}s".format(
+                self.failures, retry_in))
+
+    def record(self, error=None):
+        """Called with the outcome of a request that was sent
+
+        :param error: Exception the request failed with, None if it succeeded
+        :type error: Exception
+        """
+        changed = None
+        with self._lock:
+            self._trial_running = False
+            if error is None or not is_transient_error(error):
+                self.failures = 0
+                if self.state != self.CLOSED:
+                    changed = self.state = self.CLOSED
+            else:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self._opened_at = self.clock()
+                    if self.state != self.OPEN:
+                        self.opened += 1
+                        changed = self.state = self.OPEN
+        self._changed(changed)
+
+    def _changed(self, state):
+        # outside of the lock, so on_change may look at the breaker
+        if state is not None and self.on_change is not None:
+            self.on_change(state)
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'opened': self.opened, 'rejected': self.rejected}
@@ -0,0 +1,237 @@
+import json
+import os
+import re
+import threading
+import time
+
+from bisect import bisect_left
+from itertools import count
+from idoit_api.const import DEFAULT_SEARCH_INDEX_MAX_AGE
+
+_WORDS = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Splits text into lower case words
+
+    :rtype: list
+    """
+    return _WORDS.findall(str(text).lower())
+
+
+class SearchIndex:
+    """Local inverted index of object titles and selected category fields, answers normal mode idoit.search queries
+
+    Every indexed value is split into words. A query matches a value if every word of the query is the beginning of
+    a word of the value, so 'web ber' finds 'Webserver Berlin'. This is close to, but not the same as the normal
+    mode of the server, which also matches in the middle of words. Results have the format of idoit.search.
+
+    The index is built from a Mirror and updated incrementally, only objects that changed in the mirror are indexed
+    again. It is stale once updated_at, the time the indexed data was read from the CMDB, is older than max_age.
+
+    Example:
+        index = SearchIndex(fields={'C__CATG__IP': ['hostname']})
+        index.update_from_mirror(mirror)
+        ep = IdoitEndpoint(api=api, search_index=index)
+        ep.search('web01')      # answered locally
+        ep.search('web01', mode=DEEP_SEARCH)        # sent to the server
+    """
+
+    def __init__(self, fields=None, max_age=DEFAULT_SEARCH_INDEX_MAX_AGE):
+        """
+        :param fields: Fields to index per category constant, e.g. {'C__CATG__IP': ['hostname']}, titles of objects
+                       are always indexed
+        :type fields: dict
+        :param max_age: Seconds after which the index is stale, None if it never is
+        :type max_age: float
+        """
+        self.fields = {category: list(names) for category, names in (fields or {}).items()}
+        self.max_age = max_age
+        self.updated_at = None
+
+        self._entries = {}
+        self._objects = {}
+        self._postings = {}
+        self._words = None
+        self._ids = count()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, obj_id):
+        return int(obj_id) in self._objects
+
+    @property
+    def is_stale(self):
+        if self.updated_at is None:
+            return True
+        return self.max_age is not None and time.time() - self.updated_at > self.max_age
+
+    def version(self, obj_id):
+        """Returns the version an object was indexed with, see add_object"""
+        indexed = self._objects.get(int(obj_id))
+        return indexed[0] if indexed is not None else None
+
+    def add_object(self, obj, entries=None, version=None):
+        """Indexes an object, replacing what was indexed for it before
+
+        :param obj: Object as returned by cmdb.objects.read
+        :type obj: dict
+        :param entries: Category entries of the object by category constant, only the configured fields are indexed
+        :type entries: dict
+        :param version: Stored with the object to detect changes, defaults to its 'updated' timestamp
+        """
+        obj_id = int(obj['id'])
+        type_title = obj.get('type_title') or ''
+        values = [('{} > General > Title'.format(type_title), obj.get('title'))]
+        for category, category_entries in (entries or {}).items():
+            for entry in category_entries or ():
+                for field in self.fields.get(category, ()):
+                    value = entry.get(field)
+                    if isinstance(value, dict):
+                        # dialog fields
+                        value = value.get('title')
+                    values.append(('{} > {} > {}'.format(type_title, category, field), value))
+        self._index(obj_id, obj.get('updated') if version is None else version,
+                    [(key, str(value)) for key, value in values if value not in (None, '')])
+
+    def _index(self, obj_id, version, values):
+        with self._lock:
+            self.remove_object(obj_id)
+            entry_ids = []
+            for key, value in values:
+                entry_id = next(self._ids)
+                self._entries[entry_id] = (obj_id, key, value)
+                entry_ids.append(entry_id)
+                for word in set(tokenize(value)):
+                    postings = self._postings.get(word)
+                    if postings is None:
+                        postings = self._postings[word] = set()
+                        self._words = None
+                    postings.add(entry_id)
+            self._objects[obj_id] = (version, entry_ids)
+
+    def remove_object(self, obj_id):
+        """Removes an object from the index
+
+        :return: Whether the object was indexed
+        :rtype: bool
+        """
+        with self._lock:
+            indexed = self._objects.pop(int(obj_id), None)
+            if indexed is None:
+                return False
+            for entry_id in indexed[1]:
+                _, _, value = self._entries.pop(entry_id)
+                for word in set(tokenize(value)):
+                    postings = self._postings[word]
+                    postings.discard(entry_id)
+                    if not postings:
+                        del self._postings[word]
+                        self._words = None
+            return True
+
+    def update_from_mirror(self, mirror):
+        """Indexes the objects of mirror that changed since they were indexed and drops the removed ones
+
+        :param mirror: Mirror with all categories of fields
+        :type mirror: idoit_api.mirror.Mirror
+        :return: Number of objects that were indexed again or removed
+        :rtype: int
+        """
+        changed = 0
+        with self._lock:
+            current = {}
+            for row in mirror.query('SELECT id, updated, categories_updated FROM objects'):
+                obj_id, version = row['id'], '{}|{}'.format(row['updated'], row['categories_updated'])
+                current[obj_id] = version
+                if self.version(obj_id) != version:
+                    entries = {category: mirror.category(obj_id, category) for category in self.fields}
+                    self.add_object(mirror.get(obj_id), entries, version=version)
+                    changed += 1
+            for obj_id in set(self._objects) - set(current):
+                self.remove_object(obj_id)
+                changed += 1
+            self.updated_at = mirror.last_sync
+        return changed
+
+    def _words_with_prefix(self, prefix):
+        words = self._words
+        if words is None:
+            words = self._words = sorted(self._postings)
+        start = bisect_left(words, prefix)
+        end = start
+        while end < len(words) and words[end].startswith(prefix):
+            end += 1
+        return words[start:end]
+
+    def search(self, query, limit=None):
+        """Searches the index
+
+        :param query: Search string
+        :type query: str
+        :param limit: Maximum number of results
+        :type limit: int
+        :return: Results in the format of idoit.search, exact matches first
+        :rtype: list
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            # the most selective word first, the others only filter its matches
+            matching = []
+            for word in set(words):
+                matching.append(self._words_with_prefix(word))
+            matching.sort(key=lambda w: sum(len(self._postings[word]) for word in w))
+            candidates = set()
+            for word in matching[0]:
+                candidates.update(self._postings[word])
+            hits = [self._entries[entry_id] for entry_id in candidates]
+
+            for prefixed in matching[1:]:
+                prefixed = set(prefixed)
+                hits = [hit for hit in hits if prefixed.intersection(tokenize(hit[2]))]
+
+        query = query.strip().lower()
+        results = []
+        for obj_id, key, value in hits:
+            results.append({
+                'documentId': str(obj_id),
+                'key': key,
+                'value': value,
+                'type': 'cmdb',
+                'link': '/?objID={}'.format(obj_id),
+                'score': 100 if value.lower() == query else 50,
+            })
+        results.sort(key=lambda r: (-r['score'], int(r['documentId']), r['key']))
+        return results[:limit] if limit is not None else results
+
+    def save(self, path):
+        """Writes the index to a JSON file, the file is replaced atomically"""
+        with self._lock:
+            data = {
+                'fields': self.fields,
+                'updated_at': self.updated_at,
+                'objects': [[obj_id, version, [list(self._entries[i][1:]) for i in entry_ids]]
+                            for obj_id, (version, entry_ids) in self._objects.items()],
+            }
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, max_age=DEFAULT_SEARCH_INDEX_MAX_AGE):
+        """Creates an index from a file written by save
+
+        :rtype: SearchIndex
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(fields=data.get('fields'), max_age=max_age)
+        for obj_id, version, values in data.get('objects', ()):
+            index._index(obj_id, version, values)
+        index.updated_at = data.get('updated_at')
+        return index
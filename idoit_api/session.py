@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import os.path as osp
+import threading
+import time
+
+from contextlib import contextmanager
+from idoit_api.const import SESSION_FILE
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # not available on windows, the store then only synchronizes threads of one process
+    fcntl = None
+
+
+class FileSessionStore:
+    """Shares session ids of the CMDB between processes on the same host
+
+    Sessions are stored per CMDB URL and username in a JSON file that only the current user can read. Writes and
+    logins are serialized with an exclusive lock on a separate lock file, so concurrent processes log in only once.
+
+    Example:
+        api = API(url=url, username=user, password=pw, session_store=FileSessionStore())
+        api.login()  # reuses the session of another process, if there is one
+    """
+
+    def __init__(self, path=SESSION_FILE):
+        """
+        :param path: File the sessions are stored in
+        :type path: str
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._lock_fd = None
+        self._lock_depth = 0
+
+    @staticmethod
+    def _key(url, username):
+        return hashlib.sha1('{}\0{}'.format(url, username).encode('utf-8')).hexdigest()
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock across threads and processes, held while a process logs in. The lock is reentrant"""
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                self._ensure_dir()
+                self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+    def get(self, url, username):
+        """Returns the stored session id for url and username, or None
+
+        :rtype: str
+        """
+        entry = self._read().get(self._key(url, username))
+        return entry.get('session_id') if entry else None
+
+    def set(self, url, username, session_id):
+        """Stores a session id for url and username"""
+        with self.lock():
+            sessions = self._read()
+            sessions[self._key(url, username)] = {'session_id': session_id, 'updated': time.time()}
+            self._write(sessions)
+
+    def delete(self, url, username, session_id=None):
+        """Removes the session of url and username
+
+        :param session_id: Only remove the stored session if it is this one, so a session that another process
+                           just created is kept
+        :type session_id: str
+        """
+        with self.lock():
+            sessions = self._read()
+            key = self._key(url, username)
+            entry = sessions.get(key)
+            if entry and (session_id is None or entry.get('session_id') == session_id):
+                del sessions[key]
+                self._write(sessions)
+
+    def _ensure_dir(self):
+        directory = osp.dirname(self.path)
+        if directory and not osp.exists(directory):
+            os.makedirs(directory, mode=0o700)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, sessions):
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(sessions, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+from concurrent.futures import Future
+from idoit_api.cache import ResponseCache
+
+
+class SingleFlight:
+    """Coalesces identical calls that are in flight at the same time
+
+    The first caller of a key executes the call, callers that arrive with the same key while it is running wait
+    for it and get the same result, or the same exception. Used by API.request for read-only methods, the key is
+    the method and its normalized params, see ResponseCache.make_key.
+
+    Results are shared between callers and must not be modified, like results of the ResponseCache.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    make_key = staticmethod(ResponseCache.make_key)
+
+    def do(self, key, func, *args, **kwargs):
+        """Calls func, unless a call with the same key is in flight, then waits for its outcome
+
+        :param key: Identifies identical calls
+        :type key: hashable
+        :return: The result and whether it was shared from another call
+        :rtype: tuple
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return future.result(), True
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """Coroutine variant of SingleFlight for idoit_api.aio.AsyncAPI"""
+
+    async def do(self, key, func, *args, **kwargs):
+        """Awaits func(*args, **kwargs), unless a call with the same key is in flight, see SingleFlight.do"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shielded, so a cancelled follower does not cancel the call of the others
+            return await asyncio.shield(future), True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.executed += 1
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            # nobody may be waiting, which is no reason to log an unretrieved exception
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[key]
+        return result, False
@@ -0,0 +1,138 @@
+import codecs
+import json
+import re
+
+from idoit_api.exceptions import UnknownError
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+_NUMBER_PARTS = frozenset('0123456789.eE+-')
+
+
+class ChunkReader:
+    """Text buffer over an iterable of byte chunks, only the unparsed rest of the received chunks is kept"""
+
+    def __init__(self, chunks):
+        self.bytes_received = 0
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Appends the next chunk to the buffer, returns False at the end of the stream"""
+        while not self._eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                text = self._utf8.decode(b'', final=True)
+            else:
+                self.bytes_received += len(chunk)
+                text = self._utf8.decode(chunk)
+            if text:
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return True
+        return False
+
+    def peek(self):
+        """Returns the next non whitespace character without consuming it"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise UnknownError(message="Response ended unexpectedly")
+
+    def starts_with(self, characters):
+        """Checks whether the next non whitespace character is one of characters, False for an empty or binary body"""
+        try:
+            return self.peek() in characters
+        except (UnknownError, ValueError):
+            return False
+
+    def rest(self):
+        """Consumes the rest of the body, e.g. of an error page
+
+        :rtype: bytes
+        """
+        received = b''.join(self._chunks)
+        self.bytes_received += len(received)
+        rest = self._buffer[self._pos:].encode('utf-8') + received
+        self._buffer, self._pos, self._eof = '', 0, True
+        return rest
+
+    def expect(self, characters):
+        """Consumes the next non whitespace character, which has to be one of characters
+
+        :rtype: str
+        """
+        char = self.peek()
+        if char not in characters:
+            raise UnknownError(message="Malformed response, expected one of '{}' but got '{}'".format(
+                characters, char))
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Consumes and decodes the next JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as err:
+                # most likely the value continues in the next chunk
+                if self._fill():
+                    continue
+                raise UnknownError(message="Malformed response: {}".format(err))
+            # a number at the end of the buffer, or cut off before its fraction or exponent, e.g. '1.' or '2e',
+            # may continue in the next chunk
+            if type(value) in (int, float):
+                cut = end == len(self._buffer) or self._buffer[end] in _NUMBER_PARTS
+                if cut and self._fill():
+                    continue
+            self._pos = end
+            return value
+
+
+def iter_result(chunks, evaluate):
+    """Parses a JSON-RPC response while it is received and yields the items of its result one at a time
+
+    Only the current item and the unparsed rest of the current chunk are held in memory, so memory stays bounded
+    however large the result is. A result that is no array is yielded as one item.
+
+    :param chunks: Iterable of byte chunks of the response body
+    :type chunks: iterable
+    :param evaluate: Called with {'error': error} if the response contains an error, has to raise the matching
+                     exception, e.g. API._evaluate_response
+    :type evaluate: callable
+    :raises: UnknownError if the response is malformed, otherwise whatever evaluate raises
+    :return: generator of result items
+    """
+    reader = chunks if isinstance(chunks, ChunkReader) else ChunkReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'result' and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            value = reader.value()
+            if key == 'error' and value is not None:
+                evaluate({'error': value})
+            elif key == 'result':
+                yield value
+
+        if reader.expect(',}') == '}':
+            return
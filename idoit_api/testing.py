@@ -0,0 +1,574 @@
+"""Local stand-ins for the i-doit JSON-RPC API, used by the tests and benchmarks"""
+import json
+import random
+import re
+import threading
+import time
+
+from functools import partial
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import count
+from socketserver import ThreadingMixIn
+from idoit_api.exceptions import APIException, InternalError, InvalidParams, MethodNotFound
+from idoit_api.transport import TransportResponse, compress_body, decode_content
+
+
+CONSTANTS = {
+    'objectTypes': {'C__OBJTYPE__SERVER': 'Server', 'C__OBJTYPE__CLIENT': 'Client',
+                    'C__OBJTYPE__APPLICATION': 'Application'},
+    'categories': {
+        'g': {'C__CATG__GLOBAL': 'General', 'C__CATG__IP': 'Hostaddress', 'C__CATG__APPLICATION': 'Software assignment',
+              'C__CATG__MODEL': 'Model', 'C__CATG__VIRTUAL_HOST': 'Virtual host'},
+        's': {'C__CATS__APPLICATION': 'Application', 'C__CATS__PERSON': 'Persons', 'C__CATS__MODEL': 'Model'},
+        'g_custom': {'C__CATG__CUSTOM_FIELDS_BACKUP_PLAN': 'Backup plan'},
+    },
+    'recordStates': {'C__RECORD_STATUS__NORMAL': 'Normal', 'C__RECORD_STATUS__ARCHIVED': 'Archived',
+                     'C__RECORD_STATUS__DELETED': 'Deleted'},
+}
+
+STATUS_NORMAL = 'C__RECORD_STATUS__NORMAL'
+STATUS_ARCHIVED = 'C__RECORD_STATUS__ARCHIVED'
+STATUS_DELETED = 'C__RECORD_STATUS__DELETED'
+
+OBJECT_TYPE_IDS = {'C__OBJTYPE__SERVER': 5, 'C__OBJTYPE__CLIENT': 10, 'C__OBJTYPE__APPLICATION': 30}
+
+CATEGORY_IDS = {
+    'catg': {'C__CATG__GLOBAL': 1, 'C__CATG__IP': 47, 'C__CATG__APPLICATION': 22, 'C__CATG__MODEL': 2,
+             'C__CATG__VIRTUAL_HOST': 57},
+    'cats': {'C__CATS__APPLICATION': 10, 'C__CATS__PERSON': 48, 'C__CATS__MODEL': 2},
+    'custom': {'C__CATG__CUSTOM_FIELDS_BACKUP_PLAN': 3},
+}
+
+
+class FakeIdoit:
+    """In-process fake of the i-doit JSON-RPC API
+
+    Can be plugged into an API directly via idoit_api.transport.LocalTransport(FakeIdoit()),
+    or served over HTTP with FakeIdoitServer.
+
+    Objects and category entries are kept in memory: idoit.search, cmdb.objects.read and cmdb.category.* work on
+    what was added with add_object, add_entry and populate, or created through the API. Handlers may raise an
+    APIException, it is answered as the JSON-RPC error of the call.
+
+    For load tests every request can be delayed by latency and every call by call_latency. inject_error lets
+    calls fail with a JSON-RPC error, inject_http_error lets whole requests fail like an overloaded web server,
+    error_rate lets calls fail at random.
+
+    Example:
+        fake = FakeIdoit(call_latency=0.002, error_rate=0.01, seed=1)
+        fake.populate(1000)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+    """
+
+    def __init__(self, version='1.14.2', session_id='fake-session-id', latency=0.0, call_latency=0.0,
+                 error_rate=0.0, seed=None, sleep=time.sleep):
+        """
+        :param latency: Seconds every request is delayed, once per batch
+        :type latency: float
+        :param call_latency: Seconds every call is delayed, once per call of a batch
+        :type call_latency: float
+        :param error_rate: Share of calls that fail with an InternalError at random
+        :type error_rate: float
+        :param seed: Seed of the random errors, for reproducible runs
+        :type seed: int
+        :param sleep: Called with the seconds to delay
+        :type sleep: callable
+        """
+        self.version = version
+        self.session_id = session_id
+        self.latency = latency
+        self.call_latency = call_latency
+        self.error_rate = error_rate
+        self.sleep = sleep
+        self.call_count = 0
+        self.request_count = 0
+        self.methods = {
+            'idoit.version': self.idoit_version,
+            'idoit.login': self.idoit_login,
+            'idoit.logout': self.idoit_logout,
+            'idoit.constants': self.idoit_constants,
+            'idoit.search': self.idoit_search,
+            'cmdb.object_types.read': self.object_types_read,
+            'cmdb.object_type_categories.read': self.object_type_categories_read,
+            'cmdb.objects.read': self.objects_read,
+            'cmdb.category.read': self.category_read,
+            'cmdb.category.create': self.category_create,
+            'cmdb.category.update': self.category_update,
+            'cmdb.category.save': self.category_save,
+            'cmdb.category.delete': partial(self._set_entry_status, status=STATUS_DELETED),
+            'cmdb.category.archive': partial(self._set_entry_status, status=STATUS_ARCHIVED),
+            'cmdb.category.recycle': partial(self._set_entry_status, status=STATUS_NORMAL),
+            'cmdb.category.purge': self.category_purge,
+            'cmdb.category.quickpurge': self.category_purge,
+        }
+
+        self.objects = {}
+        # entry id -> [object id, category constant, status, data]
+        self.entries = {}
+        self._object_ids = count(1000)
+        self._entry_ids = count(1)
+        self._errors = {}
+        self._http_errors = []
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+
+    def __call__(self, data, headers):
+        return self.handle_bytes(data, headers)
+
+    def register(self, method, func):
+        """Registers a handler for a JSON-RPC method
+
+        :param method: JSON-RPC method name, e.g. 'cmdb.category.read'
+        :type method: str
+        :param func: Callable receiving the params dict, returns the result
+        :type func: callable
+        """
+        self.methods[method] = func
+
+    def inject_error(self, method, error=InternalError, data="Injected error", times=1):
+        """Lets the next calls of method fail with a JSON-RPC error
+
+        :param error: APIException subclass whose code is returned
+        :type error: type
+        :param data: Error data of the response
+        :type data: str
+        :param times: Number of calls that fail, None for all until clear_errors
+        :type times: int
+        """
+        with self._lock:
+            self._errors[method] = [error.code, data, times]
+
+    def inject_http_error(self, status=502, times=1):
+        """Lets the next requests fail with an HTTP error page instead of a JSON-RPC response
+
+        :param status: HTTP status code
+        :type status: int
+        :param times: Number of requests that fail
+        :type times: int
+        """
+        with self._lock:
+            self._http_errors.extend([status] * times)
+
+    def clear_errors(self):
+        with self._lock:
+            self._errors.clear()
+            del self._http_errors[:]
+
+    def handle_bytes(self, data, headers):
+        """Handles an encoded request body
+
+        :param data: Encoded JSON-RPC request or batch
+        :type data: bytes
+        :param headers: Request headers
+        :type headers: dict
+        :rtype: idoit_api.transport.TransportResponse
+        """
+        with self._lock:
+            self.request_count += 1
+            status = self._http_errors.pop(0) if self._http_errors else None
+        if self.latency:
+            self.sleep(self.latency)
+        if status is not None:
+            return TransportResponse(status, '<html><body><h1>{}</h1></body></html>'.format(status).encode('utf-8'),
+                                     {'content-type': 'text/html'})
+        response = self.handle(json.loads(data.decode('utf-8')))
+        return TransportResponse(200, json.dumps(response).encode('utf-8'), {'content-type': 'application/json'})
+
+    def handle(self, payload):
+        """Handles a decoded JSON-RPC request object or batch
+
+        :param payload: JSON-RPC request or list of requests
+        :type payload: dict or list
+        :return: JSON-RPC response or list of responses
+        :rtype: dict or list
+        """
+        if isinstance(payload, list):
+            return [self._handle_single(p) for p in payload]
+        return self._handle_single(payload)
+
+    def _handle_single(self, request):
+        with self._lock:
+            self.call_count += 1
+        method = request.get('method')
+        params = request.get('params') or {}
+        if self.call_latency:
+            self.sleep(self.call_latency)
+
+        injected = self._injected_error(method)
+        if injected is not None:
+            return self._error(request, *injected)
+        func = self.methods.get(method)
+        if func is None:
+            return self._error(request, MethodNotFound.code, "Method {} does not exist".format(method))
+        try:
+            return {'jsonrpc': '2.0', 'result': func(params), 'id': request.get('id')}
+        except APIException as err:
+            return self._error(request, err.code, err.data)
+
+    def _injected_error(self, method):
+        with self._lock:
+            injected = self._errors.get(method)
+            if injected is not None:
+                code, data, times = injected
+                if times is not None:
+                    injected[2] -= 1
+                    if injected[2] <= 0:
+                        del self._errors[method]
+                return code, data
+            if self.error_rate and self._random.random() < self.error_rate:
+                return InternalError.code, "Random error"
+        return None
+
+    @staticmethod
+    def _error(request, code, data):
+        return {'jsonrpc': '2.0', 'error': {'code': code, 'message': '', 'data': data}, 'id': request.get('id')}
+
+    # ############################## Data ############################## #
+
+    def add_object(self, title, type='C__OBJTYPE__SERVER', **fields):
+        """Adds an object
+
+        :param type: Constant of the object type
+        :type type: str
+        :param fields: Further fields of the object, e.g. cmdb_status
+        :return: Id of the object
+        :rtype: int
+        """
+        with self._lock:
+            obj_id = next(self._object_ids)
+            now = _now()
+            obj = {
+                'id': str(obj_id),
+                'title': title,
+                'sysid': 'SYSID_{}'.format(1600000000 + obj_id),
+                'type': str(OBJECT_TYPE_IDS.get(type, 0)),
+                'created': now,
+                'updated': now,
+                'type_title': CONSTANTS['objectTypes'].get(type, type),
+                'type_group_title': 'Infrastructure',
+                'status': '2',
+                'cmdb_status': '6',
+                'cmdb_status_title': 'in operation',
+                'image': '',
+            }
+            obj.update(fields)
+            self.objects[obj_id] = obj
+            return obj_id
+
+    def add_entry(self, obj_id, category, **data):
+        """Adds a category entry to an object
+
+        :param category: Category constant, e.g. 'C__CATG__IP'
+        :type category: str
+        :return: Id of the entry
+        :rtype: int
+        """
+        with self._lock:
+            obj = self._object(obj_id)
+            entry_id = next(self._entry_ids)
+            self.entries[entry_id] = [int(obj_id), category, STATUS_NORMAL, dict(data)]
+            obj['updated'] = _now()
+            return entry_id
+
+    def populate(self, objects, type='C__OBJTYPE__SERVER'):
+        """Adds objects named server-000000, server-000001, ... with one C__CATG__IP entry each
+
+        :param objects: Number of objects to add
+        :type objects: int
+        :return: Ids of the objects
+        :rtype: list
+        """
+        ids = []
+        for i in range(objects):
+            obj_id = self.add_object('server-{:06d}'.format(i), type=type)
+            self.add_entry(obj_id, 'C__CATG__IP', hostname='server-{:06d}'.format(i), domain='example.de',
+                           ipv4_address='10.{}.{}.{}'.format(i // 65536 % 256, i // 256 % 256, i % 256))
+            ids.append(obj_id)
+        return ids
+
+    def _object(self, obj_id):
+        try:
+            return self.objects[int(obj_id)]
+        except (KeyError, TypeError, ValueError):
+            raise InvalidParams(data="Object with id {} does not exist".format(obj_id))
+
+    def _object_entries(self, obj_id, category, status=STATUS_NORMAL):
+        return [(entry_id, data) for entry_id, (entry_obj, entry_category, entry_status, data) in self.entries.items()
+                if entry_obj == obj_id and entry_category == category and entry_status == status]
+
+    @staticmethod
+    def _entry_dict(entry_id, obj_id, data):
+        entry = {'id': str(entry_id), 'objID': str(obj_id)}
+        entry.update(data)
+        return entry
+
+    # ############################## Methods ############################## #
+
+    def idoit_version(self, params):
+        return {
+            'login': {'userid': '9', 'name': 'admin', 'mail': 'admin@example.de', 'username': 'admin',
+                      'tenant': 'Example GmbH', 'language': 'en'},
+            'version': self.version,
+            'step': '',
+            'type': 'PRO'
+        }
+
+    def idoit_login(self, params):
+        return {'result': True, 'userid': '9', 'name': 'admin', 'mail': 'admin@example.de', 'username': 'admin',
+                'session-id': self.session_id, 'client-id': 1, 'client-name': 'Example GmbH'}
+
+    def idoit_logout(self, params):
+        return {'message': 'Logout successfull', 'result': True}
+
+    def idoit_constants(self, params):
+        return CONSTANTS
+
+    def idoit_search(self, params):
+        query = str(_required(params, 'q')).lower()
+        results = []
+        with self._lock:
+            values = [(obj_id, '{} > General > Title'.format(obj['type_title']), obj['title'])
+                      for obj_id, obj in self.objects.items()]
+            for entry_obj, category, status, data in self.entries.values():
+                if status == STATUS_NORMAL:
+                    type_title = self.objects[entry_obj]['type_title']
+                    values.extend((entry_obj, '{} > {} > {}'.format(type_title, category, field), value)
+                                  for field, value in data.items() if isinstance(value, str))
+        for obj_id, key, value in values:
+            if query in value.lower():
+                results.append({'documentId': str(obj_id), 'key': key, 'value': value, 'type': 'cmdb',
+                                'link': '/?objID={}'.format(obj_id), 'score': 100 if value.lower() == query else 50})
+        return results
+
+    def object_types_read(self, params):
+        return [{'id': str(id), 'title': CONSTANTS['objectTypes'][const], 'const': const, 'status': '2'}
+                for const, id in OBJECT_TYPE_IDS.items()]
+
+    def object_type_categories_read(self, params):
+        # every type has every category, good enough for a stand-in
+        return {key: [{'id': str(id), 'const': const, 'title': const} for const, id in categories.items()]
+                for key, categories in CATEGORY_IDS.items()}
+
+    def objects_read(self, params):
+        filters = params.get('filter') or {}
+        with self._lock:
+            objects = [obj for obj_id, obj in sorted(self.objects.items()) if _matches(obj, filters)]
+            order_by = params.get('order_by')
+            if order_by:
+                objects.sort(key=lambda o: o.get(order_by) or '', reverse=params.get('sort') == 'DESC')
+            elif params.get('sort') == 'DESC':
+                objects.reverse()
+
+            limit = params.get('limit')
+            if limit is not None:
+                offset, size = [int(v) for v in str(limit).split(',')] if ',' in str(limit) else (0, int(limit))
+                objects = objects[offset:offset + size]
+
+            categories = params.get('categories')
+            if not categories:
+                return [dict(obj) for obj in objects]
+            result = []
+            for obj in objects:
+                obj = dict(obj)
+                obj_id = int(obj['id'])
+                names = categories if isinstance(categories, list) else sorted(
+                    {c for o, c, _, _ in self.entries.values() if o == obj_id})
+                obj['categories'] = {c: [self._entry_dict(e, obj_id, d) for e, d in self._object_entries(obj_id, c)]
+                                     for c in names}
+                result.append(obj)
+            return result
+
+    def category_read(self, params):
+        obj_id = int(self._object(_required(params, 'objID'))['id'])
+        with self._lock:
+            return [self._entry_dict(entry_id, obj_id, data) for entry_id, data in
+                    self._object_entries(obj_id, _category(params), params.get('status', STATUS_NORMAL))]
+
+    def category_create(self, params):
+        entry_id = self.add_entry(_required(params, 'objID'), _category(params), **(params.get('data') or {}))
+        return {'id': str(entry_id), 'message': 'Category entry successfully saved', 'success': True}
+
+    def category_update(self, params):
+        obj_id = int(self._object(_required(params, 'objID'))['id'])
+        category = _category(params)
+        data = dict(params.get('data') or {})
+        entry_id = data.pop('category_id', None)
+        with self._lock:
+            entries = dict(self._object_entries(obj_id, category))
+            if entry_id is None and entries:
+                # single value categories are updated without category_id
+                entry_id = min(entries)
+            if entry_id is None or int(entry_id) not in entries:
+                raise InvalidParams(data="Category entry {} of object {} does not exist".format(entry_id, obj_id))
+            entries[int(entry_id)].update(data)
+            self.objects[obj_id]['updated'] = _now()
+        return {'success': True, 'message': 'Category entry successfully saved'}
+
+    def category_save(self, params):
+        entry_id = params.get('entry')
+        if entry_id is None:
+            entry_id = self.add_entry(_required(params, 'objID'), _category(params), **(params.get('data') or {}))
+        else:
+            self.category_update(dict(params, data=dict(params.get('data') or {}, category_id=entry_id)))
+        return {'success': True, 'message': 'Category entry successfully saved', 'entry': int(entry_id)}
+
+    def _entry(self, params):
+        obj_id = int(self._object(_required(params, 'objID'))['id'])
+        entry_id = params.get('id', params.get('entry'))
+        entry = self.entries.get(int(entry_id)) if entry_id is not None else None
+        if entry is None or entry[0] != obj_id or entry[1] != _category(params):
+            raise InvalidParams(data="Category entry {} of object {} does not exist".format(entry_id, obj_id))
+        return int(entry_id), entry
+
+    def _set_entry_status(self, params, status):
+        with self._lock:
+            _, entry = self._entry(params)
+            entry[2] = status
+            self.objects[entry[0]]['updated'] = _now()
+        return {'success': True, 'message': 'Entry {} has been set to status {}'.format(params.get('id'), status)}
+
+    def category_purge(self, params):
+        with self._lock:
+            entry_id, entry = self._entry(params)
+            del self.entries[entry_id]
+            self.objects[entry[0]]['updated'] = _now()
+        return {'success': True, 'message': 'Entry {} has been purged'.format(entry_id)}
+
+
+def _now():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _required(params, name):
+    if params.get(name) is None:
+        raise InvalidParams(data="Parameter {} is required".format(name))
+    return params[name]
+
+
+def _category(params):
+    """Returns the category constant of the category, catg_id or cats_id parameter"""
+    if params.get('category'):
+        return params['category']
+    for param, key in (('catg_id', 'catg'), ('cats_id', 'cats')):
+        if params.get(param) is not None:
+            for const, id in CATEGORY_IDS[key].items():
+                if str(id) == str(params[param]):
+                    return const
+            raise InvalidParams(data="Category {} {} does not exist".format(param, params[param]))
+    raise InvalidParams(data="Parameter category is required")
+
+
+def _matches(obj, filters):
+    """Applies the filter parameter of cmdb.objects.read to an object"""
+    for key, value in filters.items():
+        if key == 'ids':
+            if obj['id'] not in [str(v) for v in value]:
+                return False
+        elif key == 'type':
+            if obj['type'] not in (str(value), str(OBJECT_TYPE_IDS.get(value))):
+                return False
+        elif key == 'title':
+            # the server matches titles with SQL LIKE
+            pattern = re.escape(str(value)).replace('%', '.*').replace('_', '.')
+            if not re.fullmatch(pattern, obj['title'], re.IGNORECASE):
+                return False
+        elif str(obj.get(key)) != str(value):
+            return False
+    return True
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeIdoitServer:
+    """Serves a FakeIdoit over HTTP on localhost, in a background thread
+
+    Like a web server with mod_deflate it accepts gzip and deflate compressed request bodies and compresses
+    responses of at least compress_min_size bytes for clients that accept it. bytes_received and bytes_sent count
+    the bodies as they went over the wire.
+
+    Example:
+        with FakeIdoitServer() as server:
+            api = API(url=server.url)
+    """
+
+    def __init__(self, fake=None, host='127.0.0.1', port=0, compress_min_size=1024):
+        """
+        :param compress_min_size: Responses of at least this many bytes are compressed, None to never compress
+        :type compress_min_size: int
+        """
+        self.fake = fake or FakeIdoit()
+        self.compress_min_size = compress_min_size
+        self.connection_count = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        fake = self.fake
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, avoid the Nagle / delayed ACK stall on kept alive connections
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                # one handler instance is created per TCP connection
+                server.connection_count += 1
+                super().setup()
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                server.bytes_received += len(body)
+                if self.headers.get('Content-Encoding') in ('gzip', 'deflate'):
+                    body = decode_content(body)
+                response = fake.handle_bytes(body, dict(self.headers))
+
+                content = response.content
+                encoding = self._response_encoding()
+                if encoding and server.compress_min_size is not None and len(content) >= server.compress_min_size:
+                    content = compress_body(content, encoding)
+                else:
+                    encoding = None
+                server.bytes_sent += len(content)
+
+                self.send_response(response.status_code)
+                for key, value in response.headers.items():
+                    self.send_header(key, value)
+                if encoding:
+                    self.send_header('Content-Encoding', encoding)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def _response_encoding(self):
+                accepted = [e.split(';')[0].strip() for e in self.headers.get('Accept-Encoding', '').split(',')]
+                for encoding in ('gzip', 'deflate'):
+                    if encoding in accepted:
+                        return encoding
+                return None
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://{}:{}/src/jsonrpc.php".format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,356 @@
+import asyncio
+import gzip
+import zlib
+import requests
+import urllib3
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from idoit_api.const import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, DEFAULT_STREAM_CHUNK_SIZE
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+# first bytes of gzip and of zlib streams with the default window size, JSON never starts with either
+GZIP_MAGIC = b'\x1f\x8b'
+ZLIB_MAGIC = b'\x78'
+
+
+def compress_body(data, encoding='gzip', level=6):
+    """Compresses a request body for the given HTTP Content-Encoding
+
+    :param data: Request body
+    :type data: bytes
+    :param encoding: 'gzip' or 'deflate'
+    :type encoding: str
+    :param level: Compression level from 1 (fastest) to 9 (smallest)
+    :type level: int
+    :rtype: bytes
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(data, level)
+    raise ValueError("Unsupported content encoding {}, use 'gzip' or 'deflate'".format(encoding))
+
+
+def decode_content(content):
+    """Decompresses a gzip or deflate compressed response body, other bodies are returned as they are
+
+    Transports return decompressed bodies, requests, urllib3 and aiohttp decompress them on their own. This is used
+    by the local transports, whose handlers may answer like a server that compresses its responses.
+
+    :type content: bytes
+    :rtype: bytes
+    """
+    if content[:2] == GZIP_MAGIC:
+        return gzip.decompress(content)
+    if content[:1] == ZLIB_MAGIC:
+        return zlib.decompress(content)
+    return content
+
+
+class TransportResponse:
+    """Minimal, transport independent view of an HTTP response"""
+
+    def __init__(self, status_code, content, headers=None):
+        """
+        :param status_code: HTTP status code
+        :type status_code: int
+        :param content: Raw response body
+        :type content: bytes
+        :param headers: Response headers
+        :type headers: dict
+        """
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def __repr__(self):
+        return "{}({}, {} bytes)".format(self.__class__.__name__, self.status_code, len(self.content))
+
+
+class TransportStream:
+    """Response of post_stream, its body is iterated in chunks while it is received"""
+
+    def __init__(self, status_code, chunks, headers=None, on_close=None):
+        """
+        :param status_code: HTTP status code
+        :type status_code: int
+        :param chunks: Iterable of the byte chunks of the body
+        :type chunks: iterable
+        :param headers: Response headers
+        :type headers: dict
+        :param on_close: Called once by close, e.g. to release the connection
+        :type on_close: callable
+        """
+        self.status_code = status_code
+        self.chunks = chunks
+        self.headers = headers or {}
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        """Stops receiving the body and releases the connection"""
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.status_code)
+
+
+class BaseTransport(ABC):
+    """Base class for all transports
+
+    A transport is owned by an API instance and is responsible for delivering an already encoded JSON-RPC
+    body to the CMDB and returning the raw response. Everything JSON-RPC specific stays in the API class,
+    so transports only need to implement 'post'.
+    """
+
+    @abstractmethod
+    def post(self, url, data, headers):
+        """Sends a POST request
+
+        :param url: URL of the JSON-RPC endpoint
+        :type url: str
+        :param data: Encoded request body
+        :type data: bytes
+        :param headers: Request headers
+        :type headers: dict
+        :return: The response of the server
+        :rtype: TransportResponse
+        """
+
+    def post_stream(self, url, data, headers, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """Sends a POST request, the body of the response is received while it is iterated
+
+        The request is sent and the status line and headers are received right away. Transports that cannot stream
+        return the whole body as one chunk. Closing the stream releases the connection.
+
+        :param chunk_size: Maximum number of bytes per chunk
+        :type chunk_size: int
+        :rtype: TransportStream
+        """
+        response = self.post(url, data, headers)
+        return TransportStream(response.status_code, [response.content], response.headers)
+
+    def close(self):
+        """Releases all resources held by the transport, e.g. pooled connections"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class RequestsTransport(BaseTransport):
+    """Default transport, keeps connections alive in a pooled requests.Session"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, session=None):
+        """
+        :param pool_size: Maximum number of connections kept open per host
+        :type pool_size: int
+        :param timeout: Either one timeout for connecting and reading or a (connect, read) tuple in seconds
+        :type timeout: float or tuple
+        :param session: Use this session instead of creating a new one
+        :type session: requests.Session
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url, data, headers):
+        response = self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+        return TransportResponse(response.status_code, response.content, response.headers)
+
+    def post_stream(self, url, data, headers, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        response = self.session.post(url, data=data, headers=headers, timeout=self.timeout, stream=True)
+        return TransportStream(response.status_code, response.iter_content(chunk_size=chunk_size), response.headers,
+                               on_close=response.close)
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(BaseTransport):
+    """Transport using a plain urllib3.PoolManager, which skips the overhead of requests"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, **pool_kwargs):
+        """
+        :param pool_size: Maximum number of connections kept open per host
+        :type pool_size: int
+        :param timeout: Either one timeout for connecting and reading or a (connect, read) tuple in seconds
+        :type timeout: float or tuple
+        :param pool_kwargs: Extra arguments passed on to urllib3.PoolManager
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        self.pool = urllib3.PoolManager(maxsize=pool_size, timeout=timeout, retries=False, **pool_kwargs)
+
+    def post(self, url, data, headers):
+        response = self.pool.request('POST', url, body=data, headers=headers)
+        return TransportResponse(response.status, response.data, dict(response.headers))
+
+    def post_stream(self, url, data, headers, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        response = self.pool.request('POST', url, body=data, headers=headers, preload_content=False)
+        return TransportStream(response.status, response.stream(chunk_size), dict(response.headers),
+                               on_close=response.release_conn)
+
+    def close(self):
+        self.pool.clear()
+
+
+class LocalTransport(BaseTransport):
+    """In-process transport, hands the request body to a python callable instead of sending it over the network
+
+    Useful for tests and benchmarks, see idoit_api.testing.FakeIdoit for a handler that behaves like the CMDB.
+    """
+
+    def __init__(self, handler):
+        """
+        :param handler: Callable taking the encoded body and the headers. Returns a TransportResponse or bytes
+        :type handler: callable
+        """
+        self.handler = handler
+
+    def post(self, url, data, headers):
+        response = self.handler(data, headers)
+        if isinstance(response, TransportResponse):
+            response.content = decode_content(response.content)
+            return response
+        return TransportResponse(200, decode_content(response), {'content-type': 'application/json'})
+
+    def post_stream(self, url, data, headers, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        response = self.post(url, data, headers)
+        content = response.content
+        chunks = (content[start:start + chunk_size] for start in range(0, len(content), chunk_size))
+        return TransportStream(response.status_code, chunks, response.headers)
+
+
+class AsyncBaseTransport(ABC):
+    """Base class for transports used by idoit_api.aio.AsyncAPI, same contract as BaseTransport but awaitable"""
+
+    @abstractmethod
+    async def post(self, url, data, headers):
+        """Sends a POST request
+
+        :param url: URL of the JSON-RPC endpoint
+        :type url: str
+        :param data: Encoded request body
+        :type data: bytes
+        :param headers: Request headers
+        :type headers: dict
+        :return: The response of the server
+        :rtype: TransportResponse
+        """
+
+    async def close(self):
+        """Releases all resources held by the transport, e.g. pooled connections"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AiohttpTransport(AsyncBaseTransport):
+    """Non-blocking transport, keeps connections alive in one aiohttp.ClientSession
+
+    Requires the optional dependency aiohttp.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        """
+        :param pool_size: Maximum number of open connections
+        :type pool_size: int
+        :param timeout: Either one timeout for connecting and reading or a (connect, read) tuple in seconds
+        :type timeout: float or tuple
+        """
+        if aiohttp is None:
+            raise ImportError("AiohttpTransport requires aiohttp, install it with: pip install aiohttp")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+
+    @property
+    def session(self):
+        # the session binds to the running event loop, so it can only be created from within a coroutine
+        if self._session is None or self._session.closed:
+            connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+            )
+        return self._session
+
+    async def post(self, url, data, headers):
+        async with self.session.post(url, data=data, headers=headers) as response:
+            return TransportResponse(response.status, await response.read(), dict(response.headers))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class ThreadedAsyncTransport(AsyncBaseTransport):
+    """Runs a blocking transport in a thread pool, fallback for AsyncAPI when aiohttp is not installed
+
+    All threads share the connection pool of the wrapped transport.
+    """
+
+    def __init__(self, transport=None, max_workers=DEFAULT_POOL_SIZE):
+        """
+        :param transport: Blocking transport to wrap, defaults to a RequestsTransport with a pool of max_workers
+        :type transport: BaseTransport
+        :param max_workers: Number of threads, should not exceed the pool size of the wrapped transport
+        :type max_workers: int
+        """
+        self.transport = transport or RequestsTransport(pool_size=max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='idoit_api')
+
+    async def post(self, url, data, headers):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self.transport.post, url, data, headers)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+        self.transport.close()
+
+
+class AsyncLocalTransport(AsyncBaseTransport):
+    """In-process transport for AsyncAPI, see LocalTransport
+
+    The handler may be a plain callable or a coroutine function.
+    """
+
+    def __init__(self, handler):
+        """
+        :param handler: Callable taking the encoded body and the headers. Returns a TransportResponse or bytes
+        :type handler: callable
+        """
+        self.handler = handler
+
+    async def post(self, url, data, headers):
+        response = self.handler(data, headers)
+        if asyncio.iscoroutine(response):
+            response = await response
+        if isinstance(response, TransportResponse):
+            response.content = decode_content(response.content)
+            return response
+        return TransportResponse(200, decode_content(response), {'content-type': 'application/json'})
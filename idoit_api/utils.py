@@ -2,6 +2,9 @@ import getpass
 import os
 import configparser
 
+from itertools import islice
+from idoit_api.const import READ_ONLY_METHODS
+
 
 def cli_login_prompt():
     """Saves API authentication credentials in environmental variables
@@ -53,3 +56,30 @@ def parse_env_file_to_vars(filepath):
         options = config.options(section)
         for option in options:
             os.environ[option.upper()] = config.get(section, option)
+
+
+def chunked(iterable, size):
+    """Splits an iterable into lists of at most size items, without reading ahead further than one chunk
+
+    :param iterable: Any iterable, including generators
+    :param size: Maximum length of a chunk
+    :type size: int
+    :return: generator of lists
+    """
+    if size < 1:
+        raise ValueError("Chunk size must be at least 1, got {}".format(size))
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def is_read_only_method(method):
+    """Checks whether an API method only reads data, i.e. it can be cached or retried safely
+
+    :param method: API method, e.g. 'cmdb.category.read'
+    :type method: str
+    :rtype: bool
+    """
+    return method.endswith('.read') or method in READ_ONLY_METHODS
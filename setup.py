@@ -13,6 +13,12 @@ with open('HISTORY.rst') as history_file:
 
 requirements = ['Click>=7.0', 'requests>=2.23.0']
 
+extra_requirements = {
+    'async': ['aiohttp>=3.6'],
+    'fast': ['orjson>=3.0'],
+    'frame': ['numpy>=1.17', 'pyarrow>=1.0'],
+}
+
 setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest>=3', 'pytest-mock>=3.1.1', 'requests-mock>=1.8.0']
@@ -40,6 +46,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require=extra_requirements,
     license="GNU General Public License v3",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
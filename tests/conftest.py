@@ -0,0 +1,14 @@
+import os
+import pytest
+
+CREDENTIAL_VARIABLES = ('CMDB_URL', 'CMDB_API_KEY', 'CMDB_USER', 'CMDB_PASS', 'CMDB_SESSION_ID')
+
+
+@pytest.fixture(autouse=True)
+def clean_environment():
+    """API stores credentials in os.environ, every test starts without them and leaves none behind"""
+    saved = {name: os.environ.pop(name) for name in CREDENTIAL_VARIABLES if name in os.environ}
+    yield
+    for name in CREDENTIAL_VARIABLES:
+        os.environ.pop(name, None)
+    os.environ.update(saved)
@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+
+from idoit_api.aio import AsyncAPI
+from idoit_api.exceptions import InvalidParams, MethodNotFound
+from idoit_api.mixins import PermissionException
+from idoit_api.objects import CMDBCategoryEndpoint
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import AsyncLocalTransport, ThreadedAsyncTransport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.register('cmdb.category.read', lambda params: [{'objID': params['objID'], 'id': 1}])
+    fake.register('cmdb.category.update', lambda params: {'success': True})
+    return fake
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncAPI:
+
+    def test_request(self, fake):
+        async def main():
+            async with AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake)) as api:
+                return await api.request("idoit.version")
+
+        assert run(main())['version'] == '1.14.2'
+
+    def test_login(self, fake):
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", username="user", password="pw",
+                           transport=AsyncLocalTransport(fake))
+            api.session_id = None
+            await api.login()
+            session_id = api.session_id
+            await api.logout()
+            return session_id
+
+        assert run(main()) == 'fake-session-id'
+
+    def test_errors(self, fake):
+        api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake))
+        with pytest.raises(MethodNotFound):
+            run(api.request("cmdb.does.not.exist"))
+
+    def test_sync_entry_points(self, fake):
+        api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake))
+        with pytest.raises(TypeError, match='async with'):
+            with api:
+                pass
+        with pytest.raises(TypeError, match='stream_request'):
+            api.stream_request('cmdb.objects.read')
+        assert fake.call_count == 0
+
+    def test_max_concurrency(self, fake):
+        in_flight = []
+        peak = []
+
+        async def slow_handler(data, headers):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return fake.handle_bytes(data, headers)
+
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(slow_handler),
+                           max_concurrency=5)
+            return await asyncio.gather(*[api.request("idoit.version") for _ in range(30)])
+
+        assert len(run(main())) == 30
+        assert max(peak) == 5
+
+    def test_batch_request(self, fake):
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake))
+            results = await api.batch_request([('cmdb.category.read', {'objID': i}) for i in range(7)], chunk_size=3)
+            streamed = [r async for r in api.iter_batch([('idoit.version', {}), ('cmdb.missing', {})])]
+            return results, streamed
+
+        results, streamed = run(main())
+        assert [r.result[0]['objID'] for r in results] == list(range(7))
+        assert streamed[0].ok and isinstance(streamed[1].error, MethodNotFound)
+
+    def test_batch_request_generator(self, fake):
+        consumed = [0]
+        ahead = []
+
+        def calls():
+            for i in range(5000):
+                consumed[0] += 1
+                yield ('cmdb.category.read', {'objID': i})
+
+        async def handler(data, headers):
+            await asyncio.sleep(0)
+            # calls taken from the generator that were not answered yet
+            ahead.append(consumed[0] - fake.call_count)
+            return fake.handle_bytes(data, headers)
+
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(handler), max_concurrency=4)
+            return await api.batch_request(calls(), chunk_size=10)
+
+        results = run(main())
+        assert [r.result[0]['objID'] for r in results] == list(range(5000))
+        assert max(ahead) <= 5 * 10
+
+    def test_threaded_transport(self):
+        async def main(url):
+            async with AsyncAPI(url=url, transport=ThreadedAsyncTransport(max_workers=4)) as api:
+                return await asyncio.gather(*[api.request("idoit.version") for _ in range(10)])
+
+        with FakeIdoitServer() as server:
+            assert len(run(main(server.url))) == 10
+            assert server.connection_count <= 4
+
+
+class TestAsyncEndpoint:
+
+    def test_read_update(self, fake):
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake))
+            ep = CMDBCategoryEndpoint(api=api, permission_level=50)
+            read = await ep.aread(objID=5, category='C__CATG__GLOBAL')
+            updated = await ep.aupdate(objID=5, category='C__CATG__GLOBAL', status='C__RECORD_STATUS__NORMAL')
+            return read, updated
+
+        read, updated = run(main())
+        assert read == [{'objID': 5, 'id': 1}]
+        assert updated == {'success': True}
+
+    def test_validation_and_permissions(self, fake):
+        api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake))
+
+        with pytest.raises(InvalidParams):
+            run(CMDBCategoryEndpoint(api=api, permission_level=50).aread(objID=5))
+        with pytest.raises(PermissionException):
+            run(CMDBCategoryEndpoint(api=api, permission_level=10).aupdate(objID=5, category='C__CATG__GLOBAL'))
@@ -1,9 +1,14 @@
+import json
+import pickle
 import pytest
 import os
 
 import requests_mock
-from idoit_api.base import API, BaseEndpoint, CMDBDocument
+from idoit_api.base import API, BaseEndpoint, CMDBDocument, CompactDocument
 from idoit_api.const import CATEGORY_CONST_MAPPING
+from idoit_api.exceptions import InvalidParams, MethodNotFound, AuthenticationError
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
 
 from idoit_api.utils import set_env_credentials, del_env_credentials
 
@@ -51,6 +56,39 @@ class TestCMDBDocument:
             assert o.__dict__[k] == v
 
 
+class TestCompactDocument:
+
+    def test_populate(self, get_generic_json_dict):
+        o = CompactDocument(get_generic_json_dict)
+
+        for k, v in get_generic_json_dict.items():
+            assert o.get(k) == v
+        assert o.to_dict() == get_generic_json_dict
+        assert o.raw == get_generic_json_dict
+        assert not hasattr(o, '__dict__')
+
+    def test_schema_classes_are_shared(self):
+        a = CompactDocument({'id': '1', 'status': {'id': '2', 'title': 'Normal'}})
+        b = CompactDocument({'id': '2', 'status': {'id': '2', 'title': 'Normal'}})
+        c = CompactDocument({'id': '3', 'title': 'other'})
+
+        assert type(a) is type(b)
+        assert type(a) is not type(c)
+        assert isinstance(c, CompactDocument)
+        assert a.status is b.status
+
+    def test_sanitized_names(self):
+        o = CompactDocument({'class': 'a', 'to_dict': 'b', 'f-1': 'c'})
+        assert (o.class_, o.to_dict_, o.f_1) == ('a', 'b', 'c')
+        assert o.to_dict() == {'class': 'a', 'to_dict': 'b', 'f-1': 'c'}
+
+    def test_read_only_and_pickle(self):
+        o = CompactDocument({'id': '1'}, keep_raw=True)
+        with pytest.raises(AttributeError):
+            o.id = '2'
+        assert pickle.loads(pickle.dumps(o)) == o
+
+
 class TestAPI:
 
     def test_init(self):
@@ -74,4 +112,69 @@ class TestAPI:
     def test_request(self):
         pass
 
+    def test_request_ids(self):
+        a = API(url="https://cmdb.example.de")
+        ids = [a.build_request_body("idoit.version")['id'] for _ in range(3)]
+        assert len(set(ids)) == 3
+
+    def test_build_request_body_keeps_params(self):
+        params = {'objID': 1}
+        API(url="https://cmdb.example.de").build_request_body("cmdb.object.read", params)
+        assert params == {'objID': 1}
+
+
+class TestBatchRequest:
+
+    @pytest.fixture
+    def fake(self):
+        fake = FakeIdoit()
+        fake.register('test.echo', lambda params: params.get('value'))
+        return fake
+
+    def test_results_in_input_order(self, fake):
+        def reversing_handler(data, headers):
+            response = fake.handle_bytes(data, headers)
+            response.content = json.dumps(json.loads(response.content)[::-1]).encode('utf-8')
+            return response
+
+        a = API(url="https://cmdb.example.de", transport=LocalTransport(reversing_handler))
+        results = a.batch_request([('test.echo', {'value': i}) for i in range(10)])
+        assert [r.result for r in results] == list(range(10))
+        assert [r.index for r in results] == list(range(10))
+
+    def test_chunking_generator(self, fake):
+        posts = []
+
+        def counting_handler(data, headers):
+            posts.append(len(json.loads(data)))
+            return fake.handle_bytes(data, headers)
+
+        a = API(url="https://cmdb.example.de", transport=LocalTransport(counting_handler))
+        calls = ({'method': 'test.echo', 'params': {'value': i}} for i in range(25))
+        results = list(a.iter_batch(calls, chunk_size=10))
+        assert posts == [10, 10, 5]
+        assert [r.result for r in results] == list(range(25))
+
+    def test_per_item_errors(self, fake):
+        a = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        results = a.batch_request([
+            ('test.echo', {'value': 1}),
+            ('test.missing', {}),
+            {'params': {}},
+            ('test.echo', {'value': 2}),
+        ])
+        assert [r.ok for r in results] == [True, False, False, True]
+        assert isinstance(results[1].error, MethodNotFound)
+        assert isinstance(results[2].error, InvalidParams)
+        assert 'apikey' not in results[0].params
+        with pytest.raises(MethodNotFound):
+            results[1].unwrap()
+
+    def test_whole_batch_error(self):
+        def auth_error(data, headers):
+            return json.dumps({'error': {'code': -32604, 'data': 'session expired'}, 'id': None}).encode('utf-8')
+
+        a = API(url="https://cmdb.example.de", transport=LocalTransport(auth_error))
+        with pytest.raises(AuthenticationError):
+            a.batch_request([('test.echo', {})])
 
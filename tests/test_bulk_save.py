@@ -0,0 +1,140 @@
+import pytest
+
+from idoit_api.base import API
+from idoit_api.const import CREATE_ENTRIES, READ_DATA, UPDATE_ENTRIES
+from idoit_api.exceptions import InvalidParams
+from idoit_api.mixins import PermissionException
+from idoit_api.objects import CMDBCategoryEndpoint, same_value
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.writes = []
+    for method in ('cmdb.category.create', 'cmdb.category.update'):
+        fake.register(method, _recorded(fake, method))
+    for i in range(20):
+        obj_id = fake.add_object('server{}'.format(i))
+        fake.add_entry(obj_id, 'C__CATG__MODEL', title='model{}'.format(obj_id), serial=str(obj_id + 1000),
+                       manufacturer={'id': '3', 'title': 'Dell', 'const': None})
+    fake.add_entry(1000, 'C__CATG__IP', hostname='web01')
+    fake.add_entry(1000, 'C__CATG__IP', hostname='web02')
+    return fake
+
+
+def _recorded(fake, method):
+    handler = fake.methods[method]
+
+    def record(params):
+        fake.writes.append((method, params['objID'], dict(params['data'])))
+        return handler(params)
+    return record
+
+
+@pytest.fixture
+def ep(fake):
+    api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+    return CMDBCategoryEndpoint(api=api, permission_level=UPDATE_ENTRIES)
+
+
+def model(obj_id, **data):
+    values = {'title': 'model{}'.format(obj_id), 'serial': 1000 + obj_id, 'manufacturer': 'Dell'}
+    values.update(data)
+    return {'objID': obj_id, 'category': 'C__CATG__MODEL', 'data': values}
+
+
+def entries(fake, obj_id, category):
+    return [dict(data, id=entry_id) for entry_id, (o, c, _, data) in sorted(fake.entries.items())
+            if o == obj_id and c == category]
+
+
+class TestBulkSave:
+
+    def test_only_changes_are_written(self, ep, fake):
+        obj_id = fake.add_object('server20')
+        items = [model(i) for i in range(1000, 1020)]
+        items[4] = model(1004, serial=9999)
+        items.append(model(obj_id))
+
+        summary = ep.bulk_save(items, chunk_size=8)
+        assert summary.as_dict() == {'created': 1, 'updated': 1, 'unchanged': 19, 'failed': 0}
+        assert fake.writes == [
+            ('cmdb.category.update', 1004, {'serial': 9999, 'category_id': '5'}),
+            ('cmdb.category.create', obj_id, {'title': 'model1020', 'serial': 2020, 'manufacturer': 'Dell'})]
+        assert entries(fake, 1004, 'C__CATG__MODEL')[0]['serial'] == 9999
+
+        fake.writes = []
+        assert ep.bulk_save(items, chunk_size=8).as_dict() == {'created': 0, 'updated': 0, 'unchanged': 21,
+                                                               'failed': 0}
+        assert fake.writes == []
+
+    def test_multi_value_categories(self, ep, fake):
+        summary = ep.bulk_save([
+            {'objID': 1000, 'category': 'C__CATG__IP', 'data': {'hostname': 'web01'}},
+            {'objID': 1000, 'category': 'C__CATG__IP', 'data': {'id': 22, 'hostname': 'web02-new'}},
+            {'objID': 1000, 'category': 'C__CATG__IP', 'data': {'hostname': 'web03'}},
+        ])
+        assert summary.as_dict() == {'created': 1, 'updated': 1, 'unchanged': 1, 'failed': 0}
+        assert [e['hostname'] for e in entries(fake, 1000, 'C__CATG__IP')] == ['web01', 'web02-new', 'web03']
+
+    def test_update_hits_matched_entry(self, ep, fake):
+        # without category_id the update would go to the first entry of the object
+        summary = ep.bulk_save([{'objID': 1000, 'category': 'C__CATG__IP', 'data': {'id': '22', 'domain': 'lan'}}])
+        assert summary.as_dict() == {'created': 0, 'updated': 1, 'unchanged': 0, 'failed': 0}
+        assert entries(fake, 1000, 'C__CATG__IP') == [{'id': 21, 'hostname': 'web01'},
+                                                      {'id': 22, 'hostname': 'web02', 'domain': 'lan'}]
+
+    def test_failures(self, ep, fake):
+        summary = ep.bulk_save([model(1000, serial=1), model(666), model(1001, serial=2)])
+        assert summary.as_dict() == {'created': 0, 'updated': 2, 'unchanged': 0, 'failed': 1}
+        assert not summary.ok
+        assert summary.failed[0].index == 1
+        assert summary.failed[0].method == 'cmdb.category.read'
+        assert isinstance(summary.failed[0].error, InvalidParams)
+
+    def test_unknown_id(self, ep, fake):
+        summary = ep.bulk_save([
+            {'objID': 1000, 'category': 'C__CATG__IP', 'data': {'id': 99999, 'hostname': 'web01'}},
+            {'objID': 1000, 'category': 'C__CATG__IP', 'data': {'id': 22, 'hostname': 'web02-new'}},
+        ])
+        assert summary.as_dict() == {'created': 0, 'updated': 1, 'unchanged': 0, 'failed': 1}
+        assert summary.failed[0].index == 0
+        assert isinstance(summary.failed[0].error, InvalidParams)
+        assert [e['hostname'] for e in entries(fake, 1000, 'C__CATG__IP')] == ['web01', 'web02-new']
+
+    def test_create_permission(self, fake):
+        obj_id = fake.add_object('server20')
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        ep = CMDBCategoryEndpoint(api=api, permission_level=CREATE_ENTRIES)
+
+        summary = ep.bulk_save([model(obj_id), model(1000, serial=1), model(1001)])
+        assert summary.as_dict() == {'created': 1, 'updated': 0, 'unchanged': 1, 'failed': 1}
+        assert summary.failed[0].index == 1
+        assert summary.failed[0].method == 'cmdb.category.update'
+        assert isinstance(summary.failed[0].error, PermissionException)
+        assert [method for method, _, _ in fake.writes] == ['cmdb.category.create']
+
+    def test_permission(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        with pytest.raises(PermissionException):
+            CMDBCategoryEndpoint(api=api, permission_level=READ_DATA).bulk_save([model(1000)])
+        assert fake.writes == []
+
+
+class TestSameValue:
+
+    @pytest.mark.parametrize('current, desired', [
+        ('1', 1), ('1.5', 1.5), (None, ''), ('1', True), ({'id': '3', 'title': 'Dell'}, 3),
+        ({'id': '3', 'title': 'Dell'}, 'Dell'), ([{'id': '1'}, {'id': '2'}], [1, 2]), ({'a': 1}, {'a': 1}),
+    ])
+    def test_same(self, current, desired):
+        assert same_value(current, desired)
+
+    @pytest.mark.parametrize('current, desired', [
+        ('1', 2), (None, 0), ({'id': '3', 'title': 'Dell'}, 'HP'), ([{'id': '1'}], [1, 2]), ({'a': 1}, {'a': 2}),
+        ('x', ['x']),
+    ])
+    def test_different(self, current, desired):
+        assert not same_value(current, desired)
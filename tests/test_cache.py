@@ -0,0 +1,105 @@
+import pytest
+
+from idoit_api.base import API
+from idoit_api.cache import ResponseCache
+from idoit_api.objects import CMDBCategoryEndpoint, IdoitEndpoint
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.register('cmdb.category.read', lambda params: [{'objID': params['objID']}])
+    fake.register('cmdb.category.update', lambda params: {'success': True})
+    return fake
+
+
+@pytest.fixture
+def api(fake):
+    yield API(url="https://cmdb.example.de", transport=LocalTransport(fake), cache=ResponseCache(ttl=60))
+
+
+class TestResponseCache:
+
+    def test_key_normalization(self):
+        cache = ResponseCache()
+        cache.set('cmdb.category.read', {'objID': 1, 'category': 'C__CATG__IP', 'apikey': 'a'}, 'result')
+        assert cache.get('cmdb.category.read', {'category': 'C__CATG__IP', 'objID': 1}) == (True, 'result')
+        assert cache.get('cmdb.category.read', {'category': 'C__CATG__IP', 'objID': 2}) == (False, None)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru(self):
+        cache = ResponseCache(maxsize=2)
+        cache.set('a.read', None, 1)
+        cache.set('b.read', None, 2)
+        cache.get('a.read')
+        cache.set('c.read', None, 3)
+        assert cache.get('b.read') == (False, None)
+        assert cache.get('a.read') == (True, 1)
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl(self, mocker):
+        clock = mocker.patch('idoit_api.cache.time.monotonic', return_value=100)
+        cache = ResponseCache(ttl=10)
+        cache.set('a.read', None, 1)
+        clock.return_value = 109
+        assert cache.get('a.read') == (True, 1)
+        clock.return_value = 111
+        assert cache.get('a.read') == (False, None)
+        assert len(cache) == 0
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.set('cmdb.category.read', {'objID': 1, 'category': 'C__CATG__IP'}, 1)
+        cache.set('cmdb.category.read', {'objID': 1, 'category': 'C__CATG__GLOBAL'}, 2)
+        cache.set('cmdb.category.read', {'objID': 2, 'category': 'C__CATG__IP'}, 3)
+        cache.invalidate(1)
+        assert len(cache) == 1
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_invalidate_normalizes_obj_id(self):
+        cache = ResponseCache()
+        cache.set('cmdb.category.read', {'objID': 12, 'category': 'C__CATG__IP'}, 1)
+        cache.set('cmdb.category.read', {'objID': '12', 'category': 'C__CATG__GLOBAL'}, 2)
+        cache.invalidate('12')
+        assert len(cache) == 0
+
+        cache.set('cmdb.category.read', {'objID': '12', 'category': 'C__CATG__IP'}, 1)
+        cache.invalidate(12)
+        assert len(cache) == 0
+
+
+class TestAPICache:
+
+    def test_read_only_methods_are_cached(self, api, fake):
+        ep = IdoitEndpoint(api=api)
+        for _ in range(3):
+            ep.get_version()
+        assert fake.call_count == 1
+        assert api.cache.stats()['hits'] == 2
+
+    def test_writes_invalidate(self, api, fake):
+        ep = CMDBCategoryEndpoint(api=api, permission_level=50)
+        ep.read(objID=1, category='C__CATG__IP')
+        ep.read(objID=1, category='C__CATG__IP')
+        assert fake.call_count == 1
+
+        ep.update(objID=1, category='C__CATG__IP')
+        ep.read(objID=1, category='C__CATG__IP')
+        assert fake.call_count == 3
+
+    def test_writes_without_obj_id_keep_cache(self, api, fake):
+        fake.register('cmdb.category.create', lambda params: {'id': '1', 'success': True})
+        ep = CMDBCategoryEndpoint(api=api, permission_level=50)
+        ep.read(objID=1, category='C__CATG__IP')
+        ep.create(category='C__CATG__IP', data={})
+        ep.read(objID=1, category='C__CATG__IP')
+        assert fake.call_count == 2
+        assert len(api.cache) == 1
+
+    def test_writes_are_not_cached(self, api, fake):
+        api.request('cmdb.category.update', {'objID': 1})
+        api.request('cmdb.category.update', {'objID': 1})
+        assert fake.call_count == 2
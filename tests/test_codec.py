@@ -0,0 +1,70 @@
+import json
+import pytest
+
+from idoit_api.base import API
+from idoit_api.codec import JSONCodec, OrjsonCodec, UjsonCodec, get_codec, orjson, ujson
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+CODECS = ['json',
+          pytest.param('orjson', marks=pytest.mark.skipif(orjson is None, reason='orjson is not installed')),
+          pytest.param('ujson', marks=pytest.mark.skipif(ujson is None, reason='ujson is not installed'))]
+
+
+class TestCodec:
+
+    @pytest.mark.parametrize('name', CODECS)
+    def test_roundtrip(self, name):
+        codec = get_codec(name)
+        data = {'id': 1, 'title': 'Server ä', 'nested': [{'a': None, 'b': 1.5, 'c': True}]}
+        encoded = codec.dumps(data)
+        assert isinstance(encoded, bytes)
+        assert codec.loads(encoded) == data
+        assert json.loads(encoded.decode('utf-8')) == data
+
+    def test_get_codec(self):
+        codec = JSONCodec()
+        assert get_codec(codec) is codec
+        assert isinstance(get_codec('json'), JSONCodec)
+        if orjson is not None:
+            assert isinstance(get_codec(), OrjsonCodec)
+        with pytest.raises(ValueError):
+            get_codec('yaml')
+
+    def test_missing_library(self, monkeypatch):
+        monkeypatch.setattr('idoit_api.codec.ujson', None)
+        with pytest.raises(ImportError):
+            UjsonCodec()
+
+
+class TestEncodeRequest:
+
+    @pytest.mark.parametrize('name', CODECS)
+    @pytest.mark.parametrize('params', [None, {}, {'objID': 1, 'category': 'C__CATG__GLOBAL', 'filter': {'ids': [1]}}])
+    def test_matches_request_body(self, name, params):
+        api = API(url="https://cmdb.example.de", codec=name)
+        original = dict(params) if params is not None else None
+
+        request = json.loads(api._encode_request('cmdb.category.read', params).decode('utf-8'))
+        expected = api.build_request_body('cmdb.category.read', params)
+        expected['id'] = request['id']
+
+        assert request == expected
+        assert params == original
+
+    def test_apikey_in_params(self):
+        api = API(url="https://cmdb.example.de", codec='json')
+        request = json.loads(api._encode_request('idoit.version', {'apikey': 'other'}).decode('utf-8'))
+        assert request['params'] == {'apikey': api.key}
+
+    def test_request_ids(self):
+        api = API(url="https://cmdb.example.de")
+        ids = [json.loads(api._encode_request('idoit.version'))['id'] for _ in range(3)]
+        assert ids == [1, 2, 3]
+
+    @pytest.mark.parametrize('name', CODECS)
+    def test_request(self, name):
+        fake = FakeIdoit()
+        fake.register('cmdb.category.read', lambda params: [{'objID': params['objID']}])
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake), codec=name)
+        assert api.request('cmdb.category.read', {'objID': 5}) == [{'objID': 5}]
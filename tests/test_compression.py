@@ -0,0 +1,111 @@
+import gzip
+import zlib
+import pytest
+
+from idoit_api.base import API
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import (
+    RequestsTransport, Urllib3Transport, LocalTransport, TransportResponse, compress_body, decode_content
+)
+
+
+def objects(count):
+    return [{'id': str(i), 'title': 'server-{:06d}'.format(i), 'type_title': 'Server'} for i in range(count)]
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.register('cmdb.objects.read', lambda params: objects(params.get('limit', 10)))
+    fake.register('cmdb.object.create', lambda params: {'id': 1, 'title_length': len(params['title'])})
+    return fake
+
+
+class TestCompressBody:
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'deflate'])
+    def test_round_trip(self, encoding):
+        data = b'{"method": "cmdb.objects.read"}' * 100
+        compressed = compress_body(data, encoding)
+        assert len(compressed) < len(data)
+        assert decode_content(compressed) == data
+
+    def test_gzip_is_deterministic(self):
+        assert compress_body(b'x' * 100) == compress_body(b'x' * 100)
+        assert gzip.decompress(compress_body(b'x' * 100)) == b'x' * 100
+
+    def test_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            compress_body(b'{}', 'br')
+
+    def test_plain_content(self):
+        assert decode_content(b'{"result": 1}') == b'{"result": 1}'
+        assert decode_content(b'') == b''
+
+
+class TestRequestCompression:
+
+    def test_disabled_by_default(self):
+        sent = []
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(
+            lambda data, headers: sent.append((data, headers)) or b'{"jsonrpc": "2.0", "id": 1, "result": []}'))
+        api.request('cmdb.objects.read', {'filter': {'title': 'x' * 5000}})
+        data, headers = sent[0]
+        assert data.startswith(b'{')
+        assert 'content-encoding' not in headers
+        assert headers['accept-encoding'] == 'gzip, deflate'
+
+    @pytest.mark.parametrize('encoding, decompress', [('gzip', gzip.decompress), ('deflate', zlib.decompress)])
+    def test_above_threshold(self, encoding, decompress):
+        sent = []
+        api = API(url="https://cmdb.example.de", compress_threshold=1000, compress_encoding=encoding,
+                  transport=LocalTransport(lambda data, headers: sent.append((data, headers))
+                                           or b'{"jsonrpc": "2.0", "id": 1, "result": []}'))
+        api.request('cmdb.objects.read', {'filter': {'title': 'small'}})
+        api.request('cmdb.objects.read', {'filter': {'title': 'x' * 5000}})
+
+        assert 'content-encoding' not in sent[0][1]
+        data, headers = sent[1]
+        assert headers['content-encoding'] == encoding
+        assert b'x' * 5000 in decompress(data)
+        assert api.metrics.snapshot()['methods']['cmdb.objects.read']['request_bytes'] == len(sent[0][0]) + len(data)
+
+    def test_compressed_local_response(self):
+        body = b'{"jsonrpc": "2.0", "id": 1, "result": {"version": "1.15"}}'
+        api = API(url="https://cmdb.example.de",
+                  transport=LocalTransport(lambda data, headers: TransportResponse(
+                      200, compress_body(body), {'content-encoding': 'gzip'})))
+        assert api.request('idoit.version') == {'version': '1.15'}
+
+
+class TestFakeIdoitServer:
+
+    @pytest.mark.parametrize('transport', [RequestsTransport, Urllib3Transport])
+    def test_request(self, fake, transport):
+        with FakeIdoitServer(fake) as server:
+            api = API(url=server.url, transport=transport(), compress_threshold=1000)
+            result = api.request('cmdb.object.create', {'type': 'C__OBJTYPE__SERVER', 'title': 'x' * 10000})
+            assert result['title_length'] == 10000
+            assert server.bytes_received < 1000
+
+            assert len(api.request('cmdb.objects.read', {'limit': 1000})) == 1000
+            assert server.bytes_sent < 20000
+
+    @pytest.mark.parametrize('transport', [RequestsTransport, Urllib3Transport])
+    def test_batch(self, fake, transport):
+        with FakeIdoitServer(fake) as server:
+            api = API(url=server.url, transport=transport(), compress_threshold=1000)
+            results = api.batch_request([{'method': 'cmdb.objects.read', 'params': {'limit': 500}},
+                                         {'method': 'cmdb.object.create', 'params': {'title': 'y' * 5000}}])
+            assert len(results[0].result) == 500
+            assert results[1].result['title_length'] == 5000
+            assert server.bytes_received < 1000
+
+    def test_small_responses_are_not_compressed(self, fake):
+        with FakeIdoitServer(fake) as server:
+            api = API(url=server.url)
+            api.request('idoit.version')
+            plain = server.bytes_sent
+            server.compress_min_size = None
+            api.request('cmdb.objects.read', {'limit': 100})
+            assert server.bytes_sent - plain > 3000
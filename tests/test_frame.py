@@ -0,0 +1,125 @@
+import pytest
+
+from idoit_api.base import API, CMDBDocument, CompactDocument
+from idoit_api.frame import Column, ResultFrame, numpy, pyarrow
+from idoit_api.objects import CMDBObjectsEndpoint
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+OBJECTS = [{
+    'id': str(i),
+    'title': 'server{}'.format(i),
+    'type': {'id': '5', 'const': 'C__OBJTYPE__SERVER' if i % 3 else 'C__OBJTYPE__CLIENT'},
+    'status': '2' if i % 4 else '3',
+    'sysid': 'SYSID_{:04d}'.format(i),
+} for i in range(20)]
+
+
+@pytest.fixture
+def frame():
+    return ResultFrame.from_records(OBJECTS)
+
+
+class TestColumn:
+
+    def test_kinds(self):
+        assert Column.from_values([1, 2, 3]).kind == 'int'
+        assert Column.from_values(['1', '-2', '30']).kind == 'int'
+        assert Column.from_values([1, None]).kind == 'float'
+        assert Column.from_values([1, 2.5]).kind == 'float'
+        assert Column.from_values(['a', None, 'a']).kind == 'category'
+        assert Column.from_values([True, False]).kind == 'object'
+        assert Column.from_values([[1], {}]).kind == 'object'
+        assert Column.from_values([2 ** 70]).kind == 'object'
+
+    def test_numeric_strings_stay_canonical(self):
+        column = Column.from_values(['007', '1e3', '12'])
+        assert column.kind == 'category'
+        assert list(column) == ['007', '1e3', '12']
+        for value in ['²', '１２', '٣', '-0', '12 ']:
+            assert list(Column.from_values([value, '12'])) == [value, '12']
+        assert list(Column.from_values(['-12', '0'])) == [-12, 0]
+        assert Column.from_values(['1', '2'], numeric_strings=False).kind == 'category'
+
+    def test_category_values(self):
+        column = Column.from_values(['b', 'a', 'b', None])
+        assert list(column) == ['b', 'a', 'b', None]
+        assert column[2] == 'b'
+        assert column.categories == ['b', 'a', None]
+        assert column.mask(['a', 'x']) == [False, True, False, False]
+
+
+class TestResultFrame:
+
+    def test_from_records(self, frame):
+        assert len(frame) == 20
+        assert frame.fields == ['id', 'title', 'type.id', 'type.const', 'status', 'sysid']
+        assert frame['id'].kind == 'int'
+        assert frame['type.const'].kind == 'category'
+        assert next(iter(frame)) == {'id': 0, 'title': 'server0', 'type.id': 5, 'type.const': 'C__OBJTYPE__CLIENT',
+                                     'status': 3, 'sysid': 'SYSID_0000'}
+
+    def test_documents_pages_and_missing_fields(self):
+        records = [[CMDBDocument({'id': 1})], CompactDocument({'id': 2, 'title': 'b'}), {'id': 3}]
+        frame = ResultFrame.from_records(records, flatten=False)
+        assert frame.to_dicts() == [{'id': 1, 'title': None}, {'id': 2, 'title': 'b'}, {'id': 3, 'title': None}]
+
+    def test_fields(self):
+        frame = ResultFrame.from_records(OBJECTS, fields=['id', 'type.const', 'missing'])
+        assert frame.fields == ['id', 'type.const', 'missing']
+        assert list(frame['missing']) == [None] * 20
+
+    def test_invalid_records(self):
+        with pytest.raises(TypeError):
+            ResultFrame.from_records([1, 2])
+        with pytest.raises(ValueError):
+            ResultFrame({'a': Column.from_values([1]), 'b': Column.from_values([1, 2])})
+
+    def test_filter(self, frame):
+        servers = frame.filter(type__const='C__OBJTYPE__SERVER', status='2')
+        expected = [o for o in OBJECTS if o['type']['const'] == 'C__OBJTYPE__SERVER' and o['status'] == '2']
+        assert [row['id'] for row in servers] == [int(o['id']) for o in expected]
+        assert len(frame.filter(id=[1, 2, 99])) == 2
+        assert len(frame.filter(type__const='C__OBJTYPE__UNKNOWN')) == 0
+        assert len(frame.filter(mask=[i < 5 for i in range(20)], status=3)) == 2
+
+    def test_counts(self, frame):
+        assert frame.value_counts('type.const') == {'C__OBJTYPE__CLIENT': 7, 'C__OBJTYPE__SERVER': 13}
+        assert frame.value_counts('status') == {3: 5, 2: 15}
+        assert frame.group_counts('status') == {(3, ): 5, (2, ): 15}
+        counts = frame.group_counts('type.const', 'status')
+        assert sum(counts.values()) == 20
+        assert counts[('C__OBJTYPE__CLIENT', 3)] == 2
+
+    def test_paged_result(self):
+        fake = FakeIdoit()
+        fake.register('cmdb.objects.read', lambda params: OBJECTS[int(params['limit'].split(',')[0]):][:8])
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        frame = CMDBObjectsEndpoint(api=api, permission_level=10).iterate(page_size=8).to_frame(fields=['id'])
+        assert list(frame['id']) == list(range(20))
+
+    def test_without_optional_libraries(self, frame, monkeypatch):
+        monkeypatch.setattr('idoit_api.frame.numpy', None)
+        monkeypatch.setattr('idoit_api.frame.pyarrow', None)
+        assert frame.value_counts('type.const') == {'C__OBJTYPE__CLIENT': 7, 'C__OBJTYPE__SERVER': 13}
+        assert len(frame.filter(id=[1, 2])) == 2
+        with pytest.raises(ImportError):
+            frame.to_numpy()
+        with pytest.raises(ImportError):
+            frame.to_arrow()
+        with pytest.raises(ImportError):
+            frame.to_parquet('objects.parquet')
+
+    @pytest.mark.skipif(numpy is None, reason='numpy is not installed')
+    def test_to_numpy(self, frame):
+        arrays = frame.to_numpy()
+        assert arrays['id'].tolist() == list(range(20))
+        assert not arrays['id'].flags.owndata
+
+    @pytest.mark.skipif(pyarrow is None, reason='pyarrow is not installed')
+    def test_to_arrow_and_parquet(self, frame, tmp_path):
+        table = frame.to_arrow()
+        assert table.num_rows == 20
+        assert table.column('type.const').to_pylist() == list(frame['type.const'])
+        frame.to_parquet(str(tmp_path / 'objects.parquet'))
+        assert pyarrow.parquet.read_table(str(tmp_path / 'objects.parquet')).num_rows == 20
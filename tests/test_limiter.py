@@ -0,0 +1,138 @@
+import threading
+import time
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from idoit_api.aio import AsyncAPI
+from idoit_api.base import API
+from idoit_api.exceptions import MethodNotFound
+from idoit_api.limiter import ConcurrencyLimiter, TokenBucket
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+from tests.test_retry import Clock
+
+
+class TestTokenBucket:
+
+    def test_rate(self):
+        clock = Clock()
+        waits = []
+        bucket = TokenBucket(rate=10, burst=2, clock=clock, sleep=waits.append)
+        assert [bucket.acquire() for _ in range(2)] == [0, 0]
+        assert bucket.acquire() == pytest.approx(0.1)
+        assert bucket.acquire() == pytest.approx(0.2)
+        clock.now = 1
+        assert bucket.acquire() == 0
+        assert waits == [pytest.approx(0.1), pytest.approx(0.2)]
+        assert bucket.waited == pytest.approx(0.3)
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestConcurrencyLimiter:
+
+    def complete(self, limiter, clock, latency, error=None):
+        start = limiter.acquire()
+        clock.now += latency
+        limiter.release(start, error)
+
+    def test_additive_increase(self):
+        clock = Clock()
+        limiter = ConcurrencyLimiter(initial=4, max_limit=6, target_latency=1, clock=clock)
+        for _ in range(6):
+            self.complete(limiter, clock, 0.1)
+        assert int(limiter.limit) == 5
+        for _ in range(100):
+            self.complete(limiter, clock, 0.1)
+        assert limiter.limit == 6
+
+    def test_multiplicative_decrease(self):
+        clock = Clock()
+        limiter = ConcurrencyLimiter(initial=16, target_latency=1, clock=clock)
+        starts = [limiter.acquire() for _ in range(8)]
+        clock.now = 2
+        for start in starts:
+            limiter.release(start)
+        # all of them were slowed down by the same overload
+        assert limiter.limit == 8
+        assert limiter.decreases == 1
+
+        self.complete(limiter, clock, 2)
+        assert limiter.limit == 4
+        for _ in range(10):
+            self.complete(limiter, clock, 5)
+        assert limiter.limit == limiter.min_limit
+
+    def test_errors(self):
+        clock = Clock()
+        limiter = ConcurrencyLimiter(initial=8, target_latency=1, clock=clock)
+        self.complete(limiter, clock, 0.1, MethodNotFound())
+        assert limiter.limit > 8
+        self.complete(limiter, clock, 0.1, ConnectionError())
+        assert int(limiter.limit) == 4
+
+    def test_baseline(self):
+        clock = Clock()
+        limiter = ConcurrencyLimiter(initial=8, tolerance=2, clock=clock)
+        for _ in range(5):
+            self.complete(limiter, clock, 0.1)
+        assert limiter.baseline == pytest.approx(0.1)
+        assert limiter.decreases == 0
+        self.complete(limiter, clock, 0.3)
+        assert limiter.decreases == 1
+
+    def test_limits_requests_in_flight(self):
+        lock = threading.Lock()
+        counts = {'current': 0, 'max': 0}
+        fake = FakeIdoit()
+
+        def handler(data, headers):
+            with lock:
+                counts['current'] += 1
+                counts['max'] = max(counts['max'], counts['current'])
+            time.sleep(0.005)
+            with lock:
+                counts['current'] -= 1
+            return fake(data, headers)
+
+        limiter = ConcurrencyLimiter(initial=3, max_limit=3)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(handler), limiter=limiter)
+        with ThreadPoolExecutor(max_workers=12) as executor:
+            results = list(executor.map(lambda _: api.request('idoit.version'), range(48)))
+        assert len(results) == 48
+        assert counts['max'] <= 3
+        assert api.stats()['limiter']['in_flight'] == 0
+
+    def test_rate_limit(self):
+        limiter = ConcurrencyLimiter(rate=1000, burst=1)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(FakeIdoit()), limiter=limiter)
+        for _ in range(5):
+            api.request('idoit.version')
+        assert api.stats()['limiter']['rate_limit_wait'] > 0
+
+    def test_stream_request(self):
+        clock = Clock()
+        limiter = ConcurrencyLimiter(initial=2, target_latency=1, clock=clock)
+        fake = FakeIdoit()
+        fake.populate(5)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake), limiter=limiter)
+
+        stream = api.stream_request('cmdb.objects.read', chunk_size=64)
+        next(stream)
+        assert limiter.in_flight == 1
+        # reading a large result takes long, that is no sign of an overloaded CMDB
+        clock.now += 10
+        assert len(list(stream)) == 4
+        assert limiter.in_flight == 0
+        assert limiter.decreases == 0
+
+        stream = api.stream_request('cmdb.objects.read')
+        next(stream)
+        stream.close()
+        assert limiter.in_flight == 0
+
+    def test_async_api(self):
+        with pytest.raises(ValueError):
+            AsyncAPI(url="https://cmdb.example.de", limiter=ConcurrencyLimiter())
@@ -0,0 +1,103 @@
+import pytest
+
+from idoit_api.base import API
+from idoit_api.cache import ResponseCache
+from idoit_api.metrics import Histogram, Metrics
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+from idoit_api.utils import del_env_credentials
+from tests.test_session import ExpiringSessions, make_api
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.register('cmdb.category.read', lambda params: [{'objID': params['objID']}])
+    return fake
+
+
+@pytest.fixture
+def api(fake):
+    yield API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+
+
+class TestHistogram:
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 1001):
+            histogram.record(value / 1000.0)
+        snapshot = histogram.snapshot()
+        assert snapshot['count'] == 1000
+        assert snapshot['min'] == 0.001 and snapshot['max'] == 1.0
+        assert snapshot['p50'] == pytest.approx(0.5, rel=0.05)
+        assert snapshot['p95'] == pytest.approx(0.95, rel=0.05)
+        assert snapshot['p99'] == pytest.approx(0.99, rel=0.05)
+
+    def test_empty(self):
+        assert Histogram().snapshot()['p50'] is None
+
+
+class TestMetrics:
+
+    def test_request(self, api):
+        api.request('idoit.version')
+        api.request('idoit.version')
+        stats = api.stats()['methods']['idoit.version']
+        assert stats['calls'] == 2
+        assert stats['latency']['count'] == 2
+        assert stats['request_bytes'] > 0 and stats['response_bytes'] > 0
+
+    def test_errors(self, api):
+        with pytest.raises(Exception):
+            api.request('cmdb.unknown.read')
+        assert api.stats()['methods']['cmdb.unknown.read']['errors'] == {'MethodNotFound': 1}
+
+    def test_batch(self, api):
+        results = api.batch_request([('cmdb.category.read', {'objID': i}) for i in range(3)] +
+                                    [('cmdb.unknown.read', {'objID': 1})], chunk_size=2)
+        assert len(results) == 4
+
+        stats = api.stats()
+        assert stats['methods']['batch']['calls'] == 2
+        assert stats['batch_sizes']['count'] == 2
+        assert stats['batch_sizes']['max'] == 2
+        assert stats['methods']['cmdb.unknown.read']['errors'] == {'MethodNotFound': 1}
+
+    def test_cache_hits(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake), cache=ResponseCache())
+        api.request('idoit.version')
+        api.request('idoit.version')
+        stats = api.stats()
+        assert stats['methods']['idoit.version']['calls'] == 1
+        assert stats['methods']['idoit.version']['cached'] == 1
+        assert stats['cache']['hits'] == 1
+
+    def test_relogin(self):
+        handler = ExpiringSessions()
+        api = make_api(handler)
+        try:
+            api.login()
+            handler.expire_all()
+            api.request('idoit.version')
+        finally:
+            del_env_credentials()
+
+        stats = api.stats()
+        assert stats['logins'] == 2
+        assert stats['relogins'] == 1
+        assert stats['methods']['idoit.version']['calls'] == 1
+
+    def test_hooks(self, api):
+        events = []
+        api.metrics.add_hook(lambda event, data: events.append((event, data.get('method'))))
+        api.metrics.add_hook(lambda event, data: 1 / 0)
+        api.request('idoit.version')
+        assert ('request', 'idoit.version') in events
+        assert ('transfer', 'idoit.version') in events
+
+    def test_shared_metrics(self, fake):
+        metrics = Metrics()
+        for _ in range(2):
+            API(url="https://cmdb.example.de", transport=LocalTransport(fake), metrics=metrics).request('idoit.version')
+        assert metrics.snapshot()['methods']['idoit.version']['calls'] == 2
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import pytest
+import threading
+
+from idoit_api.aio import AsyncAPI
+from idoit_api.base import API
+from idoit_api.exceptions import MethodNotFound, UnknownError
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import AsyncLocalTransport, LocalTransport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.register('test.echo', lambda params: params.get('value'))
+    fake.batch_sizes = []
+
+    def handler(data, headers):
+        payload = json.loads(data.decode('utf-8'))
+        fake.batch_sizes.append(len(payload) if isinstance(payload, list) else 0)
+        return fake.handle_bytes(data, headers)
+
+    fake.handler = handler
+    return fake
+
+
+def run_threads(api, methods):
+    results = [None] * len(methods)
+
+    def call(i, method):
+        try:
+            results[i] = api.request(method, {'value': i})
+        except Exception as err:
+            results[i] = err
+
+    threads = [threading.Thread(target=call, args=(i, m)) for i, m in enumerate(methods)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestMicroBatcher:
+
+    def test_disabled_by_default(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake.handler))
+        assert api.request('test.echo', {'value': 1}) == 1
+        assert fake.batch_sizes == [0]
+
+    def test_concurrent_calls_are_batched(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake.handler), micro_batch_window=0.2)
+        results = run_threads(api, ['test.echo'] * 20)
+        api.close()
+
+        assert results == list(range(20))
+        assert sum(fake.batch_sizes) == 20
+        assert len(fake.batch_sizes) < 20
+        assert api._micro_batcher.calls_sent == 20
+
+    def test_errors_go_to_their_caller(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake.handler), micro_batch_window=0.1)
+        results = run_threads(api, ['test.echo', 'test.missing', 'test.echo'])
+        api.close()
+
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], MethodNotFound)
+
+    def test_malformed_response_goes_to_its_caller(self, fake):
+        def handler(data, headers):
+            responses = fake.handle(json.loads(data.decode('utf-8')))
+            for response in responses if isinstance(responses, list) else [responses]:
+                if response['result'] == 1:
+                    del response['result']
+            return json.dumps(responses).encode('utf-8')
+
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(handler), micro_batch_window=0.1)
+        results = run_threads(api, ['test.echo'] * 3)
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], UnknownError)
+
+        # the dispatcher thread survived the malformed response
+        assert api.request('test.echo', {'value': 5}) == 5
+        api.close()
+
+    def test_max_size(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake.handler), micro_batch_window=5,
+                  micro_batch_size=4)
+        results = run_threads(api, ['test.echo'] * 8)
+        api.close()
+
+        assert results == list(range(8))
+        assert fake.batch_sizes == [4, 4]
+
+    def test_custom_headers_bypass_batching(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake.handler), micro_batch_window=5)
+        assert api.request('test.echo', {'value': 3}, headers={'X-Test': '1'}) == 3
+        assert fake.batch_sizes == [0]
+
+
+class TestAsyncMicroBatcher:
+
+    def test_concurrent_calls_are_batched(self, fake):
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake.handler),
+                           micro_batch_window=0.05)
+            results = await asyncio.gather(*[api.request('test.echo', {'value': i}) for i in range(10)])
+            await api.close()
+            return results
+
+        assert asyncio.run(main()) == list(range(10))
+        assert fake.batch_sizes == [10]
+
+    def test_errors_and_max_size(self, fake):
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake.handler),
+                           micro_batch_window=5, micro_batch_size=3)
+            results = await asyncio.gather(*[api.request(m, {'value': i}) for i, m in enumerate(
+                ['test.echo', 'test.missing', 'test.echo'])], return_exceptions=True)
+            await api.close()
+            return results
+
+        results = asyncio.run(main())
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], MethodNotFound)
+        assert fake.batch_sizes == [3]
+
+    def test_close_sends_queued_calls(self, fake):
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(fake.handler),
+                           micro_batch_window=5)
+            pending = asyncio.ensure_future(api.request('test.echo', {'value': 7}))
+            await asyncio.sleep(0)
+            await api.close()
+            return await pending
+
+        assert asyncio.run(main()) == 7
+        assert fake.batch_sizes == [1]
@@ -0,0 +1,165 @@
+import pytest
+import sqlite3
+
+from idoit_api.base import API
+from idoit_api.exceptions import InternalError
+from idoit_api.mirror import Mirror
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+
+class FailingFakeIdoit(FakeIdoit):
+    """Answers cmdb.category.read for the objects in failing with an error"""
+
+    failing = set()
+
+    def _handle_single(self, request):
+        params = request.get('params') or {}
+        if request.get('method') == 'cmdb.category.read' and int(params['objID']) in self.failing:
+            return self._error(request, InternalError.code, "read failed")
+        return super()._handle_single(request)
+
+
+class FakeCMDB:
+    """Objects and category entries served through FakeIdoit, records the reads"""
+
+    def __init__(self, count=25):
+        self.objects = {i: {'id': str(i), 'title': 'server{}'.format(i), 'type': '5', 'type_title': 'Server',
+                            'sysid': 'SYSID_{}'.format(i), 'status': '2', 'cmdb_status': '6',
+                            'updated': '2021-01-01 10:00:00'} for i in range(1, count + 1)}
+        self.category_reads = []
+        self.fail_listing_after = None
+
+        self.fake = FailingFakeIdoit()
+        self.fake.failing = set()
+        self.fake.register('cmdb.objects.read', self.objects_read)
+        self.fake.register('cmdb.category.read', self.category_read)
+
+    def objects_read(self, params):
+        offset, size = [int(v) for v in params['limit'].split(',')]
+        if self.fail_listing_after is not None and offset >= self.fail_listing_after:
+            raise RuntimeError('connection lost')
+        return [self.objects[i] for i in sorted(self.objects)][offset:offset + size]
+
+    def category_read(self, params):
+        obj_id = int(params['objID'])
+        self.category_reads.append((obj_id, params['category']))
+        if params['category'] == 'C__CATG__IP':
+            return [{'id': '1', 'hostname': 'host{}'.format(obj_id)}, {'id': '2', 'hostname': 'alias'}]
+        return [{'id': '1', 'title': self.objects[obj_id]['title']}]
+
+    def touch(self, obj_id):
+        self.objects[obj_id] = dict(self.objects[obj_id], title='renamed{}'.format(obj_id),
+                                    updated='2021-02-01 10:00:00')
+
+
+@pytest.fixture
+def cmdb():
+    return FakeCMDB()
+
+
+@pytest.fixture
+def mirror(cmdb):
+    api = API(url="https://cmdb.example.de", transport=LocalTransport(cmdb.fake))
+    with Mirror(api, categories=['global', 'C__CATG__IP'], page_size=10, batch_size=8) as mirror:
+        yield mirror
+
+
+class TestMirror:
+
+    def test_initial_sync(self, mirror, cmdb):
+        result = mirror.sync()
+        assert (result['objects'], result['changed'], result['removed']) == (25, 25, 0)
+        assert (result['synced'], result['failed']) == (25, 0)
+        assert len(mirror) == 25
+        assert len(cmdb.category_reads) == 50
+        assert mirror.last_sync is not None
+
+    def test_local_queries(self, mirror, cmdb):
+        mirror.sync()
+        cmdb.objects.clear()
+        assert mirror.get(3)['title'] == 'server3'
+        assert mirror.get(99) is None
+        assert [o['id'] for o in mirror.find(id=[2, 4, 99])] == ['2', '4']
+        assert len(mirror.find(type=5, title_like='server1%')) == 11
+        assert len(mirror.find(type_title='Server', limit=3)) == 3
+        assert mirror.category(7, 'ip') == [{'id': '1', 'hostname': 'host7'}, {'id': '2', 'hostname': 'alias'}]
+        assert mirror.category(7, 'C__CATG__GLOBAL') == [{'id': '1', 'title': 'server7'}]
+        assert len(list(mirror.entries('ip'))) == 50
+        rows = mirror.query("SELECT json_extract(data, '$.hostname') AS h FROM category_entries "
+                            "WHERE obj_id = 7 AND category = 'C__CATG__IP'")
+        assert sorted(row['h'] for row in rows) == ['alias', 'host7']
+        with pytest.raises(ValueError):
+            mirror.find(data='x')
+
+    def test_incremental_sync(self, mirror, cmdb):
+        mirror.sync()
+        cmdb.category_reads = []
+        cmdb.touch(3)
+        del cmdb.objects[5]
+        result = mirror.sync()
+        assert (result['objects'], result['changed'], result['removed'], result['synced']) == (24, 1, 1, 1)
+        assert sorted(cmdb.category_reads) == [(3, 'C__CATG__GLOBAL'), (3, 'C__CATG__IP')]
+        assert mirror.get(3)['title'] == 'renamed3'
+        assert mirror.category(3, 'global') == [{'id': '1', 'title': 'renamed3'}]
+        assert mirror.get(5) is None and mirror.category(5, 'global') == []
+
+    def test_full_sync(self, mirror, cmdb):
+        mirror.sync()
+        cmdb.category_reads = []
+        assert mirror.sync(full=True)['synced'] == 25
+        assert len(cmdb.category_reads) == 50
+
+    def test_objects_without_timestamp(self, mirror, cmdb):
+        cmdb.objects[3]['updated'] = None
+        assert mirror.sync()['synced'] == 25
+        assert mirror.category(3, 'global') == [{'id': '1', 'title': 'server3'}]
+
+        cmdb.category_reads = []
+        assert mirror.sync()['synced'] == 0
+        assert mirror.sync(full=True)['synced'] == 25
+        assert len(cmdb.category_reads) == 50
+
+    def test_large_pages(self, tmp_path):
+        cmdb = FakeCMDB(count=1200)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(cmdb.fake))
+        with Mirror(api, page_size=1200) as mirror:
+            mirror._db.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+            assert mirror.sync()['objects'] == 1200
+            del cmdb.objects[1]
+            assert mirror.sync()['removed'] == 1
+
+    def test_failed_reads_are_retried(self, mirror, cmdb):
+        cmdb.fake.failing = {4}
+        result = mirror.sync()
+        assert (result['synced'], result['failed']) == (24, 1)
+        assert mirror.category(4, 'global') == []
+
+        cmdb.fake.failing = set()
+        cmdb.category_reads = []
+        assert mirror.sync()['synced'] == 1
+        assert sorted(cmdb.category_reads) == [(4, 'C__CATG__GLOBAL'), (4, 'C__CATG__IP')]
+
+    def test_resume_after_interrupted_listing(self, mirror, cmdb):
+        cmdb.fail_listing_after = 20
+        with pytest.raises(Exception):
+            mirror.sync()
+        assert len(mirror) == 20
+        assert mirror.last_sync is None
+
+        cmdb.fail_listing_after = None
+        result = mirror.sync()
+        assert (result['changed'], result['synced']) == (5, 25)
+
+    def test_persistence(self, cmdb, tmp_path):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(cmdb.fake))
+        path = str(tmp_path / 'cmdb.sqlite')
+        with Mirror(api, path, categories=['global']) as mirror:
+            mirror.sync()
+        cmdb.category_reads = []
+        with Mirror(api, path, categories=['global']) as mirror:
+            assert len(mirror) == 25
+            assert mirror.sync()['synced'] == 0
+        with Mirror(api, path, categories=['global', 'ip']) as mirror:
+            assert mirror.sync()['synced'] == 25
+        assert len(cmdb.category_reads) == 50
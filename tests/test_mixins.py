@@ -0,0 +1,26 @@
+import logging
+
+from idoit_api.base import CMDBDocument
+from idoit_api.mixins import LoggingMixin, get_logger, setup_logging
+
+
+class TestLoggingMixin:
+
+    def test_instances_share_handlers(self):
+        documents = [CMDBDocument({'id': i}) for i in range(100)]
+        logger = documents[0].log
+
+        assert all(d.log is logger for d in documents)
+        assert logger.handlers == [setup_logging()]
+
+    def test_loggers_share_queue_handler(self):
+        class Other(LoggingMixin):
+            pass
+
+        assert Other().log.handlers == CMDBDocument({'id': 1}).log.handlers
+
+    def test_log_level(self):
+        logger = get_logger('idoit_api.tests.level', logging.DEBUG)
+        assert logger.isEnabledFor(logging.DEBUG)
+        assert get_logger('idoit_api.tests.level', logging.WARNING) is logger
+        assert not logger.isEnabledFor(logging.INFO)
@@ -1,10 +1,13 @@
 import pytest
 import requests_mock
 
-from idoit_api.objects import IdoitEndpoint, CMDBCategoryEndpoint
+from idoit_api.objects import IdoitEndpoint, CMDBCategoryEndpoint, CMDBObjectsEndpoint
 from idoit_api.exceptions import InvalidParams
-from idoit_api.base import API, BaseEndpoint
+from idoit_api.base import API, BaseEndpoint, CMDBDocument, CompactDocument
 from idoit_api.objects import CMDBCategoryEntry
+from idoit_api.mixins import PermissionException
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
 from tests.test_base import simple_param_dict
 
 
@@ -114,7 +117,7 @@ class TestCMDBCategoryEndpoint:
             assert adapter.called
 
             assert adapter.last_request.json() == {
-                'id': 0, # TODO update once we count up for requests
+                'id': 1,
                 'jsonrpc': '2.0',
                 'method': 'cmdb.category.create',
                 # TODO apikey is emtpty, find out why
@@ -126,12 +129,130 @@ class TestCMDBCategoryEndpoint:
 
             assert adapter.call_count == 2
             assert adapter.last_request.json() == {
-                'id': 0,
+                'id': 2,
                 'jsonrpc': '2.0',
                 'method': 'cmdb.category.update',
                 # TODO apikey is emtpty, find out why
                 'params': {'apikey': '', 'category': 'C__CATS__APPLICATION', 'objID': 1455}
             }
 
+    def test_interchangeable_without_required_params(self):
+        class InterchangeableOnly(BaseEndpoint):
+            ENDPOINT = "cmdb.fake"
+            REQUIRED_PARAMS = {}
+            REQUIRED_INTERCHANGEABLE_PARAMS = {('category', 'catg_id'): True}
 
+        ep = InterchangeableOnly(api=API(url="https://cmdb.example.de"), permission_level=50)
+        with pytest.raises(InvalidParams, match=r".* mutually exclusive required parameters .*"):
+            ep.create(objID=1)
+
+    def test_malformed_rules(self):
+        with pytest.raises(AttributeError):
+            class Malformed(BaseEndpoint):
+                REQUIRED_PARAMS = {'objID': 'read'}
+
+    def test_overridden_methods_are_validated(self):
+        class OverridingEndpoint(CMDBCategoryEndpoint):
+            def read(self, **kwargs):
+                return kwargs
+
+        ep = OverridingEndpoint(api=API(url="https://cmdb.example.de"), permission_level=50)
+        assert ep.read.__name__ == 'read'
+        assert ep.read(objID=1, category='C__CATG__GLOBAL', status=None) == {'objID': 1, 'category': 'C__CATG__GLOBAL'}
+        with pytest.raises(InvalidParams):
+            ep.read(category='C__CATG__GLOBAL')
+
+    def test_delete_entry(self, category_ep):
+        with requests_mock.Mocker() as m:
+            m.post(url="https://cmdb.example.de", json={'jsonrpc': '2.0', 'id': 1, 'result': {'success': True}})
+            assert category_ep.delete(objID=12, category='C__CATG__IP', id=7) == {'success': True}
+            body = m.last_request.json()
+        assert body['method'] == 'cmdb.category.delete'
+        assert body['params']['objID'] == 12
+        assert body['params']['category'] == 'C__CATG__IP'
+        assert body['params']['id'] == 7
+
+    def test_signature_is_cached(self, category_ep):
+        assert category_ep._gen_api_method_signature() is CMDBCategoryEndpoint._API_METHOD_SIGNATURE
+
+
+class TestBulkOperations:
+
+    @pytest.fixture
+    def local_category_ep(self):
+        fake = FakeIdoit()
+        fake.register('cmdb.category.read', lambda params: [{'objID': params['objID']}])
+        fake.register('cmdb.category.update', lambda params: {'success': True})
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        yield CMDBCategoryEndpoint(api=api, permission_level=50)
+
+    def test_read_many_ordered(self, local_category_ep):
+        items = ({'objID': i, 'category': 'C__CATG__GLOBAL'} for i in range(50))
+        results = list(local_category_ep.read_many(items, max_workers=4, ordered=True))
+        assert [r.index for r in results] == list(range(50))
+        assert [r.result[0]['objID'] for r in results] == list(range(50))
+
+    def test_read_many_as_completed(self, local_category_ep):
+        items = [{'objID': i, 'category': 'C__CATG__GLOBAL'} for i in range(50)]
+        results = list(local_category_ep.read_many(items, max_workers=4))
+        assert sorted(r.index for r in results) == list(range(50))
+        assert all(r.result[0]['objID'] == r.index for r in results)
+
+    def test_failures_are_collected(self, local_category_ep):
+        items = [{'objID': 1, 'category': 'C__CATG__GLOBAL'}, {'objID': 2}, {'objID': 3, 'category': 'C__CATG__IP'}]
+        results = list(local_category_ep.update_many(items, ordered=True))
+        assert [r.ok for r in results] == [True, False, True]
+        assert isinstance(results[1].error, InvalidParams)
+        assert results[0].method == 'cmdb.category.update'
+
+    def test_permissions_per_item(self, local_category_ep):
+        local_category_ep.PERMISSION_LEVEL = 10
+        results = list(local_category_ep.update_many([{'objID': i, 'category': 'C__CATG__IP'} for i in range(3)]))
+        assert len(results) == 3
+        assert all(isinstance(r.error, PermissionException) for r in results)
+
+
+class TestCMDBObjectsEndpoint:
+
+    @pytest.fixture
+    def fake(self):
+        objects = [{'id': i, 'title': 'server{}'.format(i), 'type': 5} for i in range(23)]
+
+        def objects_read(params):
+            fake.limits.append(params['limit'])
+            offset, count = (int(v) for v in params['limit'].split(','))
+            return objects[offset:offset + count]
+
+        fake = FakeIdoit()
+        fake.limits = []
+        fake.register('cmdb.objects.read', objects_read)
+        return fake
+
+    @pytest.fixture
+    def objects_ep(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        yield CMDBObjectsEndpoint(api=api, permission_level=10)
+
+    @pytest.mark.parametrize('prefetch', [True, False])
+    def test_iterate(self, fake, objects_ep, prefetch):
+        objects = list(objects_ep.iterate(page_size=10, prefetch=prefetch, filter={'type': 5}))
+
+        assert all(isinstance(o, CMDBDocument) for o in objects)
+        assert [o.id for o in objects] == list(range(23))
+        assert fake.limits == ['0,10', '10,10', '20,10']
+
+    def test_iterate_compact(self, fake, objects_ep):
+        objects = list(objects_ep.iterate(page_size=3, document_class=CompactDocument))
+        assert objects and all(isinstance(o, CompactDocument) for o in objects)
+
+    def test_exact_multiple_of_page_size(self, fake, objects_ep):
+        objects_ep.PAGE_SIZE = 23
+        assert len(list(objects_ep)) == 23
+        assert fake.limits == ['0,23', '23,23']
+
+    def test_stop_early(self, fake, objects_ep):
+        pages = objects_ep.iterate(page_size=5).pages()
+        assert len(next(pages)) == 5
+        pages.close()
+        assert len(fake.limits) <= 2
 
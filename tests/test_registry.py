@@ -0,0 +1,77 @@
+import pytest
+
+from idoit_api.base import API
+from idoit_api.const import CATEGORY_CONST_MAPPING
+from idoit_api.objects import IdoitEndpoint, CMDBCategoryEndpoint
+from idoit_api.registry import ConstantsRegistry
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.register('cmdb.category.read', lambda params: [{'category': params['category']}])
+    return fake
+
+
+@pytest.fixture
+def idoit_ep(fake):
+    yield IdoitEndpoint(api=API(url="https://cmdb.example.de", transport=LocalTransport(fake)))
+
+
+@pytest.fixture
+def registry(tmp_path, idoit_ep):
+    registry = ConstantsRegistry("https://cmdb.example.de", path=str(tmp_path))
+    registry.refresh(idoit_ep)
+    yield registry
+
+
+class TestConstantsRegistry:
+
+    def test_category_lookups(self, registry):
+        assert registry.category_constant('global') == 'C__CATG__GLOBAL'
+        assert registry.category_name('C__CATG__GLOBAL') == 'global'
+        assert registry.category_id('global') == 1
+        assert registry.category_id('C__CATS__PERSON') == 48
+        assert registry.categories['s'].constant_for_id(48) == 'C__CATS__PERSON'
+        assert registry.category_group('backup_plan') == 'g_custom'
+        assert registry.category_constant('C__CATG__UNKNOWN') == 'C__CATG__UNKNOWN'
+
+    def test_name_collisions(self, registry):
+        # hand picked names win, derived names of other groups get a prefix
+        assert registry.category_constant('application') == 'C__CATS__APPLICATION'
+        assert registry.category_constant('software_assignment') == 'C__CATG__APPLICATION'
+        assert registry.category_constant('model') == 'C__CATG__MODEL'
+        assert registry.category_constant('s_model') == 'C__CATS__MODEL'
+
+    def test_object_types(self, registry):
+        assert registry.object_types.constant('server') == 'C__OBJTYPE__SERVER'
+        assert registry.object_types.id('C__OBJTYPE__SERVER') == 5
+        assert registry.object_types.constant_for_id('5') == 'C__OBJTYPE__SERVER'
+        assert registry.object_types.title('C__OBJTYPE__SERVER') == 'Server'
+
+    def test_persistence(self, tmp_path, registry, fake, idoit_ep):
+        loaded = ConstantsRegistry.load("https://cmdb.example.de", path=str(tmp_path))
+        assert loaded.version == '1.14.2'
+        assert loaded.category_id('ip') == 47
+
+        calls = fake.call_count
+        assert not loaded.refresh(idoit_ep)
+        assert fake.call_count == calls + 1
+
+        fake.version = '1.15'
+        assert loaded.refresh(idoit_ep)
+        assert ConstantsRegistry.load("https://cmdb.example.de", path=str(tmp_path)).version == '1.15'
+
+    def test_load_other_url(self, tmp_path, registry):
+        assert ConstantsRegistry.load("https://other.example.de", path=str(tmp_path)).version is None
+
+    def test_category_endpoint_resolves_names(self, fake, registry):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        ep = CMDBCategoryEndpoint(api=api, registry=registry, permission_level=10)
+        assert ep.read(objID=1, category='ip') == [{'category': 'C__CATG__IP'}]
+
+    def test_fixed_mapping(self):
+        assert CATEGORY_CONST_MAPPING['virtual_host'] == 'C__CATG__VIRTUAL_HOST'
+        assert CATEGORY_CONST_MAPPING['vrrp'] == 'C__CATG__VRRP'
@@ -0,0 +1,243 @@
+import asyncio
+import pytest
+
+from idoit_api.aio import AsyncAPI
+from idoit_api.base import API
+from idoit_api.exceptions import CircuitOpenError, MethodNotFound, ServerError
+from idoit_api.retry import CircuitBreaker, RetryPolicy, is_transient_error
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import AsyncLocalTransport, BaseTransport, LocalTransport, TransportResponse, TransportStream
+
+
+class Outage:
+    """Handler for LocalTransport, fails the first requests before it hands them to a FakeIdoit"""
+
+    def __init__(self, failures, error=None):
+        self.failures = failures
+        self.error = error
+        self.requests = 0
+        self.fake = FakeIdoit()
+        self.fake.register('cmdb.category.update', lambda params: {'success': True})
+
+    def __call__(self, data, headers):
+        self.requests += 1
+        if self.requests <= self.failures:
+            if self.error is not None:
+                raise self.error
+            return TransportResponse(502, b'<html><body>Bad Gateway</body></html>', {'content-type': 'text/html'})
+        return self.fake(data, headers)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_api(handler, retry=None, circuit_breaker=False):
+    delays = []
+    if retry is None:
+        retry = RetryPolicy(max_retries=3, sleep=delays.append)
+    api = API(url="https://cmdb.example.de", transport=LocalTransport(handler), retry=retry,
+              circuit_breaker=circuit_breaker)
+    return api, delays
+
+
+class TestRetry:
+
+    def test_reads_are_retried(self):
+        outage = Outage(2, error=ConnectionError('connection reset'))
+        api, delays = make_api(outage)
+        assert api.request('idoit.version')['version'] == '1.14.2'
+        assert outage.requests == 3
+        assert len(delays) == 2
+        assert api.stats()['methods']['idoit.version']['retries'] == 2
+
+    def test_html_error_page(self):
+        api, delays = make_api(Outage(10))
+        with pytest.raises(ServerError) as err:
+            api.request('idoit.version')
+        assert err.value.status_code == 502
+        assert b'Bad Gateway' in err.value.data
+        assert len(delays) == 3
+
+    def test_writes_are_not_retried(self):
+        outage = Outage(1, error=ConnectionError())
+        api, delays = make_api(outage)
+        with pytest.raises(ConnectionError):
+            api.request('cmdb.category.update', {'objID': 1})
+        assert outage.requests == 1
+
+        api, _ = make_api(outage, retry=RetryPolicy(retry_writes=True, sleep=lambda delay: None))
+        outage.requests = 0
+        assert api.request('cmdb.category.update', {'objID': 1}) == {'success': True}
+
+    def test_api_errors_are_not_retried(self):
+        outage = Outage(0)
+        api, delays = make_api(outage)
+        with pytest.raises(MethodNotFound):
+            api.request('cmdb.unknown.read')
+        assert outage.requests == 1
+
+    def test_batches(self):
+        outage = Outage(1, error=ConnectionError())
+        api, delays = make_api(outage)
+        results = api.batch_request([('idoit.version', {}), ('cmdb.unknown.read', {})])
+        assert results[0].ok and isinstance(results[1].error, MethodNotFound)
+        assert len(delays) == 1
+
+        outage.requests = 0
+        with pytest.raises(ConnectionError):
+            api.batch_request([('idoit.version', {}), ('cmdb.category.update', {})])
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5)
+        for attempt, bound in [(0, 1), (1, 2), (2, 4), (3, 5), (10, 5)]:
+            assert all(0 <= policy.delay(attempt) <= bound for _ in range(50))
+
+    def test_disabled(self):
+        outage = Outage(1, error=ConnectionError())
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(outage), retry=False)
+        with pytest.raises(ConnectionError):
+            api.request('idoit.version')
+        assert isinstance(API(url="https://cmdb.example.de").retry, RetryPolicy)
+
+    def test_transient_errors(self):
+        assert is_transient_error(ConnectionError())
+        assert is_transient_error(TimeoutError())
+        assert is_transient_error(ServerError(status_code=503))
+        assert is_transient_error(ServerError(status_code=429))
+        assert not is_transient_error(ServerError(status_code=404))
+        assert not is_transient_error(MethodNotFound())
+        assert not is_transient_error(ValueError())
+
+    def test_async(self):
+        outage = Outage(2, error=ConnectionError())
+
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(outage),
+                           retry=RetryPolicy(backoff=0.001), circuit_breaker=False)
+            return await api.request('idoit.version'), api.stats()
+
+        result, stats = asyncio.run(main())
+        assert result['version'] == '1.14.2'
+        assert stats['methods']['idoit.version']['retries'] == 2
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_recovers(self):
+        clock = Clock()
+        events = []
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        outage = Outage(5, error=ConnectionError())
+        api, delays = make_api(outage, retry=False, circuit_breaker=breaker)
+        api.metrics.add_hook(lambda event, data: events.append(data['state']) if event == 'circuit' else None)
+
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                api.request('idoit.version')
+        with pytest.raises(CircuitOpenError):
+            api.request('idoit.version')
+        assert outage.requests == 3
+        assert api.stats()['circuit_breaker'] == {'state': 'open', 'failures': 3, 'opened': 1, 'rejected': 1}
+
+        # the trial request fails, the circuit stays open
+        clock.now = 10
+        with pytest.raises(ConnectionError):
+            api.request('idoit.version')
+        with pytest.raises(CircuitOpenError):
+            api.request('idoit.version')
+
+        outage.failures = 0
+        clock.now = 20
+        assert api.request('idoit.version')['version'] == '1.14.2'
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert events == ['open', 'half-open', 'open', 'half-open', 'closed']
+
+    def test_api_errors_count_as_success(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record(ConnectionError())
+        breaker.record(MethodNotFound())
+        breaker.record(ConnectionError())
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_one_trial_at_a_time(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record(ConnectionError())
+        clock.now = 5
+        breaker.before_request()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record()
+        breaker.before_request()
+
+    def test_stops_retries(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        outage = Outage(10, error=ConnectionError())
+        api, delays = make_api(outage, circuit_breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            api.request('idoit.version')
+        assert outage.requests == 2
+
+
+class BrokenStream(BaseTransport):
+    """Streams the start of a result, then the connection breaks"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def post(self, url, data, headers):
+        raise NotImplementedError
+
+    def post_stream(self, url, data, headers, chunk_size=None):
+        self.requests += 1
+
+        def chunks():
+            yield b'{"jsonrpc": "2.0", "id": 1, "result": [1, 2, '
+            raise ConnectionError('connection reset')
+        return TransportStream(200, chunks())
+
+
+class TestStreamRequest:
+
+    def test_html_error_page(self):
+        outage = Outage(10)
+        api, delays = make_api(outage)
+        with pytest.raises(ServerError) as err:
+            list(api.stream_request('cmdb.objects.read'))
+        assert err.value.status_code == 502
+        assert b'Bad Gateway' in err.value.data
+        assert outage.requests == 4
+        assert api.stats()['methods']['cmdb.objects.read']['retries'] == 3
+
+    def test_retried_until_first_item(self):
+        outage = Outage(2, error=ConnectionError())
+        outage.fake.populate(3)
+        api, delays = make_api(outage)
+        assert len(list(api.stream_request('cmdb.objects.read'))) == 3
+        assert outage.requests == 3
+
+        transport = BrokenStream()
+        api = API(url="https://cmdb.example.de", transport=transport,
+                  retry=RetryPolicy(sleep=lambda delay: None), circuit_breaker=False)
+        items = []
+        with pytest.raises(ConnectionError):
+            for item in api.stream_request('cmdb.objects.read'):
+                items.append(item)
+        assert items == [1, 2]
+        assert transport.requests == 1
+
+    def test_circuit_breaker(self):
+        outage = Outage(10)
+        api, _ = make_api(outage, retry=False, circuit_breaker=CircuitBreaker(failure_threshold=2, clock=Clock()))
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                list(api.stream_request('cmdb.objects.read'))
+        with pytest.raises(CircuitOpenError):
+            list(api.stream_request('cmdb.objects.read'))
+        assert outage.requests == 2
@@ -0,0 +1,101 @@
+import time
+import pytest
+
+from idoit_api.base import API
+from idoit_api.const import DEEP_SEARCH
+from idoit_api.mirror import Mirror
+from idoit_api.objects import IdoitEndpoint
+from idoit_api.search import SearchIndex, tokenize
+from idoit_api.transport import LocalTransport
+from tests.test_mirror import FakeCMDB
+
+FIELDS = {'C__CATG__IP': ['hostname']}
+
+
+@pytest.fixture
+def cmdb():
+    cmdb = FakeCMDB(count=12)
+    cmdb.objects[3]['title'] = 'Webserver Berlin'
+    cmdb.fake.register('idoit.search', lambda params: [{'documentId': '1', 'value': 'from server'}])
+    return cmdb
+
+
+@pytest.fixture
+def api(cmdb):
+    return API(url="https://cmdb.example.de", transport=LocalTransport(cmdb.fake))
+
+
+@pytest.fixture
+def mirror(api):
+    with Mirror(api, categories=['ip']) as mirror:
+        mirror.sync()
+        yield mirror
+
+
+@pytest.fixture
+def index(mirror):
+    index = SearchIndex(fields=FIELDS)
+    assert index.update_from_mirror(mirror) == 12
+    return index
+
+
+class TestSearchIndex:
+
+    def test_tokenize(self):
+        assert tokenize('Web-Server 01.berlin') == ['web', 'server', '01', 'berlin']
+
+    def test_search(self, index):
+        results = index.search('web ber')
+        assert [(r['documentId'], r['key'], r['value']) for r in results] == [
+            ('3', 'Server > General > Title', 'Webserver Berlin')]
+        assert results[0]['link'] == '/?objID=3'
+
+        assert [r['value'] for r in index.search('host1')] == ['host1', 'host10', 'host11', 'host12']
+        assert index.search('host1')[0]['score'] == 100
+        assert len(index.search('server1', limit=2)) == 2
+        assert index.search('berlin nothing') == []
+        assert index.search(' - ') == []
+
+    def test_incremental_update(self, index, mirror, cmdb):
+        assert index.update_from_mirror(mirror) == 0
+
+        cmdb.touch(5)
+        del cmdb.objects[7]
+        mirror.sync()
+        assert index.update_from_mirror(mirror) == 2
+        assert [r['documentId'] for r in index.search('renamed5')] == ['5']
+        assert index.search('server5') == []
+        assert index.search('server7') == [] and 7 not in index
+        assert len(index) == 11
+
+    def test_staleness(self, mirror):
+        index = SearchIndex(fields=FIELDS, max_age=60)
+        assert index.is_stale
+        index.update_from_mirror(mirror)
+        assert not index.is_stale
+        index.updated_at = time.time() - 61
+        assert index.is_stale
+
+    def test_save_and_load(self, index, tmp_path):
+        path = str(tmp_path / 'index.json')
+        index.save(path)
+        loaded = SearchIndex.load(path)
+        assert loaded.fields == FIELDS
+        assert loaded.updated_at == index.updated_at
+        assert loaded.search('host1') == index.search('host1')
+        assert loaded.version(3) == index.version(3)
+
+
+class TestIdoitEndpointSearch:
+
+    def test_local_and_server_searches(self, api, index, cmdb):
+        ep = IdoitEndpoint(api=api, search_index=index)
+        cmdb.fake.call_count = 0
+        assert ep.search('webserver')[0]['documentId'] == '3'
+        assert cmdb.fake.call_count == 0
+
+        assert ep.search('webserver', mode=DEEP_SEARCH) == [{'documentId': '1', 'value': 'from server'}]
+        index.updated_at = None
+        assert ep.search('webserver') == [{'documentId': '1', 'value': 'from server'}]
+        assert IdoitEndpoint(api=api).search('webserver') == [{'documentId': '1', 'value': 'from server'}]
+        assert cmdb.fake.call_count == 3
@@ -0,0 +1,140 @@
+import json
+import os
+import stat
+import threading
+import time
+import pytest
+
+from idoit_api.base import API
+from idoit_api.exceptions import AuthenticationError
+from idoit_api.session import FileSessionStore
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import LocalTransport, TransportResponse
+from idoit_api.utils import del_env_credentials
+
+
+class ExpiringSessions:
+    """Handler that only accepts sessions it handed out and counts logins"""
+
+    def __init__(self):
+        self.fake = FakeIdoit()
+        self.valid = set()
+        self.logins = 0
+        self.lock = threading.Lock()
+
+    def expire_all(self):
+        self.valid.clear()
+
+    def __call__(self, data, headers):
+        request = json.loads(data.decode('utf-8'))
+        if request['method'] == 'idoit.login':
+            time.sleep(0.05)
+            with self.lock:
+                self.logins += 1
+                session_id = 'session-{}'.format(self.logins)
+                self.valid.add(session_id)
+            result = {'session-id': session_id}
+        elif headers.get('X-RPC-Auth-Session') not in self.valid:
+            error = {'code': AuthenticationError.code, 'data': 'session expired'}
+            return json.dumps({'jsonrpc': '2.0', 'error': error, 'id': request['id']}).encode('utf-8')
+        else:
+            return self.fake.handle_bytes(data, headers)
+        return TransportResponse(200, json.dumps({'jsonrpc': '2.0', 'result': result, 'id': request['id']}).encode())
+
+
+@pytest.fixture(autouse=True)
+def clean_env():
+    yield
+    del_env_credentials()
+
+
+@pytest.fixture
+def store(tmp_path):
+    yield FileSessionStore(path=str(tmp_path / 'sessions.json'))
+
+
+def make_api(handler, store=None):
+    return API(url="https://cmdb.example.de", username="user", password="pw", transport=LocalTransport(handler),
+               session_store=store)
+
+
+class TestFileSessionStore:
+
+    def test_roundtrip(self, store):
+        assert store.get("https://cmdb.example.de", "user") is None
+        store.set("https://cmdb.example.de", "user", "abc")
+        assert store.get("https://cmdb.example.de", "user") == "abc"
+        assert store.get("https://cmdb.example.de", "other") is None
+        assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+
+    def test_delete_only_matching_session(self, store):
+        store.set("https://cmdb.example.de", "user", "new")
+        store.delete("https://cmdb.example.de", "user", "old")
+        assert store.get("https://cmdb.example.de", "user") == "new"
+        store.delete("https://cmdb.example.de", "user", "new")
+        assert store.get("https://cmdb.example.de", "user") is None
+
+    def test_lock_is_reentrant(self, store):
+        with store.lock():
+            store.set("https://cmdb.example.de", "user", "abc")
+
+
+class TestSessionReuse:
+
+    def test_login_reuses_stored_session(self, store):
+        handler = ExpiringSessions()
+        first = make_api(handler, store)
+        first.login()
+        assert store.get("https://cmdb.example.de", "user") == 'session-1'
+
+        # a second process starts without a session in its environment
+        del os.environ['CMDB_SESSION_ID']
+        second = make_api(handler, store)
+        second.login()
+        assert second.session_id == 'session-1'
+        assert handler.logins == 1
+
+    def test_expired_stored_session_is_replaced(self, store):
+        handler = ExpiringSessions()
+        api = make_api(handler, store)
+        api.login()
+        handler.expire_all()
+
+        assert api.request('idoit.version')['version'] == '1.14.2'
+        assert handler.logins == 2
+        assert store.get("https://cmdb.example.de", "user") == 'session-2'
+
+
+class TestRelogin:
+
+    def test_single_flight(self):
+        handler = ExpiringSessions()
+        api = make_api(handler)
+        api.login()
+        handler.expire_all()
+
+        errors = []
+
+        def call():
+            try:
+                api.request('idoit.version')
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=call) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert handler.logins == 2
+        assert api.login_count == 2
+
+    def test_no_credentials(self):
+        handler = ExpiringSessions()
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(handler))
+        api.session_id = 'unknown'
+        with pytest.raises(AuthenticationError):
+            api.request('idoit.version')
+        assert not api.session_id
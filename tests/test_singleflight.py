@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from idoit_api.aio import AsyncAPI
+from idoit_api.base import API
+from idoit_api.exceptions import MethodNotFound
+from idoit_api.singleflight import SingleFlight
+from idoit_api.testing import FakeIdoit
+from idoit_api.transport import AsyncLocalTransport, LocalTransport
+
+
+class BlockingFake(FakeIdoit):
+    """FakeIdoit whose requests wait until release is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.requests = 0
+        self.register('cmdb.category.read', lambda params: [{'objID': params['objID']}])
+        self.register('cmdb.category.update', lambda params: {'success': True})
+
+    def __call__(self, data, headers):
+        self.requests += 1
+        assert self.release.wait(5)
+        return super().__call__(data, headers)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def fake():
+    return BlockingFake()
+
+
+class TestSingleFlight:
+
+    def test_identical_reads_are_sent_once(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake), single_flight=True)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(api.request, 'cmdb.category.read', {'category': 'C__CATG__IP', 'objID': 1})
+                       for _ in range(7)]
+            futures.append(executor.submit(api.request, 'cmdb.category.read', {'objID': 1, 'category': 'C__CATG__IP'}))
+            wait_for(lambda: api.single_flight.coalesced == 7)
+            fake.release.set()
+            results = [f.result() for f in futures]
+
+        assert fake.requests == 1
+        assert all(r == [{'objID': 1}] for r in results)
+        stats = api.stats()
+        assert stats['single_flight'] == {'executed': 1, 'coalesced': 7, 'in_flight': 0}
+        assert stats['methods']['cmdb.category.read']['coalesced'] == 7
+        assert stats['methods']['cmdb.category.read']['calls'] == 1
+
+    def test_different_params_and_writes(self, fake):
+        fake.release.set()
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake), single_flight=True)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: api.request('cmdb.category.read', {'objID': i}), range(4)))
+            list(executor.map(lambda i: api.request('cmdb.category.update', {'objID': 1}), range(4)))
+        assert fake.requests == 8
+        assert api.single_flight.coalesced == 0
+
+    def test_errors_are_shared(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise MethodNotFound()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.do, 'key', fail)
+            started.wait(5)
+            follower = executor.submit(flight.do, 'key', fail)
+            wait_for(lambda: flight.coalesced == 1)
+            release.set()
+            for future in (leader, follower):
+                with pytest.raises(MethodNotFound):
+                    future.result()
+        assert len(flight) == 0
+
+    def test_disabled_by_default(self):
+        assert API(url="https://cmdb.example.de").single_flight is None
+
+    def test_async(self):
+        fake = FakeIdoit()
+        requests = []
+
+        async def handler(data, headers):
+            requests.append(data)
+            await asyncio.sleep(0.01)
+            return fake(data, headers)
+
+        async def main():
+            api = AsyncAPI(url="https://cmdb.example.de", transport=AsyncLocalTransport(handler), single_flight=True)
+            results = await asyncio.gather(*[api.request('idoit.version') for _ in range(5)])
+            return results, api.stats()
+
+        results, stats = asyncio.run(main())
+        assert len(requests) == 1
+        assert all(r['version'] == '1.14.2' for r in results)
+        assert stats['single_flight']['coalesced'] == 4
@@ -0,0 +1,101 @@
+import json
+import pytest
+
+from idoit_api.base import API
+from idoit_api.exceptions import InvalidParams, MethodNotFound, UnknownError
+from idoit_api.objects import CMDBObjectsEndpoint
+from idoit_api.streaming import ChunkReader, iter_result
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import LocalTransport, RequestsTransport, Urllib3Transport
+
+
+def chunks_of(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def raise_error(response):
+    raise InvalidParams(data=response['error'].get('data'))
+
+
+class TestIterResult:
+
+    @pytest.mark.parametrize('size', [1, 3, 64, 100000])
+    def test_chunk_boundaries(self, size):
+        result = [{'id': 12345, 'title': 'Sérver ✓', 'values': [1.5, None, True, {'a': []}]}, 67890, "x", []]
+        data = json.dumps({'jsonrpc': '2.0', 'result': result, 'id': 1}, indent=2, ensure_ascii=False).encode()
+        assert list(iter_result(chunks_of(data, size), raise_error)) == result
+
+    def test_numbers_split_at_every_offset(self):
+        data = b'{"result": [1.25, 2e5, -3.5E-2, 40, 0.5e+10, [7.0]], "id": 1}'
+        for offset in range(1, len(data)):
+            assert list(iter_result([data[:offset], data[offset:]], raise_error)) == [
+                1.25, 2e5, -3.5e-2, 40, 0.5e10, [7.0]], offset
+
+    def test_key_order_and_scalar_result(self):
+        data = b'{"id": 1, "result": {"success": true}, "jsonrpc": "2.0"}'
+        assert list(iter_result(chunks_of(data, 5), raise_error)) == [{'success': True}]
+
+    def test_empty_result(self):
+        assert list(iter_result([b'{"result": [ ], "id": 1}'], raise_error)) == []
+
+    def test_error(self):
+        data = b'{"jsonrpc": "2.0", "error": {"code": -32602, "message": "", "data": "objID missing"}, "id": 1}'
+        with pytest.raises(InvalidParams):
+            list(iter_result(chunks_of(data, 4), raise_error))
+
+    @pytest.mark.parametrize('data', [b'{"result": [1, 2', b'[1, 2]', b'{"result": [1 2]}', b'{"result": [{"a": }]}'])
+    def test_malformed(self, data):
+        with pytest.raises(UnknownError):
+            list(iter_result(chunks_of(data, 3), raise_error))
+
+    def test_memory_is_bounded(self):
+        item = json.dumps({'id': 1, 'title': 'server', 'type': 'C__OBJTYPE__SERVER'}).encode()
+
+        def chunks():
+            yield b'{"jsonrpc": "2.0", "result": ['
+            for i in range(100000):
+                yield item + b','
+            yield item + b'], "id": 1}'
+
+        reader = ChunkReader(chunks())
+        count = 0
+        for _ in iter_result(reader, raise_error):
+            assert len(reader._buffer) < 4 * len(item)
+            count += 1
+        assert count == 100001
+
+
+class TestStreamRequest:
+
+    @pytest.fixture
+    def fake(self):
+        objects = [{'id': i, 'title': 'server{}'.format(i), 'type': 5} for i in range(50)]
+        fake = FakeIdoit()
+        fake.register('cmdb.objects.read', lambda params: objects)
+        return fake
+
+    def test_stream_request(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        items = list(api.stream_request('cmdb.objects.read', chunk_size=16))
+        assert [i['id'] for i in items] == list(range(50))
+
+        stats = api.stats()['methods']['cmdb.objects.read']
+        assert stats['calls'] == 1
+        assert stats['response_bytes'] > 0
+
+    def test_errors(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        with pytest.raises(MethodNotFound):
+            list(api.stream_request('cmdb.unknown.read', chunk_size=8))
+
+    @pytest.mark.parametrize('transport_class', [RequestsTransport, Urllib3Transport])
+    def test_http_transports(self, fake, transport_class):
+        with FakeIdoitServer(fake) as server:
+            with API(url=server.url, transport=transport_class()) as api:
+                items = list(api.stream_request('cmdb.objects.read', chunk_size=64))
+        assert len(items) == 50
+
+    def test_endpoint_stream(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        objects = list(CMDBObjectsEndpoint(api=api, permission_level=10).stream(chunk_size=32))
+        assert [o.title for o in objects] == ['server{}'.format(i) for i in range(50)]
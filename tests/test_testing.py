@@ -0,0 +1,127 @@
+import pytest
+
+from idoit_api.base import API
+from idoit_api.exceptions import InternalError, InvalidParams, ServerError
+from idoit_api.objects import CMDBCategoryEndpoint, CMDBObjectsEndpoint, IdoitEndpoint
+from idoit_api.retry import RetryPolicy
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import LocalTransport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeIdoit()
+    fake.populate(30)
+    return fake
+
+
+@pytest.fixture
+def api(fake):
+    return API(url="https://cmdb.example.de", transport=LocalTransport(fake), retry=False, circuit_breaker=False)
+
+
+class TestObjectsRead:
+
+    def test_paging(self, api):
+        ep = CMDBObjectsEndpoint(api=api, permission_level=10)
+        titles = [o.title for o in ep.iterate(page_size=7)]
+        assert titles == ['server-{:06d}'.format(i) for i in range(30)]
+
+    def test_filter_and_sort(self, api, fake):
+        fake.add_object('client-1', type='C__OBJTYPE__CLIENT')
+        assert [o['title'] for o in api.request('cmdb.objects.read', {'filter': {'type': 'C__OBJTYPE__CLIENT'}})] \
+            == ['client-1']
+        assert len(api.request('cmdb.objects.read', {'filter': {'type': 5}})) == 30
+        assert len(api.request('cmdb.objects.read', {'filter': {'title': 'server-00001%'}})) == 10
+        first = api.request('cmdb.objects.read', {'order_by': 'title', 'sort': 'DESC', 'limit': 1})
+        assert first[0]['title'] == 'server-000029'
+
+    def test_categories(self, api, fake):
+        obj_id = int(api.request('cmdb.objects.read', {'limit': 1})[0]['id'])
+        result = api.request('cmdb.objects.read', {'filter': {'ids': [obj_id]}, 'categories': True})
+        assert result[0]['categories']['C__CATG__IP'][0]['hostname'] == 'server-000000'
+
+
+class TestCategoryMethods:
+
+    def test_crud(self, api, fake):
+        ep = CMDBCategoryEndpoint(api=api, permission_level=50)
+        obj_id = fake.add_object('web01')
+
+        entry_id = int(ep.create(objID=obj_id, category='C__CATG__IP', data={'hostname': 'web01'})['id'])
+        ep.update(objID=obj_id, category='C__CATG__IP', data={'category_id': entry_id, 'domain': 'example.de'})
+        assert ep.read(objID=obj_id, category='C__CATG__IP') == [
+            {'id': str(entry_id), 'objID': str(obj_id), 'hostname': 'web01', 'domain': 'example.de'}]
+
+        ep.delete(objID=obj_id, category='C__CATG__IP', id=entry_id)
+        assert ep.read(objID=obj_id, category='C__CATG__IP') == []
+        assert len(ep.read(objID=obj_id, category='C__CATG__IP', status=ep.STATUS_DELETED)) == 1
+        api.request('cmdb.category.purge', {'objID': obj_id, 'category': 'C__CATG__IP', 'id': entry_id})
+        assert fake.entries.get(entry_id) is None
+
+    def test_save(self, api, fake):
+        obj_id = fake.add_object('web01')
+        entry = api.request('cmdb.category.save', {'objID': obj_id, 'category': 'C__CATG__MODEL',
+                                                   'data': {'title': 'R640'}})['entry']
+        api.request('cmdb.category.save', {'objID': obj_id, 'category': 'C__CATG__MODEL', 'entry': entry,
+                                           'data': {'title': 'R650'}})
+        assert api.request('cmdb.category.read', {'objID': obj_id, 'catg_id': 2})[0]['title'] == 'R650'
+
+    def test_errors(self, api):
+        with pytest.raises(InvalidParams):
+            api.request('cmdb.category.read', {'objID': 1, 'category': 'C__CATG__IP'})
+        with pytest.raises(InvalidParams):
+            api.request('cmdb.category.read', {'objID': 1000})
+
+
+class TestSearch:
+
+    def test_search(self, api):
+        ep = IdoitEndpoint(api=api)
+        results = ep.search('server-000012')
+        assert {r['key'] for r in results} == {'Server > General > Title', 'Server > C__CATG__IP > hostname'}
+        assert all(r['score'] == 100 for r in results)
+        assert len(ep.search('server-00001')) == 20
+
+
+class TestFaults:
+
+    def test_inject_error(self, api, fake):
+        fake.inject_error('idoit.version', times=2)
+        results = api.batch_request([('idoit.version', {})] * 3)
+        assert [r.ok for r in results] == [False, False, True]
+        assert isinstance(results[0].error, InternalError)
+
+    def test_inject_http_error(self, fake):
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake),
+                  retry=RetryPolicy(sleep=lambda seconds: None))
+        fake.inject_http_error(503, times=2)
+        assert api.request('idoit.version')['version'] == '1.14.2'
+        assert fake.request_count == 3
+
+        fake.inject_http_error(503, times=5)
+        with pytest.raises(ServerError):
+            api.request('idoit.version')
+        fake.clear_errors()
+        assert api.request('idoit.version')
+
+    def test_error_rate(self, api):
+        fake = FakeIdoit(error_rate=0.5, seed=3)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        results = api.batch_request([('idoit.version', {})] * 100)
+        assert 30 < sum(not r.ok for r in results) < 70
+
+    def test_latency(self):
+        delays = []
+        fake = FakeIdoit(latency=0.05, call_latency=0.01, sleep=delays.append)
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        api.batch_request([('idoit.version', {})] * 3)
+        assert delays == [0.05, 0.01, 0.01, 0.01]
+
+    def test_server(self, fake):
+        with FakeIdoitServer(fake) as server:
+            api = API(url=server.url, retry=False)
+            fake.inject_error('cmdb.objects.read')
+            results = api.batch_request([('cmdb.objects.read', {'limit': 5}), ('cmdb.objects.read', {'limit': 5})])
+            assert [r.ok for r in results] == [False, True]
+            assert len(results[1].result) == 5
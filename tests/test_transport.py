@@ -0,0 +1,65 @@
+import pytest
+import requests_mock
+
+from idoit_api.base import API
+from idoit_api.testing import FakeIdoit, FakeIdoitServer
+from idoit_api.transport import RequestsTransport, Urllib3Transport, LocalTransport, TransportResponse
+
+
+@pytest.fixture
+def fake_server():
+    with FakeIdoitServer() as server:
+        yield server
+
+
+class TestRequestsTransport:
+
+    def test_pool_config(self):
+        t = RequestsTransport(pool_size=25, timeout=(1, 2))
+        adapter = t.session.get_adapter('https://cmdb.example.de')
+        assert adapter._pool_maxsize == 25
+        assert t.timeout == (1, 2)
+
+    def test_api_default_transport(self):
+        with API(url="https://cmdb.example.de", pool_size=3) as api:
+            assert isinstance(api.transport, RequestsTransport)
+            assert api.transport.pool_size == 3
+
+    def test_session_is_reused(self):
+        api = API(url="https://cmdb.example.de")
+        session = api.transport.session
+        with requests_mock.Mocker() as m:
+            m.post(url="https://cmdb.example.de", json={'result': {'version': '1.14.2'}})
+            api.request("idoit.version")
+            api.request("idoit.version")
+            assert m.call_count == 2
+        assert api.transport.session is session
+
+    def test_keep_alive(self, fake_server):
+        api = API(url=fake_server.url, key="key")
+        for _ in range(5):
+            assert api.request("idoit.version")['version'] == '1.14.2'
+        assert fake_server.connection_count == 1
+
+
+class TestUrllib3Transport:
+
+    def test_request(self, fake_server):
+        api = API(url=fake_server.url, key="key", transport=Urllib3Transport(pool_size=2, timeout=(1, 5)))
+        assert api.request("idoit.version")['version'] == '1.14.2'
+        assert fake_server.fake.call_count == 1
+
+
+class TestLocalTransport:
+
+    def test_fake_idoit(self):
+        fake = FakeIdoit(version='1.15')
+        api = API(url="https://cmdb.example.de", transport=LocalTransport(fake))
+        assert api.request("idoit.version")['version'] == '1.15'
+
+    def test_plain_bytes_handler(self):
+        t = LocalTransport(lambda data, headers: b'{"result": 1}')
+        response = t.post("https://cmdb.example.de", b'{}', {})
+        assert isinstance(response, TransportResponse)
+        assert response.status_code == 200
+        assert response.content == b'{"result": 1}'